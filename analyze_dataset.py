@@ -1,22 +1,21 @@
 import pandas as pd
-import pickle
 import sys
 
-# 출력을 파일로 저장
+from lib.svd_model import load_svd_model
+from lib.dataset_stats import compute_dataset_stats, save_stats_json, format_rating_summary
+
+# 출력을 파일로 저장 (같은 통계를 JSON으로도 저장)
 output_file = 'dataset_stats.txt'
+json_file = 'dataset_stats.json'
 sys.stdout = open(output_file, 'w', encoding='utf-8')
 
 # 평가 데이터 로드
 print("=== 학습 데이터셋 통계 ===\n")
 
 # rating_complete.csv 분석
-df = pd.read_csv('data/rating_complete.csv')
-print(f"📊 평가 데이터 (rating_complete.csv)")
-print(f"  - 총 평가 수 (rows): {len(df):,}")
-print(f"  - 고유 사용자 수: {df['user_id'].nunique():,}")
-print(f"  - 고유 애니메이션 수: {df['anime_id'].nunique():,}")
-print(f"  - 평균 평점: {df['rating'].mean():.2f}")
-print(f"  - 데이터 밀도: {(len(df) / (df['user_id'].nunique() * df['anime_id'].nunique()) * 100):.4f}%")
+stats = compute_dataset_stats()
+save_stats_json(stats, json_file)
+print(format_rating_summary(stats))
 print()
 
 # anime.csv 분석
@@ -26,14 +25,14 @@ print(f"  - 총 애니메이션 수: {len(anime_df):,}")
 print()
 
 # SVD 모델 정보
-with open('data/svd_model.pkl', 'rb') as f:
-    model = pickle.load(f)
+model = load_svd_model('data/svd_model')
+U = model.load_optional('U')
 
 print(f"🧮 SVD 모델")
-print(f"  - 모델에 포함된 애니메이션 수: {len(model['anime_ids']):,}")
-print(f"  - 잠재 요인 차원 (k): {model['Vt'].shape[0]}")
-print(f"  - 사용자 latent matrix shape: {model['U'].shape}")
-print(f"  - 애니메이션 latent matrix shape: {model['Vt'].shape}")
+print(f"  - 모델에 포함된 애니메이션 수: {len(model.anime_ids):,}")
+print(f"  - 잠재 요인 차원 (k): {model.k}")
+print(f"  - 사용자 latent matrix shape: {U.shape if U is not None else '(저장되지 않음)'}")
+print(f"  - 애니메이션 latent matrix shape: {model.Vt.shape}")
 
 sys.stdout.close()
-print(f"결과가 {output_file}에 저장되었습니다.", file=sys.__stdout__)
+print(f"결과가 {output_file}, {json_file}에 저장되었습니다.", file=sys.__stdout__)
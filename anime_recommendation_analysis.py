@@ -20,8 +20,13 @@ import matplotlib.pyplot as plt  # Visualization
 import seaborn as sns  # Visualization
 import pickle
 
+from scipy.sparse import csr_matrix  # Sparse rating history
 from scipy.sparse.linalg import svds  # Recommendations (SVD)
 
+from lib.ratings_store import load_ratings_frame  # Memory-mapped ratings
+from lib.batch_export import block_top_n  # Blocked top-N predictions
+from lib.neighbor_graph import build_topk_neighbors, normalize_rows, row_neighbors  # Top-k item neighbors
+
 """
 [SVD: Singular Value Decomposition (특이값 분해)]
 
@@ -38,7 +43,8 @@ from scipy.sparse.linalg import svds  # Recommendations (SVD)
 
 ## [3] 데이터 수집하기 (Data Collection)
 # 애니메이션 평점 데이터 (사용자가 애니메이션에 대해 매긴 점수)
-rating_data = pd.read_csv('./data/rating_complete.csv')
+# (data/ratings_store에 int32/int8 컬럼으로 메모리 매핑된 데이터를 사용)
+rating_data = load_ratings_frame()
 
 # 애니메이션 정보 데이터
 anime_data = pd.read_csv('./data/anime_with_synopsis.csv')
@@ -179,12 +185,13 @@ print(f"사용자 {anime_user_rating.shape[1]}명의 평점을 12개 차원으
 
 # 애니메이션 간 상관관계 계산 (피어슨 상관계수)
 """
-np.corrcoef(): 피어슨 상관계수 값을 계산합니다.
-행을 기준으로 값들을 변수로 생각해서, 그 변수에 대한 상관계수를 구합니다.
-애니메이션-애니메이션 간의 상관관계를 봅니다.
+피어슨 상관계수 = 각 행에서 평균을 빼고 길이 1로 정규화한 벡터끼리의 내적
+(np.corrcoef와 같은 값).
+애니메이션 x 애니메이션 전체 행렬을 만들지 않고 행 블록 단위로 계산하면서
+애니메이션마다 상관계수가 가장 높은 k개만 남깁니다 (메모리 O(애니 수 x k)).
 """
-corr = np.corrcoef(matrix_svd)
-print(f"\n상관계수 행렬 Shape: {corr.shape}")
+corr_neighbors = build_topk_neighbors(normalize_rows(matrix_svd, 'pearson'), k=10)
+print(f"\n이웃 그래프 Shape: {corr_neighbors.shape}, 애니당 이웃 수: 10")
 
 # 특정 애니메이션과 유사한 애니메이션 추천
 anime_titles = list(user_anime_rating.columns)
@@ -194,13 +201,12 @@ anime_title_to_index = {title: idx for idx, title in enumerate(anime_titles)}
 sample_anime_id = anime_titles[0]  # 첫 번째 애니메이션
 sample_anime_idx = 0
 
-corr_sample = corr[sample_anime_idx]
-similar_animes_idx = np.argsort(corr_sample)[::-1][1:11]  # 자기 자신 제외 상위 10개
+# 자기 자신 제외 상위 10개 (상관계수 내림차순)
+similar_animes_idx, similar_corrs = row_neighbors(corr_neighbors, sample_anime_idx)
 
 print(f"\n=== 애니메이션 ID {sample_anime_id}와 유사한 작품 ===")
-for idx in similar_animes_idx:
+for idx, similarity in zip(similar_animes_idx, similar_corrs):
     anime_id = anime_titles[idx]
-    similarity = corr_sample[idx]
     anime_info = anime_data_clean[anime_data_clean['anime_id'] == anime_id]
     if not anime_info.empty:
         print(f"상관계수 {similarity:.3f}: {anime_info.iloc[0]['Name']}")
@@ -257,26 +263,44 @@ print(f"Vt Shape: {Vt.shape}")
 sigma = np.diag(sigma)
 print(f"Sigma Diagonal Matrix Shape: {sigma.shape}")
 
-# 예측 평점 계산 (원본 행렬로 복원)
-svd_user_predicted_ratings = np.dot(np.dot(U, sigma), Vt) + user_ratings_mean.reshape(-1, 1)
+# 예측 평점 Top N 계산 (원본 행렬로 복원하지 않음)
+"""
+U·Σ·Vt 전체(사용자 x 애니)를 만들지 않고 사용자를 블록 단위로 나눠
+(블록 x k) @ (k x 애니) 곱 → 이미 평가한 애니 제외 → 행별 argpartition Top N만 남깁니다.
+전체 사용자에 대한 병렬 export는 scripts/7_export_user_topn.py를 사용하세요.
+"""
+num_top = 50
+block_rows = 1024
+
+user_factors = U @ sigma
+rated_history = csr_matrix(matrix)  # 이미 평가한 애니 (추천에서 제외)
+anime_columns = df_user_anime_ratings.columns.to_numpy()
+
+top_anime_ids = np.empty((len(U), min(num_top, Vt.shape[1])), dtype=np.int64)
+top_predictions = np.empty(top_anime_ids.shape)
+for start in range(0, len(U), block_rows):
+    end = min(start + block_rows, len(U))
+    cols, scores = block_top_n(
+        user_factors[start:end], user_ratings_mean[start:end],
+        Vt, rated_history[start:end], num_top
+    )
+    top_anime_ids[start:end] = anime_columns[cols]
+    top_predictions[start:end] = scores
 
-df_svd_preds = pd.DataFrame(
-    svd_user_predicted_ratings,
-    columns=df_user_anime_ratings.columns,
-    index=df_user_anime_ratings.index
-)
+user_row = {user_id: row for row, user_id in enumerate(df_user_anime_ratings.index)}
 
-print("\n=== Predicted Ratings DataFrame ===")
-print(df_svd_preds.head())
+print("\n=== Predicted Top-N (first user) ===")
+print(list(zip(top_anime_ids[0][:5].tolist(), np.round(top_predictions[0][:5], 3).tolist())))
 
 # 추천 함수 정의
-def recommend_animes(df_svd_preds, user_id, ori_animes_df, 
+def recommend_animes(top_anime_ids, top_predictions, user_id, ori_animes_df, 
                      ori_ratings_df, num_recommendations=10):
     """
     사용자에게 애니메이션 추천
     
     Args:
-        df_svd_preds: SVD 예측 평점 DataFrame
+        top_anime_ids: 사용자별 예측 평점 Top N 애니 ID (사용자 x N, 평가한 애니 제외)
+        top_predictions: 같은 모양의 예측 평점
         user_id: 사용자 ID
         ori_animes_df: 원본 애니메이션 정보
         ori_ratings_df: 원본 평점 데이터
@@ -287,12 +311,16 @@ def recommend_animes(df_svd_preds, user_id, ori_animes_df,
         recommendations: 추천 애니메이션
     """
     
-    # 사용자 ID로 예측 평점 정렬
-    if user_id not in df_svd_preds.index:
+    if user_id not in user_row:
         print(f"사용자 ID {user_id}가 존재하지 않습니다.")
         return None, None
     
-    sorted_user_predictions = df_svd_preds.loc[user_id].sort_values(ascending=False)
+    row = user_row[user_id]
+    valid = np.isfinite(top_predictions[row])
+    user_predictions = pd.DataFrame({
+        'anime_id': top_anime_ids[row][valid],
+        'Predictions': top_predictions[row][valid]
+    })
     
     # 사용자가 본 애니메이션
     user_data = ori_ratings_df[ori_ratings_df['user_id'] == user_id]
@@ -301,21 +329,11 @@ def recommend_animes(df_svd_preds, user_id, ori_animes_df,
         on='anime_id'
     ).sort_values(['rating'], ascending=False)
     
-    # 사용자가 보지 않은 애니메이션
-    recommendations = ori_animes_df[
-        ~ori_animes_df['anime_id'].isin(user_history['anime_id'])
-    ]
-    
-    # 예측 평점과 결합
-    recommendations = recommendations.merge(
-        pd.DataFrame(sorted_user_predictions).reset_index(),
+    # 예측 평점과 결합 (Top N은 이미 본 애니를 제외하고 정렬된 상태)
+    recommendations = user_predictions.merge(
+        ori_animes_df,
         on='anime_id'
-    )
-    
-    # 컬럼 이름 변경 및 정렬
-    recommendations = recommendations.rename(
-        columns={user_id: 'Predictions'}
-    ).sort_values('Predictions', ascending=False).iloc[:num_recommendations, :]
+    ).iloc[:num_recommendations, :]
     
     return user_history, recommendations
 
@@ -324,7 +342,8 @@ def recommend_animes(df_svd_preds, user_id, ori_animes_df,
 sample_user_id = df_user_anime_ratings.index[0]
 
 already_rated, predictions = recommend_animes(
-    df_svd_preds, 
+    top_anime_ids,
+    top_predictions,
     sample_user_id, 
     df_animes, 
     df_ratings, 
@@ -2,49 +2,274 @@ from http.server import BaseHTTPRequestHandler
 import json
 import sys
 import os
+import time
 
 # Add project root to path to import lib
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(current_dir, '..')
 sys.path.append(project_root)
 
-from lib.synopsis_recommender import get_synopsis_recommendations
+from lib.synopsis_recommender import (
+    get_synopsis_recommendations, get_synopsis_recommendations_batch, load_data_and_model,
+    peek_synopsis_recommendations, get_fallback_recommendations
+)
+from lib.http_server import is_ready, request_accepted_at
+from lib.id_index import parse_ids
+from lib.admission import admission_controller, Deadline, ADMITTED, REJECTED
+from lib.result_cache import recommendation_cache
+from lib.singleflight import recommendation_flights
+from lib.metrics import (
+    stage, observe_request, start_trace, end_trace, server_timing, render_prometheus
+)
+
+# Upper bound on selection sets per batch request
+MAX_BATCH_SELECTIONS = 10000
+
+# Request header that turns on the per-request stage trace (or ?trace=1)
+TRACE_HEADER = 'X-Recommender-Trace'
+
+# Optional request header overriding the deadline (milliseconds, capped)
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+MAX_DEADLINE_MS = 30000
+
+# Seconds clients are told to wait after a 503
+RETRY_AFTER = 1
+
+
+def warm_up():
+    """Load the TF-IDF artifact and catalog and run one query before taking traffic"""
+    _, model, _ = load_data_and_model()
+    sample_ids = model['index'].ids[:5].tolist()
+    if sample_ids:
+        get_synopsis_recommendations(sample_ids, top_n=30, use_cache=False)
+
 
 class handler(BaseHTTPRequestHandler):
+    _trace_token = None
+    _started = None
+    _status = None
+    
+    def _route(self):
+        return self.path.split('?')[0].rstrip('/')
+    
+    def _wants_trace(self):
+        query = self.path.partition('?')[2]
+        return self.headers.get(TRACE_HEADER, '') not in ('', '0') or 'trace=1' in query.split('&')
+    
+    def do_GET(self):
+        # Readiness probe: 200 once the models are loaded (self-hosted mode)
+        if self._route().endswith('/ready'):
+            ready = is_ready(self.server)
+            self._send_json(200 if ready else 503, {'status': 'ready' if ready else 'warming'})
+            return
+        
+        # Result cache and request coalescing counters
+        if self._route().endswith('/stats'):
+            self._send_json(200, {
+                'cache': recommendation_cache.stats(),
+                'singleflight': recommendation_flights.stats(),
+                'admission': admission_controller.stats()
+            })
+            return
+        
+        # Prometheus scrape endpoint
+        if self._route().endswith('/metrics'):
+            body = render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        
+        self._send_json(405, {'error': 'Method not allowed'})
+    
     def do_POST(self):
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length)
+        self._started = time.perf_counter()
+        self._trace_token = start_trace() if self._wants_trace() else None
+        endpoint = 'recommend'
         
         try:
-            data = json.loads(body)
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length)
+            
+            # Self-hosted mode accepts connections during warm_up(); answering
+            # then would compute on cold models inside the request
+            if not is_ready(self.server):
+                self._send_overloaded('Server warming up, try again shortly')
+                return
+            
+            with stage('api', 'parse'):
+                data = json.loads(body)
+            
+            # Batch form: {"selections": [[...], [...], ...]} -> one result per set
+            if 'selections' in data:
+                endpoint = 'recommend_batch'
+                self._send_batch(data)
+                return
+            
             selected_ids = data.get('selectedAnimeIds')
             
             if not selected_ids or len(selected_ids) != 5:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': '5개의 애니메이션을 선택해주세요'}).encode('utf-8'))
+                self._send_json(400, {'error': '5개의 애니메이션을 선택해주세요'})
                 return
-
-
-            # Synopsis-based recommender doesn't need model files
-            # It loads data directly from CSV
-            recommendations = get_synopsis_recommendations(selected_ids, top_n=30)
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'recommendations': recommendations}, ensure_ascii=False).encode('utf-8'))
+            # Non-integral ids ('x', 1.5) are a client error; unknown ids are ignored
+            try:
+                parse_ids(selected_ids)
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            
+            self._send_recommendations(selected_ids)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode('utf-8'))
-
+            self._send_json(500, {'error': str(e)})
+        
+        finally:
+            if self._trace_token is not None:
+                end_trace(self._trace_token)
+                self._trace_token = None
+            observe_request(endpoint, self._status, time.perf_counter() - self._started)
+    
+    def _deadline(self):
+        """Request deadline, counted from when the connection was accepted"""
+        budget = admission_controller.deadline
+        requested = self.headers.get(DEADLINE_HEADER)
+        if requested:
+            try:
+                budget = min(max(float(requested), 1.0), MAX_DEADLINE_MS) / 1000
+            except ValueError:
+                pass
+        return Deadline(budget, start=request_accepted_at() or self._started)
+    
+    def _send_overloaded(self, message):
+        self._send_json(503, {'error': message}, {'Retry-After': str(RETRY_AFTER)})
+    
+    def _send_recommendations(self, selected_ids):
+        deadline = self._deadline()
+        
+        # A cached exact answer costs nothing: no slot, not degraded
+        cached = peek_synopsis_recommendations(selected_ids, top_n=30)
+        if cached is not None:
+            self._send_json(200, {'recommendations': cached})
+            return
+        
+        # Waiting for a slot only makes sense while the full path still fits
+        outcome = admission_controller.enter(deadline.at - admission_controller.expected_cost())
+        if outcome == REJECTED:
+            self._send_overloaded('Server busy, try again shortly')
+            return
+        
+        recommendations = None
+        if outcome == ADMITTED:
+            try:
+                if deadline.remaining() >= admission_controller.expected_cost():
+                    # Synopsis-based recommender loads the prebuilt TF-IDF artifact
+                    # (data/synopsis_tfidf, built by scripts/3_build_synopsis_index.py)
+                    started = time.perf_counter()
+                    recommendations = get_synopsis_recommendations(selected_ids, top_n=30)
+                    admission_controller.record_cost(time.perf_counter() - started)
+            finally:
+                admission_controller.leave()
+        
+        if recommendations is not None:
+            self._send_json(200, {'recommendations': recommendations})
+            return
+        
+        # Out of budget (queued too long or too little time left): cheaper path,
+        # which has its own small limit so overload cannot multiply its work
+        if not admission_controller.enter_degraded():
+            self._send_overloaded('Server busy, try again shortly')
+            return
+        try:
+            recommendations, source = get_fallback_recommendations(selected_ids, top_n=30)
+        finally:
+            admission_controller.leave_degraded()
+        if recommendations is None:
+            self._send_overloaded('Deadline exceeded')
+            return
+        admission_controller.record_degraded(source)
+        self._send_json(
+            200, {'recommendations': recommendations, 'degraded': True, 'degraded_source': source},
+            {'X-Degraded': source}
+        )
+    
+    def _send_json(self, status, payload, headers=None):
+        with stage('api', 'serialize'):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self._trace_token is not None:
+            # Opt-in trace: stage timings so far plus the total, in milliseconds
+            trace = end_trace(self._trace_token)
+            self._trace_token = None
+            trace.append(('total', time.perf_counter() - self._started))
+            self.send_header('Server-Timing', server_timing(trace))
+        self.end_headers()
+        self.wfile.write(body)
+        self._status = status
+    
+    def _send_batch(self, data):
+        selections = data['selections']
+        if not isinstance(selections, list) or not all(isinstance(s, list) for s in selections):
+            self._send_json(400, {'error': 'selections must be a list of anime id lists'})
+            return
+        if len(selections) > MAX_BATCH_SELECTIONS:
+            self._send_json(400, {'error': f'At most {MAX_BATCH_SELECTIONS} selections per request'})
+            return
+        top_n = data.get('top_n', 30)
+        if not isinstance(top_n, int) or isinstance(top_n, bool) or top_n < 1:
+            self._send_json(400, {'error': 'top_n must be a positive integer'})
+            return
+        
+        # Batches take one compute slot; there is no cheaper path for them
+        deadline = self._deadline()
+        if admission_controller.enter(deadline.at) != ADMITTED:
+            self._send_overloaded('Server busy, try again shortly')
+            return
+        try:
+            # Invalid ids are reported per set instead of failing the batch
+            results = get_synopsis_recommendations_batch(selections, top_n=top_n)
+        finally:
+            admission_controller.leave()
+        self._send_json(200, {'results': results})
+    
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers',
+                         ', '.join(('Content-Type', TRACE_HEADER, DEADLINE_HEADER)))
         self.end_headers()
+
+
+if __name__ == '__main__':
+    # Self-hosted mode: python api/recommend.py --port 8000
+    import argparse
+    from lib.http_server import serve
+    
+    parser = argparse.ArgumentParser(description='Warm, multi-threaded recommendation server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 4,
+                        help='Requests computed concurrently (default: CPU count)')
+    parser.add_argument('--max-queue', type=int, default=admission_controller.max_queue,
+                        help='Requests waiting for a compute slot before fast 503s')
+    parser.add_argument('--deadline-ms', type=float, default=admission_controller.deadline * 1000,
+                        help='Per-request budget; requests past it take a degraded path')
+    parser.add_argument('--max-degraded', type=int, default=admission_controller.max_degraded,
+                        help='Requests computing a degraded answer at once before fast 503s')
+    args = parser.parse_args()
+    
+    admission_controller.configure(
+        max_concurrent=args.threads, max_queue=args.max_queue, deadline=args.deadline_ms / 1000,
+        max_degraded=args.max_degraded
+    )
+    # Queued requests wait (deadline-aware) on a thread of their own, so the
+    # pool covers both; connections beyond that get an immediate 503
+    serve(handler, args.host, args.port, warm_up=warm_up,
+          max_workers=args.threads + args.max_queue, max_pending=0,
+          reject_when_full=True, on_reject=admission_controller.reject)
@@ -0,0 +1,185 @@
+"""
+Admission control and request deadlines for the recommendation API
+
+Under a burst every request used to queue for a worker thread and then
+run full-corpus scoring, however long it had already waited, so latency
+grew without bound. The controller bounds both:
+
+- at most max_concurrent requests compute at once and at most max_queue
+  wait for a slot; anything beyond that is rejected immediately (the API
+  answers 503 with Retry-After)
+- every request carries a Deadline. A waiting request gives up its place
+  once the full computation could no longer finish in time, and an
+  admitted request whose remaining budget is below the expected cost of
+  the full path takes a cheaper one (cached result or precomputed
+  neighbor list) and is flagged as degraded
+- the cheaper path is bounded too: at most max_degraded requests run it
+  at once and the rest are rejected without waiting, so an overload
+  cannot turn every refused request into extra work
+
+The expected cost is an exponentially weighted average of recent full
+computations. Limits come from RECOMMEND_MAX_CONCURRENT (default 8),
+RECOMMEND_MAX_QUEUE (default 32), RECOMMEND_MAX_DEGRADED (default 4) and
+RECOMMEND_DEADLINE_MS (default 1000).
+"""
+
+import os
+import time
+import threading
+
+ADMITTED = 'admitted'
+REJECTED = 'rejected'
+TIMED_OUT = 'timed_out'
+
+# Margin on the expected full-path cost before degrading
+COST_SAFETY_FACTOR = 1.5
+_COST_SMOOTHING = 0.2
+
+
+class Deadline:
+    """Absolute deadline on the perf_counter clock"""
+
+    def __init__(self, budget, start=None):
+        self.budget = float(budget)
+        self.at = (time.perf_counter() if start is None else start) + self.budget
+
+    def remaining(self):
+        return self.at - time.perf_counter()
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, deadline-aware wait queue"""
+
+    def __init__(self, max_concurrent=8, max_queue=32, deadline=1.0, max_degraded=4):
+        self.max_concurrent = int(max_concurrent)
+        self.max_queue = int(max_queue)
+        self.max_degraded = int(max_degraded)
+        self.deadline = float(deadline)
+        self.active = 0
+        self.degraded_active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.degraded = {}
+        self._cost = None
+        self._cond = threading.Condition()
+
+    def configure(self, max_concurrent=None, max_queue=None, deadline=None, max_degraded=None):
+        """Change limits at startup (e.g. from command-line flags)"""
+        with self._cond:
+            if max_concurrent is not None:
+                self.max_concurrent = int(max_concurrent)
+            if max_queue is not None:
+                self.max_queue = int(max_queue)
+            if max_degraded is not None:
+                self.max_degraded = int(max_degraded)
+            if deadline is not None:
+                self.deadline = float(deadline)
+            self._cond.notify_all()
+
+    def enter(self, wait_until):
+        """
+        Claim a compute slot
+
+        Args:
+            wait_until: perf_counter time after which waiting is pointless
+
+        Returns:
+            ADMITTED (call leave() when done), REJECTED (queue full) or
+            TIMED_OUT (no slot freed before wait_until)
+        """
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.admitted += 1
+                return ADMITTED
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return REJECTED
+
+            self.waiting += 1
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = wait_until - time.perf_counter()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        return TIMED_OUT
+                    self._cond.wait(remaining)
+                self.active += 1
+                self.admitted += 1
+                return ADMITTED
+            finally:
+                self.waiting -= 1
+
+    def enter_degraded(self):
+        """
+        Claim a slot on the cheaper path, without waiting
+
+        Returns:
+            True when granted (call leave_degraded() when done), False when
+            max_degraded requests already run it (counted as rejected)
+        """
+        with self._cond:
+            if self.degraded_active >= self.max_degraded:
+                self.rejected += 1
+                return False
+            self.degraded_active += 1
+            return True
+
+    def leave_degraded(self):
+        with self._cond:
+            self.degraded_active -= 1
+
+    def reject(self):
+        """Count a request turned away before reaching enter() (e.g. by the HTTP server)"""
+        with self._cond:
+            self.rejected += 1
+
+    def leave(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def record_cost(self, seconds):
+        """Feed the duration of one full computation into the estimate"""
+        with self._cond:
+            if self._cost is None:
+                self._cost = seconds
+            else:
+                self._cost += _COST_SMOOTHING * (seconds - self._cost)
+
+    def expected_cost(self):
+        """Budget the full path needs, with the safety margin (0 before any sample)"""
+        cost = self._cost
+        return 0.0 if cost is None else cost * COST_SAFETY_FACTOR
+
+    def record_degraded(self, source):
+        with self._cond:
+            self.degraded[source] = self.degraded.get(source, 0) + 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'max_degraded': self.max_degraded,
+                'deadline': self.deadline,
+                'active': self.active,
+                'degraded_active': self.degraded_active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'degraded': dict(self.degraded),
+                'expected_cost': self.expected_cost()
+            }
+
+
+# Shared by all request threads of the API process
+admission_controller = AdmissionController(
+    max_concurrent=int(os.environ.get('RECOMMEND_MAX_CONCURRENT', 8)),
+    max_queue=int(os.environ.get('RECOMMEND_MAX_QUEUE', 32)),
+    max_degraded=int(os.environ.get('RECOMMEND_MAX_DEGRADED', 4)),
+    deadline=float(os.environ.get('RECOMMEND_DEADLINE_MS', 1000)) / 1000
+)
@@ -0,0 +1,207 @@
+"""
+Parallel alternating least squares on the full sparse rating matrix
+
+train_svd() (lib/training.py) needs the top-users / popular-anime subset to
+stay tractable. ALS instead fits user factors X and item factors Y on the
+observed ratings only:
+
+    min  sum_(u,i observed) (r_ui - x_u . y_i)^2
+         + reg * (sum_u n_u |x_u|^2 + sum_i n_i |y_i|^2)
+
+Each half-step is an independent ridge solve per row, so the rows are cut
+into blocks and solved by a process pool. Within a block the normal
+equations come from batched products over rows of similar length and all
+k x k systems are solved by one np.linalg.solve. The CSR arrays of R and
+R^T and both factor matrices live in multiprocessing.shared_memory
+segments; workers attach to them once and write their solutions in place,
+so nothing large is pickled between processes.
+
+to_svd_form() turns (X, Y) into the U, sigma, Vt layout that
+save_svd_model() stores, so the recommender serves ALS models unchanged.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+
+from lib.shared_arrays import SharedArrays, attach_shared, shared
+from lib.training import canonical_rating_matrix
+
+DEFAULT_REG = 0.1
+DEFAULT_ITERATIONS = 15
+DEFAULT_BLOCK_ROWS = 4096
+# Upper bound on the padded factor stack gathered per batched product
+GATHER_BYTES = 64 << 20
+
+
+def center_observed(matrix):
+    """
+    Subtract each row's mean over its observed ratings, in place
+
+    Returns:
+        Per-row means (0 for empty rows)
+    """
+    counts = np.diff(matrix.indptr)
+    sums = np.asarray(matrix.sum(axis=1), dtype=np.float64).ravel()
+    means = np.divide(sums, counts, out=np.zeros(len(counts), dtype=np.float64), where=counts > 0)
+    matrix.data -= np.repeat(means, counts).astype(matrix.data.dtype)
+    return means
+
+
+def _solve_block(side, start, end, reg):
+    """
+    Ridge-solve rows [start, end) of one side against the other side's factors
+
+    side 'users' updates X from Y using R; side 'items' updates Y from X using R^T.
+    """
+    if side == 'users':
+        indptr, indices, data = shared['r_indptr'], shared['r_indices'], shared['r_data']
+        fixed, target = shared['Y'], shared['X']
+    else:
+        indptr, indices, data = shared['rt_indptr'], shared['rt_indices'], shared['rt_data']
+        fixed, target = shared['X'], shared['Y']
+
+    k = fixed.shape[1]
+    counts = np.diff(indptr[start:end + 1]).astype(np.int64)
+    lo, hi = indptr[start], indptr[end]
+    block = csr_matrix(
+        (data[lo:hi], indices[lo:hi], indptr[start:end + 1] - lo), shape=(end - start, len(fixed))
+    )
+
+    A = _gram_matrices(block.indptr, block.indices, fixed)
+    # Weighted-lambda regularization; empty rows solve to zero
+    A += (reg * np.maximum(counts, 1))[:, None, None] * np.eye(k)
+    b = block @ fixed
+
+    target[start:end] = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+
+
+def _gram_matrices(indptr, indices, fixed):
+    """
+    F_r^T F_r for every CSR row r, where F_r = fixed[columns of row r]
+
+    Rows are grouped by length rounded up to a quarter octave and each group
+    is gathered into one zero-padded (rows x length x k) stack, so the k x k
+    products run as a few batched matmuls instead of one per row. Padding
+    points at the last row of fixed, which is kept at zero for this.
+    """
+    k = fixed.shape[1]
+    zero_row = len(fixed) - 1
+    counts = np.diff(indptr).astype(np.int64)
+    A = np.zeros((len(counts), k, k))
+
+    lengths = np.zeros(len(counts), dtype=np.int64)
+    rated = counts > 0
+    lengths[rated] = np.ceil(2.0 ** (np.ceil(4 * np.log2(counts[rated])) / 4))
+    lengths = np.maximum(lengths, counts)
+
+    order = np.argsort(lengths, kind='stable')
+    for group in np.split(order, np.flatnonzero(np.diff(lengths[order])) + 1):
+        length = int(lengths[group[0]])
+        if length == 0:
+            continue
+        offsets = np.arange(length)
+        step = max(1, GATHER_BYTES // (length * k * 8))
+        for chunk_start in range(0, len(group), step):
+            rows = group[chunk_start:chunk_start + step]
+            observed = offsets < counts[rows, None]
+            positions = np.minimum(indptr[rows, None] + offsets, len(indices) - 1)
+            factors = fixed[np.where(observed, indices[positions], zero_row)]
+            A[rows] = factors.transpose(0, 2, 1) @ factors
+
+    return A
+
+
+def _squared_error_block(start, end):
+    """Sum of squared residuals over the observed ratings of users [start, end)"""
+    indptr, indices, data = shared['r_indptr'], shared['r_indices'], shared['r_data']
+    X, Y = shared['X'], shared['Y']
+
+    lo, hi = indptr[start], indptr[end]
+    users = np.repeat(np.arange(start, end), np.diff(indptr[start:end + 1]))
+    predictions = np.einsum('ij,ij->i', X[users], Y[indices[lo:hi]])
+    return float(np.sum((data[lo:hi] - predictions) ** 2))
+
+
+def _blocks(n_rows, block_rows):
+    return [(start, min(start + block_rows, n_rows)) for start in range(0, n_rows, block_rows)]
+
+
+def train_als(matrix, k, reg=DEFAULT_REG, iterations=DEFAULT_ITERATIONS,
+              workers=None, block_rows=DEFAULT_BLOCK_ROWS, seed=42, progress=None):
+    """
+    Factorize a sparse (n_users x n_animes) matrix of centered ratings
+
+    Args:
+        matrix: scipy.sparse matrix; only stored entries count as observed
+        k: Number of latent factors
+        reg: Regularization strength (scaled by each row's rating count)
+        iterations: Number of (users, items) alternations
+        workers: Worker processes (default os.cpu_count())
+        block_rows: Rows per pool task
+        seed: Seed for the item factor initialization
+        progress: Optional callable(iteration, rmse) called after every iteration
+
+    Returns:
+        (X, Y) user factors (n_users x k) and item factors (n_animes x k)
+    """
+    # Repeated (user, anime) entries keep their last rating instead of adding up
+    R = canonical_rating_matrix(matrix, dtype=np.float32)
+    Rt = R.T.tocsr()
+    n_users, n_items = R.shape
+
+    rng = np.random.default_rng(seed)
+    # One extra all-zero row per factor matrix pads the batched Gram products
+    Y = np.zeros((n_items + 1, k))
+    Y[:n_items] = rng.normal(scale=0.1, size=(n_items, k))
+    arrays = {
+        'r_indptr': R.indptr, 'r_indices': R.indices, 'r_data': R.data,
+        'rt_indptr': Rt.indptr, 'rt_indices': Rt.indices, 'rt_data': Rt.data,
+        'X': np.zeros((n_users + 1, k)),
+        'Y': Y
+    }
+
+    with SharedArrays(arrays) as memory:
+        del R, Rt, Y, arrays
+
+        user_blocks = _blocks(n_users, block_rows)
+        item_blocks = _blocks(n_items, block_rows)
+        nnz = len(memory['r_data'])
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=attach_shared, initargs=(memory.specs,)) as pool:
+            for iteration in range(1, iterations + 1):
+                # Each side's blocks are independent; wait for all before switching sides
+                list(pool.map(_solve_block, ['users'] * len(user_blocks),
+                              *zip(*user_blocks), [reg] * len(user_blocks)))
+                list(pool.map(_solve_block, ['items'] * len(item_blocks),
+                              *zip(*item_blocks), [reg] * len(item_blocks)))
+
+                if progress is not None:
+                    squared_error = sum(pool.map(_squared_error_block, *zip(*user_blocks)))
+                    progress(iteration, np.sqrt(squared_error / nnz) if nnz else 0.0)
+
+        X, Y = memory['X'][:n_users].copy(), memory['Y'][:n_items].copy()
+
+    return X, Y
+
+
+def to_svd_form(X, Y):
+    """
+    Rewrite X @ Y.T as U @ diag(sigma) @ Vt with orthonormal U and Vt rows
+
+    Uses thin QR of both factors and an SVD of the small k x k core, so the
+    artifact has the same meaning as the svds output (sigma ascending).
+
+    Returns:
+        (U, sigma, Vt)
+    """
+    Qx, Rx = np.linalg.qr(X)
+    Qy, Ry = np.linalg.qr(Y)
+    core_U, sigma, core_Vt = np.linalg.svd(Rx @ Ry.T)
+
+    order = np.argsort(sigma, kind='stable')
+    U = Qx @ core_U[:, order]
+    Vt = (Qy @ core_Vt[order].T).T
+    return U, sigma[order], Vt
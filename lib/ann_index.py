@@ -0,0 +1,274 @@
+"""
+IVF approximate nearest-neighbor index over unit-length item vectors
+
+Exact scoring multiplies the query with every item vector. An IVF
+(inverted file) index clusters the vectors offline with spherical k-means;
+at query time only the items in the nprobe clusters whose centroids are
+closest to the query are scored. nprobe is the recall/latency knob:
+nprobe = n_lists is exact, small nprobe touches ~nprobe / n_lists of the
+catalog.
+
+The mean-cosine score of get_recommendations() is a dot product with the
+mean of the selected unit vectors, so a selection is answered with one
+query vector.
+
+Layout of an index directory:
+
+    manifest.json     n_lists, source, source_version, measured recall
+    centroids.npy     (n_lists x d) unit centroids
+    list_rows.npy     item rows grouped by cluster
+    list_offsets.npy  cluster c owns list_rows[offsets[c]:offsets[c + 1]]
+    vectors.npy       item vectors (only when they are not in the source
+                      artifact, e.g. the reduced TF-IDF embedding)
+"""
+
+import os
+import json
+import time
+import numpy as np
+
+from lib.artifact_dir import replacing_directory
+from lib.ranking import top_n_rows
+
+DEFAULT_NPROBE = 8
+INDEX_FORMAT_VERSION = 1
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def spherical_kmeans(vectors, n_lists, iterations=20, seed=0, block_size=8192):
+    """
+    k-means on the unit sphere (cosine assignment, normalized centroids)
+
+    Args:
+        vectors: (n x d) unit-length rows
+        n_lists: Number of clusters
+        iterations: Lloyd iterations
+        seed: Seed for the initial centroids and for re-seeding empty clusters
+        block_size: Rows assigned per block (bounds the n x n_lists score block)
+
+    Returns:
+        (centroids, assignments)
+    """
+    rng = np.random.default_rng(seed)
+    n, d = vectors.shape
+    n_lists = max(1, min(int(n_lists), n))
+    centroids = vectors[rng.choice(n, n_lists, replace=False)].astype(np.float64)
+    assignments = np.zeros(n, dtype=np.intp)
+
+    for _ in range(iterations):
+        for start in range(0, n, block_size):
+            assignments[start:start + block_size] = np.argmax(
+                vectors[start:start + block_size] @ centroids.T, axis=1
+            )
+
+        sums = np.zeros((n_lists, d))
+        np.add.at(sums, assignments, vectors)
+        empty = np.flatnonzero(np.bincount(assignments, minlength=n_lists) == 0)
+        sums[empty] = vectors[rng.choice(n, len(empty), replace=False)]
+        centroids = _unit_rows(sums)
+
+    for start in range(0, n, block_size):
+        assignments[start:start + block_size] = np.argmax(
+            vectors[start:start + block_size] @ centroids.T, axis=1
+        )
+    return centroids, assignments
+
+
+class IVFIndex:
+    """Inverted-file index; the item vectors themselves are passed in or loaded"""
+
+    def __init__(self, centroids, list_rows, list_offsets, vectors, manifest=None):
+        self.centroids = centroids
+        self.list_rows = list_rows
+        self.list_offsets = list_offsets
+        self.vectors = vectors
+        self.manifest = manifest or {}
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, iterations=20, seed=0):
+        """
+        Cluster unit-length vectors into an index
+
+        Args:
+            vectors: (n x d) unit-length item rows
+            n_lists: Number of clusters (default sqrt(n))
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if n_lists is None:
+            n_lists = int(np.sqrt(vectors.shape[0]))
+        centroids, assignments = spherical_kmeans(vectors, n_lists, iterations, seed)
+
+        list_rows = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=centroids.shape[0])
+        list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls(centroids, list_rows, list_offsets, vectors)
+
+    def candidates(self, query, nprobe=DEFAULT_NPROBE):
+        """Rows in the nprobe clusters closest to the query"""
+        nprobe = min(max(int(nprobe), 1), self.n_lists)
+        probe = top_n_rows(self.centroids @ query, nprobe)
+        return np.concatenate([
+            self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe
+        ])
+
+    def search(self, query, top_n, nprobe=DEFAULT_NPROBE, exclude_rows=None):
+        """
+        Approximate top_n rows by dot product with query
+
+        Args:
+            query: (d,) query vector
+            top_n: Number of rows to return
+            nprobe: Clusters to scan (higher = better recall, slower)
+            exclude_rows: Rows that must not be returned
+
+        Returns:
+            (rows, scores) best first
+        """
+        query = np.asarray(query, dtype=np.float64)
+        candidate_rows = self.candidates(query, nprobe)
+        scores = np.asarray(self.vectors[candidate_rows]) @ query
+
+        exclude_mask = None
+        if exclude_rows is not None and len(exclude_rows):
+            exclude_mask = np.isin(candidate_rows, exclude_rows)
+        order = top_n_rows(scores, top_n, exclude_mask)
+        return candidate_rows[order], scores[order]
+
+
+def measure_recall(index, queries, top_n=30, nprobes=(1, 2, 4, 8, 16, 32), exclude=None,
+                   exact=None, search=None):
+    """
+    Recall@top_n and mean latency of index.search against exact scoring
+
+    Args:
+        index: IVFIndex
+        queries: (q x d) query vectors
+        top_n: Result size compared
+        nprobes: nprobe values to measure
+        exclude: Optional list of row arrays excluded per query
+        exact: Optional exact(i) -> rows giving the reference top_n of query
+            i when it is not the dot product over index.vectors
+        search: Optional search(i, nprobe) -> rows replacing index.search,
+            for callers that re-score the scanned candidates
+
+    Returns:
+        List of {'nprobe', 'recall', 'latency_ms', 'scanned'} dicts, plus an
+        'exact' latency entry with nprobe None
+    """
+    vectors = np.asarray(index.vectors)
+    truth = []
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        if exact is not None:
+            truth.append(np.asarray(exact(i)))
+            continue
+        scores = vectors @ query
+        mask = None
+        if exclude is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[exclude[i]] = True
+        truth.append(top_n_rows(scores, top_n, mask))
+    report = [{
+        'nprobe': None,
+        'recall': 1.0,
+        'latency_ms': (time.perf_counter() - start) * 1000 / max(len(queries), 1),
+        'scanned': 1.0
+    }]
+
+    for nprobe in nprobes:
+        if nprobe > index.n_lists:
+            continue
+        hits = 0
+        scanned = 0
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            if search is not None:
+                rows = search(i, nprobe)
+            else:
+                rows, _ = index.search(query, top_n, nprobe, None if exclude is None else exclude[i])
+            hits += len(np.intersect1d(rows, truth[i]))
+        elapsed = time.perf_counter() - start
+        for query in queries:
+            scanned += len(index.candidates(query, nprobe))
+        report.append({
+            'nprobe': int(nprobe),
+            'recall': hits / max(sum(len(t) for t in truth), 1),
+            'latency_ms': elapsed * 1000 / max(len(queries), 1),
+            'scanned': scanned / max(len(queries), 1) / vectors.shape[0]
+        })
+    return report
+
+
+def save_ivf_index(index_dir, index, meta, save_vectors=False):
+    """
+    Write an index directory (swapped in atomically)
+
+    Args:
+        index_dir: Target directory
+        index: IVFIndex
+        meta: dict merged into manifest.json (source, source_version, recall, ...)
+        save_vectors: Also store the item vectors (when the source artifact lacks them)
+    """
+    manifest = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'n_lists': int(index.n_lists),
+        'n_items': int(len(index.list_rows)),
+        'has_vectors': bool(save_vectors)
+    }
+    manifest.update(meta)
+
+    with replacing_directory(os.path.abspath(index_dir)) as tmp_dir:
+        np.save(os.path.join(tmp_dir, 'centroids.npy'), index.centroids)
+        np.save(os.path.join(tmp_dir, 'list_rows.npy'), index.list_rows)
+        np.save(os.path.join(tmp_dir, 'list_offsets.npy'), index.list_offsets)
+        if save_vectors:
+            np.save(os.path.join(tmp_dir, 'vectors.npy'), np.asarray(index.vectors))
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_ivf_index(index_dir, vectors=None, expected_version=None):
+    """
+    Load an index directory
+
+    Args:
+        index_dir: Directory written by save_ivf_index()
+        vectors: Item vectors, unless the index stores its own
+        expected_version: Only return the index if it was built from this
+            version of the source artifact
+
+    Returns:
+        IVFIndex, or None when missing or stale
+    """
+    manifest_path = os.path.join(index_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+        return None
+    if expected_version is not None and manifest.get('source_version') != expected_version:
+        return None
+
+    if manifest.get('has_vectors'):
+        vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+    if vectors is None:
+        raise ValueError(f'{index_dir} does not store item vectors; pass them in')
+
+    return IVFIndex(
+        np.load(os.path.join(index_dir, 'centroids.npy')),
+        np.load(os.path.join(index_dir, 'list_rows.npy')),
+        np.load(os.path.join(index_dir, 'list_offsets.npy')),
+        vectors,
+        manifest
+    )
@@ -0,0 +1,95 @@
+"""
+Atomic replacement of build-artifact directories
+
+Artifact directories (model, TF-IDF store, catalog, IVF index, ratings
+store, user top-N export) are rewritten by scripts and, for the TF-IDF
+store and the catalog, by serving processes on a cold start, possibly
+several at once. Each writer stages into its own temporary directory next
+to the target and swaps it in with renames:
+
+    with replacing_directory(target, carry_over=('neighbors.npz',)) as staging:
+        ...write files into staging...
+
+- staging directories are per writer (tempfile.mkdtemp), so concurrent
+  builds never delete each other's files
+- the old directory is renamed aside and removed only after the new one
+  is in place, so readers see at most a rename-sized gap
+- when another writer installs the target between the two renames, its
+  directory is kept and this one is discarded (one of them wins)
+- carry_over names optional sub-artifacts built by separate steps; they
+  move from the old directory into the new one unless it has its own.
+  Their loaders check the source version, so stale ones are ignored.
+
+Read-only deployments make mkdtemp raise OSError before anything is
+touched; callers can catch it and keep the build in memory.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def _staging_dir(target_dir):
+    parent, name = os.path.split(os.path.abspath(target_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=f'.{name}.tmp-', dir=parent)
+    # mkdtemp is private (0700); the installed artifact must stay readable
+    os.chmod(staging_dir, 0o755)
+    return staging_dir
+
+
+def swap_in(staging_dir, target_dir, carry_over=()):
+    """
+    Install staging_dir as target_dir
+
+    Returns:
+        True when staging_dir was installed, False when another writer's
+        directory appeared at target_dir first (staging_dir is removed)
+    """
+    target_dir = os.path.abspath(target_dir)
+    parent, name = os.path.split(target_dir)
+    aside_dir = tempfile.mkdtemp(prefix=f'.{name}.old-', dir=parent)
+
+    try:
+        try:
+            os.replace(target_dir, aside_dir)
+        except FileNotFoundError:
+            pass
+
+        for entry in carry_over:
+            old_path = os.path.join(aside_dir, entry)
+            if os.path.lexists(old_path) and not os.path.lexists(os.path.join(staging_dir, entry)):
+                os.replace(old_path, os.path.join(staging_dir, entry))
+
+        try:
+            os.rename(staging_dir, target_dir)
+        except OSError:
+            if not os.path.isdir(target_dir):
+                raise
+            # A concurrent writer swapped its build in between our renames
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return False
+        return True
+    finally:
+        shutil.rmtree(aside_dir, ignore_errors=True)
+
+
+@contextmanager
+def replacing_directory(target_dir, carry_over=()):
+    """
+    Stage a new version of target_dir and swap it in on success
+
+    Yields:
+        Path of the private staging directory to write into
+
+    Raises:
+        OSError: When the parent directory is not writable (nothing changed)
+    """
+    staging_dir = _staging_dir(target_dir)
+    try:
+        yield staging_dir
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    swap_in(staging_dir, target_dir, carry_over)
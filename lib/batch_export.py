@@ -0,0 +1,204 @@
+"""
+Top-N recommendations for every user of the model, written to disk
+
+Instead of materializing U·Σ·Vt (users x anime float64), users are scored in
+blocks of block_rows: one (block x k) @ (k x n_animes) product, the block's
+already-rated anime masked out from a CSR history matrix, and a per-row
+argpartition top-N. Blocks run in a process pool; the history CSR is
+shared through lib/shared_arrays.py, the model factors are memory-mapped
+from the artifact, and every worker writes its rows straight into the
+output .npy files, so peak memory is a few blocks regardless of user count.
+
+Layout of data/user_topn/:
+
+    manifest.json    model version, top_n, n_users
+    user_ids.npy     user_id of every row
+    anime_ids.npy    (n_users x top_n) int32, best first, -1 = no candidate
+    scores.npy       (n_users x top_n) float32 predicted ratings, NaN = no candidate
+"""
+
+import os
+import json
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+
+from lib.artifact_dir import replacing_directory
+from lib.id_index import IdIndex
+from lib.ranking import top_n_per_row
+from lib.svd_model import load_svd_model
+from lib.shared_arrays import SharedArrays, attach_shared, shared
+
+DEFAULT_BLOCK_ROWS = 1024
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.normpath(os.path.join(current_dir, '..', 'data', 'user_topn'))
+
+# Worker-side state, filled by _init_worker()
+_worker = {}
+
+
+def block_top_n(user_factors, means, Vt, history, top_n):
+    """
+    Predicted-rating top-N for one block of users
+
+    Args:
+        user_factors: (block x k) rows of U·Σ
+        means: (block,) user rating means added back to the predictions
+        Vt: (k x n_animes) item factors
+        history: (block x n_animes) sparse matrix, stored entries are excluded
+        top_n: Recommendations per user
+
+    Returns:
+        (cols, scores) as returned by top_n_per_row; excluded entries are -inf
+    """
+    predictions = np.asarray(user_factors) @ np.asarray(Vt) + np.asarray(means)[:, None]
+
+    rows = np.repeat(np.arange(history.shape[0]), np.diff(history.indptr))
+    predictions[rows, history.indices] = -np.inf
+
+    return top_n_per_row(predictions, top_n)
+
+
+def build_history(model, user_ids):
+    """
+    CSR (n_users x n_animes) of what every model user already rated
+
+    Read from the ratings store (lib/ratings_store.py); ratings of users or
+    anime that are not in the model are ignored.
+    """
+    from lib.ratings_store import load_ratings
+
+    user_index = IdIndex(user_ids)
+    row_chunks, col_chunks = [], []
+    for user_id, anime_id, _ in load_ratings().chunks():
+        rows = user_index.rows(user_id)
+        cols = model.index.rows(anime_id)
+        keep = (rows >= 0) & (cols >= 0)
+        row_chunks.append(rows[keep].astype(np.int32))
+        col_chunks.append(cols[keep].astype(np.int32))
+
+    rows = np.concatenate(row_chunks) if row_chunks else np.zeros(0, dtype=np.int32)
+    cols = np.concatenate(col_chunks) if col_chunks else np.zeros(0, dtype=np.int32)
+    history = csr_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+        shape=(len(user_ids), model.n_animes)
+    )
+    history.sum_duplicates()
+    # An anime rated twice is still one "already rated" flag
+    history.data[:] = 1
+    return history
+
+
+def _init_worker(specs, model_path, output_dir):
+    attach_shared(specs)
+    model = load_svd_model(model_path)
+    _worker['model'] = model
+    _worker['U'] = model.load_optional('U')
+    _worker['means'] = model.load_optional('user_ratings_mean')
+    _worker['anime_ids'] = np.load(os.path.join(output_dir, 'anime_ids.npy'), mmap_mode='r+')
+    _worker['scores'] = np.load(os.path.join(output_dir, 'scores.npy'), mmap_mode='r+')
+
+
+def _export_block(start, end, top_n):
+    model = _worker['model']
+    indptr = shared['history_indptr'][start:end + 1]
+    history = csr_matrix(
+        (np.ones(indptr[-1] - indptr[0], dtype=np.int8),
+         shared['history_indices'][indptr[0]:indptr[-1]], indptr - indptr[0]),
+        shape=(end - start, model.n_animes)
+    )
+
+    cols, scores = block_top_n(
+        _worker['U'][start:end] * model.sigma, _worker['means'][start:end],
+        model.Vt, history, top_n
+    )
+
+    valid = np.isfinite(scores)
+    _worker['anime_ids'][start:end, :cols.shape[1]] = np.where(valid, model.anime_ids[cols], -1)
+    _worker['scores'][start:end, :cols.shape[1]] = np.where(valid, scores, np.nan)
+    return end - start
+
+
+def export_user_topn(model_path=None, output_dir=None, top_n=30,
+                     block_rows=DEFAULT_BLOCK_ROWS, workers=None, progress=None):
+    """
+    Write the top-N predicted ratings of every model user
+
+    Args:
+        model_path: SVD model directory with U / user_ratings_mean / user_ids
+        output_dir: Output directory (default data/user_topn)
+        top_n: Recommendations per user
+        block_rows: Users scored per task (memory is ~block_rows x n_animes x 8 bytes per worker)
+        workers: Worker processes (default os.cpu_count())
+        progress: Optional callable(done_users, n_users)
+
+    Returns:
+        The manifest dict that was written
+    """
+    model = load_svd_model(model_path)
+    user_ids = model.load_optional('user_ids')
+    if user_ids is None or model.load_optional('U') is None:
+        raise ValueError(f'{model.path} has no user factors; retrain it with scripts/1_prepare_data.py')
+    n_users = len(user_ids)
+
+    output_dir = os.path.abspath(output_dir or DEFAULT_OUTPUT_DIR)
+    history = build_history(model, user_ids)
+    blocks = [(start, min(start + block_rows, n_users)) for start in range(0, n_users, block_rows)]
+
+    with replacing_directory(output_dir) as tmp_dir:
+        np.save(os.path.join(tmp_dir, 'user_ids.npy'), np.asarray(user_ids, dtype=np.int64))
+        out_ids = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'anime_ids.npy'), mode='w+', dtype=np.int32, shape=(n_users, top_n)
+        )
+        out_scores = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'scores.npy'), mode='w+', dtype=np.float32, shape=(n_users, top_n)
+        )
+        out_ids[:] = -1
+        out_scores[:] = np.nan
+        out_ids.flush()
+        out_scores.flush()
+        del out_ids, out_scores
+
+        with SharedArrays({'history_indptr': history.indptr, 'history_indices': history.indices}) as memory:
+            del history
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                     initargs=(memory.specs, model.path, tmp_dir)) as pool:
+                done = 0
+                for n in pool.map(_export_block, *zip(*blocks), [top_n] * len(blocks)):
+                    done += n
+                    if progress is not None:
+                        progress(done, n_users)
+
+        manifest = {
+            'model_version': model.version,
+            'top_n': int(top_n),
+            'n_users': int(n_users)
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+class UserTopN:
+    """Read-only lookup over an exported table"""
+
+    def __init__(self, output_dir=None):
+        output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        with open(os.path.join(output_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.index = IdIndex(np.load(os.path.join(output_dir, 'user_ids.npy')))
+        self.anime_ids = np.load(os.path.join(output_dir, 'anime_ids.npy'), mmap_mode='r')
+        self.scores = np.load(os.path.join(output_dir, 'scores.npy'), mmap_mode='r')
+
+    def get(self, user_id):
+        """
+        Returns:
+            List of (anime_id, predicted_rating), best first; [] for unknown users
+        """
+        row = self.index.row(user_id)
+        if row < 0:
+            return []
+        valid = self.anime_ids[row] >= 0
+        return list(zip(self.anime_ids[row][valid].tolist(), self.scores[row][valid].tolist()))
@@ -0,0 +1,345 @@
+"""
+Catalog metadata store shared by the recommenders
+
+One columnar table per anime, built offline (scripts/5_build_catalog.py)
+from anime.csv, anime_with_synopsis.csv and popular_animes.json, written
+to data/catalog/:
+
+    manifest.json    catalog version, source checksums
+    anime_ids.npy    MAL_ID of every row
+    score.npy        float64 (NaN when unknown)
+    episodes.npy     int32 (0 when unknown)
+    strings.json     title / genres / type / image_url / synopsis / rating columns
+                     (rating is the Score text as written in the source, e.g. '8.50')
+
+The store is loaded once per process; result pages gather only the rows
+and fields they need through the shared id index. A missing or stale
+store is rebuilt and swapped in atomically (lib/artifact_dir.py), or kept
+in memory when data/ is read-only.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import numpy as np
+
+from lib.id_index import IdIndex
+from lib.artifact_dir import replacing_directory
+from lib.fingerprint import file_fingerprint, fingerprint_matches
+
+# Bump when the catalog layout or the build rules change
+CATALOG_VERSION = 2
+
+SYNOPSIS_MAX_CHARS = 200
+
+STRING_FIELDS = ['title', 'genres', 'type', 'image_url', 'synopsis', 'rating']
+NUMERIC_FIELDS = {'score': np.float64, 'episodes': np.int32}
+
+# Value used when a requested id is not in the catalog
+FIELD_DEFAULTS = {
+    'title': 'Unknown',
+    'genres': '',
+    'type': '',
+    'image_url': '',
+    'synopsis': '',
+    'rating': '',
+    'score': np.nan,
+    'episodes': 0
+}
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.normpath(os.path.join(current_dir, '..', 'data'))
+DEFAULT_CATALOG_DIR = os.path.join(DATA_DIR, 'catalog')
+DEFAULT_SOURCES = {
+    'anime': os.path.join(DATA_DIR, 'anime.csv'),
+    'synopsis': os.path.join(DATA_DIR, 'anime_with_synopsis.csv'),
+    'popular': os.path.join(DATA_DIR, 'popular_animes.json')
+}
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+class Catalog:
+    """Read-only columnar metadata table with an id index"""
+
+    def __init__(self, manifest, anime_ids, columns):
+        self.manifest = manifest
+        self.version = manifest.get('version', '')
+        self.index = IdIndex(anime_ids)
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.index)
+
+    def gather(self, rows, fields):
+        """
+        Fetch fields for a batch of rows with one fancy index per column
+
+        Args:
+            rows: Catalog rows (-1 for ids that are not in the catalog)
+            fields: Field names to fetch
+
+        Returns:
+            dict of field -> numpy array aligned with rows
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        missing = rows < 0
+        has_missing = bool(missing.any())
+        safe_rows = np.where(missing, 0, rows) if has_missing else rows
+
+        gathered = {}
+        for field in fields:
+            column = self.columns[field]
+            if len(column) == 0:
+                values = np.full(len(rows), FIELD_DEFAULTS[field], dtype=column.dtype)
+            else:
+                values = column[safe_rows]
+                if has_missing:
+                    values[missing] = FIELD_DEFAULTS[field]
+            gathered[field] = values
+        return gathered
+
+    def lookup(self, anime_ids, fields):
+        """gather() by MAL_ID instead of row"""
+        return self.gather(self.index.rows(anime_ids), fields)
+
+
+def _truncate_synopsis(text):
+    if not text:
+        return ''
+    if len(text) <= SYNOPSIS_MAX_CHARS:
+        return text
+    return text[:SYNOPSIS_MAX_CHARS] + '...'
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value
+
+
+def _to_int(value):
+    value = _to_float(value)
+    return 0 if np.isnan(value) else int(value)
+
+
+def collect_catalog(sources=None):
+    """
+    Merge the CSV and JSON sources into catalog columns (nothing is written)
+
+    Every source is optional; fields come from the first source that has
+    them (anime.csv, then anime_with_synopsis.csv, then popular_animes.json).
+    Image URLs only exist in popular_animes.json.
+
+    Args:
+        sources: Optional dict overriding DEFAULT_SOURCES paths
+
+    Returns:
+        (manifest, anime_ids, strings, numeric) where strings maps each
+        STRING_FIELDS name to a list and numeric each NUMERIC_FIELDS name
+        to an array
+    """
+    sources = dict(DEFAULT_SOURCES, **(sources or {}))
+
+    records = {}
+
+    def fill(anime_id, field, value):
+        """Set a field unless an earlier source already provided it"""
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value in ('', 'Unknown'):
+            return
+        records.setdefault(int(anime_id), {}).setdefault(field, value)
+
+    if os.path.exists(sources['anime']):
+        import pandas as pd
+        # Score is also kept verbatim ('Unknown' included) as the SVD API's rating
+        anime = pd.read_csv(sources['anime'], dtype={'Score': str})
+        for col, field in [('Name', 'title'), ('Genres', 'genres'), ('Type', 'type'),
+                           ('Episodes', 'episodes'), ('Score', 'score')]:
+            if col in anime.columns:
+                for anime_id, value in zip(anime['MAL_ID'].tolist(), anime[col].tolist()):
+                    fill(anime_id, field, value)
+        if 'Score' in anime.columns:
+            for anime_id, value in zip(anime['MAL_ID'].tolist(), anime['Score'].tolist()):
+                if isinstance(value, str):
+                    records.setdefault(int(anime_id), {}).setdefault('rating', value)
+
+    if os.path.exists(sources['synopsis']):
+        import pandas as pd
+        synopsis = pd.read_csv(sources['synopsis'], dtype={'Score': str})
+        # Note: 'sypnopsis' is a typo in the CSV
+        for col, field in [('Name', 'title'), ('Genres', 'genres'), ('Score', 'score'),
+                           ('Score', 'rating'), ('sypnopsis', 'synopsis')]:
+            if col in synopsis.columns:
+                for anime_id, value in zip(synopsis['MAL_ID'].tolist(), synopsis[col].tolist()):
+                    fill(anime_id, field, value)
+
+    if os.path.exists(sources['popular']):
+        with open(sources['popular'], 'r', encoding='utf-8') as f:
+            popular_animes = json.load(f)
+        for anime in popular_animes:
+            for key, field in [('title', 'title'), ('genres', 'genres'), ('score', 'score'),
+                               ('episodes', 'episodes'), ('synopsis', 'synopsis'),
+                               ('image_url', 'image_url')]:
+                fill(anime['anime_id'], field, anime.get(key))
+            if anime.get('score') is not None:
+                fill(anime['anime_id'], 'rating', str(anime['score']))
+
+    anime_ids = np.array(sorted(records), dtype=np.int64)
+    strings = {}
+    for field in STRING_FIELDS:
+        values = []
+        for anime_id in anime_ids.tolist():
+            value = records[anime_id].get(field)
+            values.append(value if isinstance(value, str) else FIELD_DEFAULTS[field])
+        strings[field] = values
+    strings['synopsis'] = [_truncate_synopsis(text) for text in strings['synopsis']]
+
+    score = np.array([_to_float(records[a].get('score')) for a in anime_ids.tolist()], dtype=np.float64)
+    episodes = np.array([_to_int(records[a].get('episodes')) for a in anime_ids.tolist()], dtype=np.int32)
+
+    source_fingerprints = {
+        name: file_fingerprint(path) if os.path.exists(path) else None
+        for name, path in sources.items()
+    }
+    manifest = {
+        'catalog_version': CATALOG_VERSION,
+        'version': f"{CATALOG_VERSION}-{_sources_digest(source_fingerprints)}",
+        'n_animes': int(len(anime_ids)),
+        'sources': source_fingerprints
+    }
+    return manifest, anime_ids, strings, {'score': score, 'episodes': episodes}
+
+
+def write_catalog(collected, catalog_dir=None):
+    """
+    Write a collect_catalog() result and swap it in atomically
+
+    Raises:
+        OSError: When the catalog directory cannot be written
+    """
+    manifest, anime_ids, strings, numeric = collected
+    catalog_dir = os.path.abspath(catalog_dir or DEFAULT_CATALOG_DIR)
+
+    with replacing_directory(catalog_dir) as tmp_dir:
+        np.save(os.path.join(tmp_dir, 'anime_ids.npy'), anime_ids)
+        for field, values in numeric.items():
+            np.save(os.path.join(tmp_dir, f'{field}.npy'), values)
+        with open(os.path.join(tmp_dir, 'strings.json'), 'w', encoding='utf-8') as f:
+            json.dump(strings, f, ensure_ascii=False)
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def build_catalog(catalog_dir=None, sources=None):
+    """
+    Merge the CSV and JSON sources into the catalog store
+
+    Args:
+        catalog_dir: Output directory (default data/catalog)
+        sources: Optional dict overriding DEFAULT_SOURCES paths
+
+    Returns:
+        The manifest dict that was written
+    """
+    return write_catalog(collect_catalog(sources), catalog_dir)
+
+
+def _sources_digest(source_fingerprints):
+    """Short digest over the checksums of every source"""
+    digest = hashlib.sha1()
+    for name in sorted(source_fingerprints):
+        fingerprint = source_fingerprints[name]
+        digest.update(name.encode('utf-8'))
+        digest.update((fingerprint or {}).get('sha256', '-').encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def catalog_status(catalog_dir=None, sources=None):
+    """
+    Check whether the catalog can be served as-is
+
+    Returns:
+        (is_fresh, reason) tuple
+    """
+    sources = dict(DEFAULT_SOURCES, **(sources or {}))
+    manifest_path = os.path.join(catalog_dir or DEFAULT_CATALOG_DIR, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return False, 'missing'
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('catalog_version') != CATALOG_VERSION:
+        return False, 'catalog version changed'
+
+    recorded = manifest.get('sources', {})
+    for name, path in sources.items():
+        # A source that is not shipped with the deployment is trusted as built
+        if not os.path.exists(path):
+            continue
+        if not fingerprint_matches(path, recorded.get(name)):
+            return False, f'{os.path.basename(path)} changed'
+    return True, 'fresh'
+
+
+def load_catalog(catalog_dir=None, rebuild_stale=True):
+    """
+    Load the catalog store, rebuilding it first if it is missing or stale
+
+    Args:
+        catalog_dir: Catalog directory (default data/catalog)
+        rebuild_stale: Rebuild instead of raising when the catalog is stale.
+            When the directory is not writable the rebuilt catalog is kept
+            in memory.
+
+    Returns:
+        Catalog
+    """
+    catalog_dir = catalog_dir or DEFAULT_CATALOG_DIR
+
+    is_fresh, reason = catalog_status(catalog_dir)
+    if not is_fresh:
+        if not rebuild_stale:
+            raise RuntimeError(f'Catalog in {catalog_dir} is stale ({reason})')
+        collected = collect_catalog()
+        try:
+            write_catalog(collected, catalog_dir)
+        except OSError as e:
+            print(f'[catalog] cannot write {catalog_dir} ({e}); serving an in-memory catalog',
+                  file=sys.stderr)
+            manifest, anime_ids, strings, numeric = collected
+            columns = {field: np.array(values, dtype=object) for field, values in strings.items()}
+            columns.update(numeric)
+            return Catalog(manifest, anime_ids, columns)
+
+    with open(os.path.join(catalog_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(os.path.join(catalog_dir, 'strings.json'), 'r', encoding='utf-8') as f:
+        strings = json.load(f)
+
+    columns = {field: np.array(values, dtype=object) for field, values in strings.items()}
+    for field in NUMERIC_FIELDS:
+        columns[field] = np.load(os.path.join(catalog_dir, f'{field}.npy'))
+
+    return Catalog(manifest, np.load(os.path.join(catalog_dir, 'anime_ids.npy')), columns)
+
+
+def get_catalog():
+    """Process-level catalog handle: loaded on first use, then shared"""
+    global _catalog
+
+    if _catalog is not None:
+        return _catalog
+
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = load_catalog()
+    return _catalog
+
@@ -0,0 +1,238 @@
+"""
+Dataset statistics for rating_complete.csv in one counting pass
+
+The analysis scripts (analyze_dataset.py, analyze_subset_reason.py,
+calculate_training_size.py) all need the same numbers: per-user and
+per-anime rating counts, density, long-tail buckets and how much of the
+data the top-N-users / popular-anime training subset keeps. They are all
+derived from two bincount histograms accumulated chunk by chunk, so the
+ratings never have to fit in memory at once; only the training subset
+size needs a second (masked) pass once the histograms are known.
+
+Chunks come from the memory-mapped ratings store by default, or from
+csv_rating_chunks() to read a raw CSV directly.
+"""
+
+import json
+import numpy as np
+
+DEFAULT_TOP_USERS = 50000
+DEFAULT_TOP_ANIMES = 10510
+DEFAULT_MIN_ANIME_RATINGS = 100
+
+
+def csv_rating_chunks(source_path, chunksize=5_000_000):
+    """
+    Chunk source that streams a ratings CSV without the columnar store
+
+    Returns:
+        Zero-argument callable yielding (user_id, anime_id, rating) arrays
+    """
+    import pandas as pd
+
+    def chunks():
+        reader = pd.read_csv(
+            source_path, usecols=['user_id', 'anime_id', 'rating'],
+            dtype={'user_id': 'int32', 'anime_id': 'int32', 'rating': 'int8'},
+            chunksize=chunksize
+        )
+        for chunk in reader:
+            yield chunk['user_id'].to_numpy(), chunk['anime_id'].to_numpy(), chunk['rating'].to_numpy()
+
+    return chunks
+
+
+def _accumulate(counts, values):
+    """Add bincount(values) to counts, growing counts when new ids appear"""
+    if len(values) == 0:
+        return counts
+    chunk_counts = np.bincount(values, minlength=len(counts))
+    chunk_counts[:len(counts)] += counts
+    return chunk_counts
+
+
+def _top_rows(counts, n):
+    """Ids with the n largest positive counts (ties broken by lower id)"""
+    present = np.flatnonzero(counts)
+    order = np.argsort(-counts[present], kind='stable')
+    return present[order[:n]]
+
+
+def _share(part, total):
+    return part / total if total else 0.0
+
+
+def _count_summary(counts):
+    present = counts[counts > 0]
+    return {
+        'count': int(len(present)),
+        'mean': float(present.mean()) if len(present) else 0.0,
+        'median': float(np.median(present)) if len(present) else 0.0,
+        'max': int(present.max()) if len(present) else 0,
+        'under_10': int((present < 10).sum()),
+        'under_100': int((present < 100).sum()),
+        'at_least_1000': int((present >= 1000).sum())
+    }
+
+
+def compute_dataset_stats(chunks=None, top_users=DEFAULT_TOP_USERS,
+                          top_animes=DEFAULT_TOP_ANIMES,
+                          min_anime_ratings=DEFAULT_MIN_ANIME_RATINGS):
+    """
+    Compute every dataset statistic the analysis scripts report
+
+    Args:
+        chunks: Zero-argument callable yielding (user_id, anime_id, rating)
+                array chunks; called twice (default: ratings store chunks)
+        top_users: Size of the most-active-user subset used for training
+        top_animes: Size of the most-rated-anime subset in the subset report
+        min_anime_ratings: Minimum ratings for an anime to be trained on
+
+    Returns:
+        JSON-serializable dict
+    """
+    if chunks is None:
+        from lib.ratings_store import load_ratings
+        chunks = load_ratings().chunks
+
+    user_counts = np.zeros(0, dtype=np.int64)
+    anime_counts = np.zeros(0, dtype=np.int64)
+    rating_counts = np.zeros(0, dtype=np.int64)
+    rating_sum = 0
+
+    for user_id, anime_id, rating in chunks():
+        user_counts = _accumulate(user_counts, user_id)
+        anime_counts = _accumulate(anime_counts, anime_id)
+        rating_counts = _accumulate(rating_counts, rating)
+        rating_sum += int(rating.sum(dtype=np.int64))
+
+    n_ratings = int(user_counts.sum())
+    users = _count_summary(user_counts)
+    animes = _count_summary(anime_counts)
+
+    # Training subset: most active users x anime with enough ratings
+    top_user_ids = _top_rows(user_counts, top_users)
+    user_mask = np.zeros(len(user_counts), dtype=bool)
+    user_mask[top_user_ids] = True
+    anime_mask = anime_counts >= min_anime_ratings
+
+    subset_users = np.zeros(0, dtype=np.int64)
+    subset_animes = np.zeros(0, dtype=np.int64)
+    for user_id, anime_id, _ in chunks():
+        keep = user_mask[user_id] & anime_mask[anime_id]
+        subset_users = _accumulate(subset_users, user_id[keep])
+        subset_animes = _accumulate(subset_animes, anime_id[keep])
+    subset_ratings = int(subset_users.sum())
+
+    top_user_ratings = int(user_counts[top_user_ids].sum())
+    top_anime_ratings = int(anime_counts[_top_rows(anime_counts, top_animes)].sum())
+    full_elements = users['count'] * animes['count']
+    reduced_elements = top_users * top_animes
+
+    return {
+        'n_ratings': n_ratings,
+        'n_users': users['count'],
+        'n_animes': animes['count'],
+        'rating_mean': _share(rating_sum, n_ratings),
+        'density': _share(n_ratings, full_elements),
+        'rating_distribution': {
+            str(value): int(count) for value, count in enumerate(rating_counts) if count
+        },
+        'users': users,
+        'animes': animes,
+        'top_users': {
+            'n': top_users,
+            'ratings': top_user_ratings,
+            'share': _share(top_user_ratings, n_ratings),
+            'mean': _share(top_user_ratings, min(top_users, users['count']))
+        },
+        'top_animes': {
+            'n': top_animes,
+            'ratings': top_anime_ratings,
+            'share': _share(top_anime_ratings, n_ratings),
+            'mean': _share(top_anime_ratings, min(top_animes, animes['count']))
+        },
+        'training_subset': {
+            'max_users': top_users,
+            'min_anime_ratings': min_anime_ratings,
+            'n_ratings': subset_ratings,
+            'n_users': int(np.count_nonzero(subset_users)),
+            'n_animes': int(np.count_nonzero(subset_animes)),
+            'reduction': 1 - _share(subset_ratings, n_ratings)
+        },
+        'matrix': {
+            'full_elements': full_elements,
+            'reduced_elements': reduced_elements,
+            'reduction': 1 - _share(reduced_elements, full_elements),
+            'saved_gb_float64': (full_elements - reduced_elements) * 8 / 1024 / 1024 / 1024
+        }
+    }
+
+
+def save_stats_json(stats, path):
+    """Write the machine-readable report"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+
+def format_rating_summary(stats):
+    """Ratings section of dataset_stats.txt"""
+    return '\n'.join([
+        f"📊 평가 데이터 (rating_complete.csv)",
+        f"  - 총 평가 수 (rows): {stats['n_ratings']:,}",
+        f"  - 고유 사용자 수: {stats['n_users']:,}",
+        f"  - 고유 애니메이션 수: {stats['n_animes']:,}",
+        f"  - 평균 평점: {stats['rating_mean']:.2f}",
+        f"  - 데이터 밀도: {stats['density'] * 100:.4f}%"
+    ])
+
+
+def format_subset_analysis(stats):
+    """Report printed by analyze_subset_reason.py (subset_analysis.txt)"""
+    users, animes = stats['users'], stats['animes']
+    top_users, top_animes = stats['top_users'], stats['top_animes']
+    matrix = stats['matrix']
+
+    return '\n'.join([
+        "=== SVD 모델이 일부 데이터만 사용한 이유 ===",
+        "",
+        f"사용자별 평가 수 분포",
+        f"  - 상위 {top_users['n']:,}명의 평가 수: {top_users['ratings']:,}",
+        f"  - 전체 평가 수: {stats['n_ratings']:,}",
+        f"  - 상위 {top_users['n']:,}명이 차지하는 비율: {top_users['share'] * 100:.2f}%",
+        f"  - 평균 평가 수 (전체): {users['mean']:.1f}",
+        f"  - 평균 평가 수 (상위 {top_users['n']:,}명): {top_users['mean']:.1f}",
+        f"  - 중앙값 평가 수: {users['median']:.1f}",
+        "",
+        f"애니메이션별 평가 수 분포",
+        f"  - 상위 {top_animes['n']:,}개의 평가 수: {top_animes['ratings']:,}",
+        f"  - 전체 평가 수: {stats['n_ratings']:,}",
+        f"  - 상위 {top_animes['n']:,}개가 차지하는 비율: {top_animes['share'] * 100:.2f}%",
+        f"  - 평균 평가 수 (전체): {animes['mean']:.1f}",
+        f"  - 평균 평가 수 (상위 {top_animes['n']:,}개): {top_animes['mean']:.1f}",
+        f"  - 중앙값 평가 수: {animes['median']:.1f}",
+        "",
+        f"Long-tail 분석",
+        f"  - 평가 10개 미만 애니메이션: {animes['under_10']:,}개 ({_share(animes['under_10'], animes['count']) * 100:.1f}%)",
+        f"  - 평가 100개 미만 애니메이션: {animes['under_100']:,}개 ({_share(animes['under_100'], animes['count']) * 100:.1f}%)",
+        f"  - 평가 1000개 이상 애니메이션: {animes['at_least_1000']:,}개",
+        "",
+        f"  - 평가 10개 미만 사용자: {users['under_10']:,}명 ({_share(users['under_10'], users['count']) * 100:.1f}%)",
+        f"  - 평가 100개 미만 사용자: {users['under_100']:,}명 ({_share(users['under_100'], users['count']) * 100:.1f}%)",
+        "",
+        f"계산 복잡도 비교",
+        f"  - 전체 매트릭스 크기: {users['count']:,} x {animes['count']:,} = {matrix['full_elements']:,} elements",
+        f"  - 축소된 매트릭스 크기: {top_users['n']:,} x {top_animes['n']:,} = {matrix['reduced_elements']:,} elements",
+        f"  - 크기 감소 비율: {matrix['reduction'] * 100:.2f}%",
+        f"  - 메모리 절감 (float64 기준): {matrix['saved_gb_float64']:.2f} GB"
+    ])
+
+
+def format_training_size(stats):
+    """Report printed by calculate_training_size.py"""
+    subset = stats['training_subset']
+    return '\n'.join([
+        f"원본 평가 데이터: {stats['n_ratings']:,} rows",
+        f"학습 평가 데이터: {subset['n_ratings']:,} rows",
+        f"감소율: {subset['reduction'] * 100:.1f}%"
+    ])
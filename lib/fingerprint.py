@@ -0,0 +1,62 @@
+"""
+Source-file fingerprints used to detect stale build artifacts
+
+An artifact records the fingerprint of the file it was built from. When
+the size changes it is stale; when size and mtime match it is fresh; when
+only the mtime moved (fresh checkout, deploy copy) the content hash
+decides.
+"""
+
+import os
+import hashlib
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """sha256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, with_hash=True):
+    """
+    Describe a source file for an artifact manifest
+
+    Args:
+        path: Source file path
+        with_hash: Also store the sha256 of the content
+
+    Returns:
+        dict with size, mtime and (optionally) sha256
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    if with_hash:
+        fingerprint['sha256'] = file_sha256(path)
+    return fingerprint
+
+
+def fingerprint_matches(path, recorded):
+    """
+    Check whether a source file still matches a recorded fingerprint
+
+    Args:
+        path: Source file path
+        recorded: dict written by file_fingerprint()
+
+    Returns:
+        True when the file is unchanged
+    """
+    if not recorded:
+        return False
+
+    stat = os.stat(path)
+    if stat.st_size != recorded.get('size'):
+        return False
+    if stat.st_mtime == recorded.get('mtime'):
+        return True
+    if 'sha256' not in recorded:
+        return False
+    return file_sha256(path) == recorded['sha256']
@@ -0,0 +1,148 @@
+"""
+Self-hosted HTTP server for the Vercel-style request handlers in api/
+
+On Vercel every api/*.py module only defines a `handler` class
+(BaseHTTPRequestHandler) and the platform runs it. serve() runs the same
+class as a long-lived process:
+
+- connections are handled by a bounded ThreadPoolExecutor; when all
+  workers are busy and max_pending connections are waiting, the accept
+  loop blocks and further clients queue in the listen backlog, or, with
+  reject_when_full, are answered 503 + Retry-After right away
+- all threads share the process-level model handles (get_svd_model,
+  load_data_and_model, get_catalog), which are read-only after loading
+- the socket is bound first, then warm_up() runs while server.ready is
+  unset; readiness probes and recommendation requests get 503 until the
+  models are loaded (handlers check is_ready())
+- request_accepted_at() gives handlers the time their connection was
+  accepted, so request deadlines include the time spent waiting for a thread
+"""
+
+import sys
+import time
+import threading
+from http.server import HTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_PENDING = 64
+
+_OVERLOADED_BODY = b'{"error": "Server busy, try again shortly"}'
+_OVERLOADED_RESPONSE = (
+    b'HTTP/1.0 503 Service Unavailable\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'Content-Length: ' + str(len(_OVERLOADED_BODY)).encode() + b'\r\n\r\n' + _OVERLOADED_BODY
+)
+
+_local = threading.local()
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands every connection to a bounded thread pool"""
+
+    daemon_threads = True
+    # Bursts must not overflow the listen backlog (clients would see resets)
+    request_queue_size = 128
+
+    def __init__(self, address, handler_class, max_workers=8, max_pending=DEFAULT_MAX_PENDING,
+                 reject_when_full=False, on_reject=None):
+        super().__init__(address, handler_class)
+        self.max_workers = int(max_workers)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='http')
+        # Connections accepted but not finished (running + waiting for a worker)
+        self._slots = threading.BoundedSemaphore(self.max_workers + int(max_pending))
+        self.reject_when_full = reject_when_full
+        self.on_reject = on_reject
+        # Rejections read the request and answer off the accept thread
+        self._reject_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='http-reject')
+        self.ready = threading.Event()
+
+    def process_request(self, request, client_address):
+        if not self.reject_when_full:
+            self._slots.acquire()
+        elif not self._slots.acquire(blocking=False):
+            if self.on_reject is not None:
+                self.on_reject()
+            self._reject_pool.submit(self._reject, request)
+            return
+
+        accepted_at = time.perf_counter()
+        try:
+            self.pool.submit(self._process, request, client_address, accepted_at)
+        except RuntimeError:
+            # Pool already shut down
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _process(self, request, client_address, accepted_at):
+        _local.accepted_at = accepted_at
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            _local.accepted_at = None
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def _reject(self, request):
+        try:
+            # Consume the request first so closing does not reset the connection
+            request.settimeout(1.0)
+            request.recv(65536)
+            request.sendall(_OVERLOADED_RESPONSE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        self._reject_pool.shutdown(wait=True)
+
+
+def request_accepted_at():
+    """perf_counter time the current thread's connection was accepted (None outside serve())"""
+    return getattr(_local, 'accepted_at', None)
+
+
+def is_ready(server):
+    """Readiness of the server running a handler; platforms without the flag count as ready"""
+    ready = getattr(server, 'ready', None)
+    return ready is None or ready.is_set()
+
+
+def serve(handler_class, host='0.0.0.0', port=8000, warm_up=None,
+          max_workers=8, max_pending=DEFAULT_MAX_PENDING, reject_when_full=False, on_reject=None):
+    """
+    Run handler_class until interrupted
+
+    Args:
+        handler_class: BaseHTTPRequestHandler subclass (e.g. api.recommend.handler)
+        host, port: Address to bind
+        warm_up: Optional callable run before the server reports ready
+        max_workers: Threads serving requests
+        max_pending: Accepted connections allowed to wait for a free thread
+        reject_when_full: Answer 503 immediately instead of blocking the accept loop
+        on_reject: Optional callable run for every such rejection (metrics)
+    """
+    server = PooledHTTPServer((host, port), handler_class, max_workers, max_pending,
+                              reject_when_full, on_reject)
+    thread = threading.Thread(target=server.serve_forever, name='http-accept', daemon=True)
+    thread.start()
+    print(f'Listening on http://{host}:{server.server_address[1]} '
+          f'({max_workers} threads, warming up)', file=sys.stderr)
+
+    try:
+        if warm_up is not None:
+            warm_up()
+        server.ready.set()
+        print('Ready', file=sys.stderr)
+        thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,168 @@
+"""
+Hybrid Collaborative + Content Recommendation System
+
+Blends SVD item-factor similarity (lib/recommender.py) with TF-IDF synopsis
+similarity (lib/synopsis_recommender.py) in one scoring pass.
+
+Both representations are loaded once and aligned on the TF-IDF corpus id
+index: every corpus row gets its unit-normalized SVD item vector, or a zero
+vector when the anime is missing from the SVD model (fewer than 100
+ratings). The blend is then a single masked expression, so those anime fall
+back to their content score without any per-item branching.
+"""
+
+import threading
+import numpy as np
+
+from lib.ranking import top_n_rows
+from lib.svd_model import get_svd_model
+from lib.recommender import score_candidates
+from lib.synopsis_recommender import load_data_and_model, score_content, build_result_rows
+from lib.result_cache import recommendation_cache
+from lib.singleflight import recommendation_flights
+
+DEFAULT_CONTENT_WEIGHT = 0.5
+DEFAULT_COLLABORATIVE_WEIGHT = 0.5
+
+# Cache for aligned hybrid models, keyed by SVD model path
+_hybrid_models = {}
+_hybrid_lock = threading.Lock()
+
+
+def load_hybrid_model(model_path=None):
+    """
+    Load both engines and align the SVD factors to the TF-IDF rows
+
+    Cached per SVD model path and rebuilt when a new SVD artifact is loaded.
+
+    Args:
+        model_path: SVD model directory or legacy .pkl (default data/svd_model)
+
+    Returns:
+        dict with catalog, tfidf_matrix, index, cf_factors (n_docs x k,
+        zero rows where has_cf is False), has_cf and version
+    """
+    svd_model = get_svd_model(model_path)
+
+    hybrid = _hybrid_models.get(svd_model.path)
+    if hybrid is not None and hybrid['svd_version'] == svd_model.version:
+        return hybrid
+
+    with _hybrid_lock:
+        hybrid = _hybrid_models.get(svd_model.path)
+        if hybrid is not None and hybrid['svd_version'] == svd_model.version:
+            return hybrid
+
+        catalog, content_model, _ = load_data_and_model()
+        index = content_model['index']
+
+        # TF-IDF row -> SVD column, -1 when the anime has no latent factors
+        svd_rows = svd_model.index.rows(index.ids)
+        has_cf = svd_rows >= 0
+
+        cf_factors = np.zeros((len(index), svd_model.k), dtype=np.float64)
+        cf_factors[has_cf] = svd_model.item_factors[svd_rows[has_cf]]
+
+        hybrid = {
+            'catalog': catalog,
+            'tfidf_matrix': content_model['tfidf_matrix'],
+            'index': index,
+            'cf_factors': cf_factors,
+            'has_cf': has_cf,
+            'svd_version': svd_model.version,
+            'version': (content_model['version'], svd_model.version, catalog.version)
+        }
+        _hybrid_models[svd_model.path] = hybrid
+
+    return hybrid
+
+
+def score_hybrid(hybrid, selected_rows, content_weight, collaborative_weight):
+    """
+    Blended mean similarity between the selected rows and every corpus row
+
+    content = mean TF-IDF cosine over all selections
+    collaborative = mean SVD cosine over the selections that have factors
+    score = w_c * content + w_cf * collaborative   where the candidate has factors
+          = content                                 otherwise
+    (weights normalized to sum to 1)
+
+    Returns:
+        numpy array of scores, one per corpus row
+    """
+    content = score_content(hybrid['tfidf_matrix'], selected_rows)
+
+    cf_selected = selected_rows[hybrid['has_cf'][selected_rows]]
+    total_weight = content_weight + collaborative_weight
+    if len(cf_selected) == 0 or collaborative_weight <= 0 or total_weight <= 0:
+        return content
+
+    collaborative = score_candidates(hybrid['cf_factors'], cf_selected)
+    blended = (content_weight * content + collaborative_weight * collaborative) / total_weight
+    return np.where(hybrid['has_cf'], blended, content)
+
+
+def get_hybrid_recommendations(selected_anime_ids, top_n=30,
+                               content_weight=DEFAULT_CONTENT_WEIGHT,
+                               collaborative_weight=DEFAULT_COLLABORATIVE_WEIGHT,
+                               model_path=None, use_cache=True):
+    """
+    Get recommendations from blended synopsis and rating similarity
+
+    Args:
+        selected_anime_ids: List of MAL_IDs user selected
+        top_n: Number of recommendations to return (default 30)
+        content_weight: Weight of TF-IDF synopsis similarity
+        collaborative_weight: Weight of SVD item-factor similarity
+        model_path: SVD model directory or legacy .pkl (default data/svd_model)
+        use_cache: Serve repeated selections from the shared result cache
+
+    Returns:
+        List of recommended anime (same format as get_synopsis_recommendations)
+    """
+
+    hybrid = load_hybrid_model(model_path)
+    selected_rows = hybrid['index'].valid_rows(selected_anime_ids)
+
+    if not use_cache:
+        return _compute_hybrid_recommendations(
+            hybrid, selected_rows, top_n, content_weight, collaborative_weight
+        )
+
+    cache_key = recommendation_cache.make_key(
+        'hybrid', hybrid['index'].ids_of(selected_rows), top_n,
+        content_weight=float(content_weight),
+        collaborative_weight=float(collaborative_weight),
+        model_path=model_path
+    )
+    cached = recommendation_cache.get(cache_key, hybrid['version'])
+    if cached is not None:
+        return cached
+
+    def compute():
+        result = _compute_hybrid_recommendations(
+            hybrid, selected_rows, top_n, content_weight, collaborative_weight
+        )
+        recommendation_cache.put(cache_key, hybrid['version'], result)
+        return result
+
+    # Concurrent identical requests share one computation
+    recommendations, shared = recommendation_flights.do((cache_key, hybrid['version']), compute)
+    return [dict(rec) for rec in recommendations] if shared else recommendations
+
+
+def _compute_hybrid_recommendations(hybrid, selected_rows, top_n,
+                                    content_weight, collaborative_weight):
+    """Uncached body of get_hybrid_recommendations (selected_rows: resolved rows)"""
+    if len(selected_rows) == 0:
+        return []
+
+    scores = score_hybrid(hybrid, selected_rows, content_weight, collaborative_weight)
+
+    exclude_mask = np.zeros(len(scores), dtype=bool)
+    exclude_mask[selected_rows] = True
+    top_rows = top_n_rows(scores, top_n, exclude_mask)
+
+    return build_result_rows(
+        hybrid['catalog'], hybrid['index'].ids_of(top_rows), scores[top_rows]
+    )
@@ -0,0 +1,142 @@
+"""
+id <-> row index shared by the recommenders
+
+Built once next to a model from its id vector. Lookups use a sorted copy
+of the ids with searchsorted, so a whole batch of ids resolves in one
+vectorized call and no per-request dict or list scan is needed.
+
+Request ids are validated rather than cast: 7, 7.0 and '7' mean anime 7,
+but 1.5, 'x' or None are rejected instead of being truncated to some
+other anime.
+"""
+
+import numpy as np
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _coerce_one(value):
+    """int value of one id, or None when it is not an integral number"""
+    if isinstance(value, (bool, np.bool_)):
+        return None
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+    elif isinstance(value, (float, np.floating)):
+        if not float(value).is_integer():
+            return None
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            return None
+    else:
+        return None
+    return value if _INT64_MIN <= value <= _INT64_MAX else None
+
+
+def _as_flat_array(values):
+    if isinstance(values, np.ndarray):
+        return values.ravel()
+    values = list(values)
+    arr = np.asarray(values)
+    if arr.dtype.kind not in 'iuf':
+        # Keep every id's own type (np.asarray turns [1.0, '5'] into strings)
+        arr = np.empty(len(values), dtype=object)
+        arr[:] = values
+    return arr.ravel()
+
+
+def coerce_ids(values):
+    """
+    Convert ids to int64 without guessing
+
+    Args:
+        values: Iterable of ids (ints, integral floats, integer strings)
+
+    Returns:
+        (ids, valid): flat int64 array (0 where invalid) and a boolean mask
+        that is False for every id that is not an integral number
+    """
+    arr = _as_flat_array(values)
+
+    # Plain int / float arrays convert in one step; anything else goes per id
+    if arr.dtype.kind in 'iu':
+        return arr.astype(np.int64), np.ones(arr.shape, dtype=bool)
+    if arr.dtype.kind == 'f':
+        valid = np.isfinite(arr) & (arr == np.floor(arr)) & (np.abs(arr) < 2.0 ** 63)
+        return np.where(valid, arr, 0).astype(np.int64), valid
+
+    coerced = [_coerce_one(value) for value in arr.tolist()]
+    valid = np.array([value is not None for value in coerced], dtype=bool)
+    ids = np.array([0 if value is None else value for value in coerced], dtype=np.int64)
+    return ids, valid
+
+
+def parse_ids(values):
+    """
+    Validated int64 ids
+
+    Raises:
+        ValueError: When any id is not an integral number (e.g. 1.5, 'x')
+    """
+    arr = _as_flat_array(values)
+    ids, valid = coerce_ids(arr)
+    if not valid.all():
+        raise ValueError(f'invalid anime ids: {arr[~valid].tolist()[:10]}')
+    return ids
+
+
+class IdIndex:
+    """Maps MAL_IDs to model rows and back"""
+
+    def __init__(self, ids):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self._order = np.argsort(self.ids, kind='stable')
+        self._sorted_ids = self.ids[self._order]
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def __contains__(self, anime_id):
+        return self.row(anime_id) >= 0
+
+    def rows(self, ids):
+        """
+        Resolve a batch of ids to rows
+
+        Args:
+            ids: Iterable of MAL_IDs
+
+        Returns:
+            numpy int array of rows, -1 where the id is not in the index
+
+        Raises:
+            ValueError: When an id is not an integral number (see parse_ids)
+        """
+        ids = parse_ids(ids)
+        if len(self._sorted_ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.intp)
+
+        pos = np.searchsorted(self._sorted_ids, ids)
+        pos = np.minimum(pos, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == ids
+        return np.where(found, self._order[pos], -1).astype(np.intp)
+
+    def row(self, anime_id):
+        """Row of a single id, or -1 when it is not in the index"""
+        return int(self.rows([anime_id])[0])
+
+    def valid_rows(self, ids):
+        """
+        Rows of the ids that exist in the index, in input order
+
+        Returns:
+            numpy int array of rows (unknown ids are dropped)
+        """
+        rows = self.rows(ids)
+        return rows[rows >= 0]
+
+    def ids_of(self, rows):
+        """Row -> id for a batch of rows"""
+        return self.ids[np.asarray(rows, dtype=np.intp)]
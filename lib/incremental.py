@@ -0,0 +1,363 @@
+"""
+Incremental fold-in of new ratings into an existing SVD model
+
+A daily delta (same columns as rating_complete.csv, new ratings only) is
+applied without retraining:
+
+A rating replaces any earlier rating of the same (user, anime) pair: a
+pair repeated within the delta keeps its last rating (as in training), and
+a pair rated before is re-rated rather than counted twice.
+
+1. Users. Every user in the delta gets a new row of U projected onto the
+   existing Vt / sigma basis; unknown user_ids are appended.
+   - mean_mode 'dense' (scripts/1_prepare_data.py): u sigma = (r - m) Vt^T is
+     linear in the rating row r, so a rating is an exact update of the
+     stored U and user_ratings_mean by (new - previous rating). Previous
+     ratings come from the folded_log_*.npy of earlier fold-ins, else from
+     the ratings store for the users and anime the model was trained on.
+   - mean_mode 'observed' (scripts/1_train_als.py): new users get the same
+     ridge solve as ALS; existing users are re-solved on the delta with their
+     current vector as the prior. Their earlier ratings are only present
+     through that prior, so a re-rated pair enters the solve once, with its
+     new value.
+
+2. Items. Folded-in ratings are kept in the artifact as pending_*.npy.
+   Once enough accumulate (or on request) every touched item column is
+   re-solved against the current user vectors, anchored to its old column;
+   anime that were not in the model get new columns. U, sigma, Vt are then
+   re-orthonormalized with to_svd_form().
+
+Each run writes a new artifact version, and the work done is proportional
+to the delta plus one pass over U and Vt to save them; dense models also
+scan the memory-mapped rating columns once to find previous ratings. The
+full 57M-rating history is never refit.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from lib.id_index import IdIndex
+from lib.svd_model import load_svd_model, save_svd_model
+from lib.als import to_svd_form, DEFAULT_REG
+from lib.training import last_occurrences
+
+DEFAULT_REFRESH_THRESHOLD = 100000
+DEFAULT_ANCHOR = 10.0
+
+PENDING_ARRAYS = ('pending_user_ids', 'pending_anime_ids', 'pending_ratings')
+# Every rating folded in since training (last value per pair), kept until
+# the next retrain so later re-ratings can replace them
+FOLDED_ARRAYS = ('folded_log_user_ids', 'folded_log_anime_ids', 'folded_log_ratings')
+
+# Manifest keys save_svd_model() computes itself
+_DERIVED_MANIFEST_KEYS = ('format_version', 'version', 'k', 'n_animes', 'n_users')
+
+
+def read_rating_delta(path):
+    """
+    Read a delta CSV with user_id, anime_id, rating columns
+
+    Returns:
+        (user_ids, anime_ids, ratings) numpy arrays
+    """
+    import pandas as pd
+
+    delta = pd.read_csv(
+        path, usecols=['user_id', 'anime_id', 'rating'],
+        dtype={'user_id': 'int64', 'anime_id': 'int64', 'rating': 'float64'}
+    )
+    return delta['user_id'].to_numpy(), delta['anime_id'].to_numpy(), delta['rating'].to_numpy()
+
+
+def latest_ratings(user_ids, anime_ids, ratings):
+    """Keep the last rating of every (user, anime) pair, in input order"""
+    if len(ratings) == 0:
+        return user_ids, anime_ids, ratings
+    keep = last_occurrences(user_ids, anime_ids, int(anime_ids.max()) + 1)
+    return user_ids[keep], anime_ids[keep], ratings[keep]
+
+
+def _pair_keys(user_ids, anime_ids):
+    return (np.asarray(user_ids, dtype=np.int64) << 32) | np.asarray(anime_ids, dtype=np.int64)
+
+
+def previous_ratings(user_ids, anime_ids, sources):
+    """
+    Latest earlier rating of every (user, anime) pair
+
+    Args:
+        user_ids, anime_ids: The pairs to look up (no repeats)
+        sources: Iterable of (user_ids, anime_ids, ratings) chunks, oldest
+            first (e.g. RatingsColumns.chunks()); later chunks win
+
+    Returns:
+        float64 array, NaN where the pair was never rated
+    """
+    previous = np.full(len(user_ids), np.nan)
+    if len(user_ids) == 0:
+        return previous
+
+    keys = _pair_keys(user_ids, anime_ids)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    for chunk_users, chunk_animes, chunk_ratings in sources:
+        chunk_keys = _pair_keys(chunk_users, chunk_animes)
+        pos = np.minimum(np.searchsorted(sorted_keys, chunk_keys), len(sorted_keys) - 1)
+        hits = np.flatnonzero(sorted_keys[pos] == chunk_keys)
+        if len(hits) == 0:
+            continue
+        # Repeated pairs inside a chunk: the last one wins, as in training
+        _, first_from_end = np.unique(pos[hits][::-1], return_index=True)
+        hits = hits[len(hits) - 1 - first_from_end]
+        previous[order[pos[hits]]] = np.asarray(chunk_ratings)[hits]
+    return previous
+
+
+def _ridge_by_group(groups, n_groups, features, targets, lam, prior):
+    """
+    Solve one ridge system per group
+
+        (F_g^T F_g + lam_g I) x_g = F_g^T y_g + lam_g prior_g
+
+    Args:
+        groups: Group index of every observation
+        features: (n_obs x k) feature row of every observation
+        targets: (n_obs,) value of every observation
+        lam: (n_groups,) regularization weight
+        prior: (n_groups x k) vector each solution is pulled toward
+
+    Returns:
+        (n_groups x k) solutions
+    """
+    k = features.shape[1]
+    order = np.argsort(groups, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(groups, minlength=n_groups))])
+
+    A = np.empty((n_groups, k, k))
+    b = np.empty((n_groups, k))
+    eye = np.eye(k)
+    for g in range(n_groups):
+        obs = order[bounds[g]:bounds[g + 1]]
+        F = features[obs]
+        A[g] = F.T @ F + lam[g] * eye
+        b[g] = F.T @ targets[obs] + lam[g] * prior[g]
+
+    return np.linalg.solve(A, b[:, :, None])[:, :, 0]
+
+
+def fold_in_dense(U, means, sigma, Vt, user_rows, cols, ratings):
+    """
+    Exact fold-in for dense-mean models, updating U and means in place
+
+    With S = r Vt^T and m = sum(r) / n_animes the stored row is
+    u sigma = S - m (Vt 1), so S is recovered from (u, m) and rating
+    changes simply add to S and m.
+
+    Args:
+        ratings: Change of every (user, col) entry, i.e. the new rating
+            minus the previous one (0 when unrated). Pairs must not repeat.
+    """
+    affected, groups = np.unique(user_rows, return_inverse=True)
+    n_animes = Vt.shape[1]
+
+    delta = csr_matrix((ratings, (groups, cols)), shape=(len(affected), n_animes))
+    delta_S = np.asarray(delta @ Vt.T)
+    delta_sum = np.asarray(delta.sum(axis=1)).ravel()
+
+    vt_sum = np.asarray(Vt.sum(axis=1))
+    old_means = means[affected]
+    S = U[affected] * sigma + old_means[:, None] * vt_sum
+
+    new_means = old_means + delta_sum / n_animes
+    U[affected] = (S + delta_S - new_means[:, None] * vt_sum) / sigma
+    means[affected] = new_means
+
+
+def fold_in_observed(U, means, sigma, Vt, user_rows, cols, ratings, is_new, reg, anchor):
+    """
+    Ridge fold-in for observed-mean (ALS) models, updating U and means in place
+
+    New users: mean of their ratings, prior 0 with weight reg * n (as in ALS).
+    Existing users: unchanged mean, prior = current row with weight anchor.
+    Pairs must not repeat (see latest_ratings).
+    """
+    affected, groups = np.unique(user_rows, return_inverse=True)
+    new_user = is_new[affected]
+
+    counts = np.bincount(groups, minlength=len(affected))
+    sums = np.bincount(groups, weights=ratings, minlength=len(affected))
+    means[affected[new_user]] = sums[new_user] / counts[new_user]
+
+    lam = np.where(new_user, reg * counts, anchor)
+    prior = np.where(new_user[:, None], 0.0, U[affected])
+
+    item_factors = np.asarray(Vt[:, cols]).T * sigma
+    U[affected] = _ridge_by_group(
+        groups, len(affected), item_factors, ratings - means[user_rows], lam, prior
+    )
+
+
+def refresh_items(U, means, sigma, Vt, anime_ids, user_rows, item_ids, ratings, anchor):
+    """
+    Re-solve the item columns touched by pending ratings
+
+    Known columns are pulled toward their current value, unknown anime
+    start from zero and are appended.
+
+    Returns:
+        (Vt, anime_ids) with updated and appended columns
+    """
+    index = IdIndex(anime_ids)
+    touched, groups = np.unique(item_ids, return_inverse=True)
+    touched_cols = index.rows(touched)
+
+    new_ids = touched[touched_cols < 0]
+    Vt = np.concatenate([Vt, np.zeros((Vt.shape[0], len(new_ids)))], axis=1)
+    anime_ids = np.concatenate([anime_ids, new_ids])
+    touched_cols[touched_cols < 0] = np.arange(len(anime_ids) - len(new_ids), len(anime_ids))
+
+    lam = np.full(len(touched), float(anchor))
+    Vt[:, touched_cols] = _ridge_by_group(
+        groups, len(touched), U[user_rows] * sigma, ratings - means[user_rows],
+        lam, Vt[:, touched_cols].T
+    ).T
+    return Vt, anime_ids
+
+
+def apply_rating_delta(model_path, user_ids, anime_ids, ratings, refresh=None,
+                       refresh_threshold=DEFAULT_REFRESH_THRESHOLD, anchor=DEFAULT_ANCHOR,
+                       output_path=None, history=None):
+    """
+    Fold a batch of new ratings into a model artifact and save a new version
+
+    Args:
+        model_path: Artifact directory with U / user_ratings_mean / user_ids
+        user_ids, anime_ids, ratings: The new ratings; a pair that was rated
+                 before is replaced, not added
+        refresh: Force (True) or skip (False) the item refresh; by default it
+                 runs once refresh_threshold pending ratings have accumulated
+        refresh_threshold: Pending ratings that trigger the item refresh
+        anchor: Weight pulling refreshed vectors toward their previous value
+        output_path: Where to write the new artifact (default: replace model_path)
+        history: Ratings the model was trained on, as a RatingsColumns-like
+                 object with chunks() (default: lib.ratings_store.load_ratings(),
+                 only read for dense models)
+
+    Returns:
+        The manifest dict that was written
+    """
+    model = load_svd_model(model_path)
+    U = model.load_optional('U')
+    means = model.load_optional('user_ratings_mean')
+    known_user_ids = model.load_optional('user_ids')
+    if U is None or means is None or known_user_ids is None:
+        raise ValueError(f'{model.path} has no user factors to fold ratings into; retrain it first')
+
+    mean_mode = model.manifest.get('mean_mode', 'dense')
+    reg = model.manifest.get('reg', DEFAULT_REG)
+    sigma = np.asarray(model.sigma, dtype=np.float64)
+    Vt = np.array(model.Vt, dtype=np.float64)
+    item_ids = np.asarray(model.anime_ids, dtype=np.int64)
+
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    anime_ids = np.asarray(anime_ids, dtype=np.int64)
+    ratings = np.asarray(ratings, dtype=np.float64)
+    user_ids, anime_ids, ratings = latest_ratings(user_ids, anime_ids, ratings)
+
+    # Rows and columns the model was trained on; fold-ins append after them
+    n_trained_users = model.manifest.get('trained_users', len(known_user_ids))
+    n_trained_animes = model.manifest.get('trained_animes', len(item_ids))
+    folded = [model.load_optional(name) for name in FOLDED_ARRAYS]
+    if folded[0] is None:
+        folded = [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)]
+
+    # Append rows for users the model has never seen
+    unseen = np.unique(user_ids[IdIndex(known_user_ids).rows(user_ids) < 0])
+    n_known = len(known_user_ids)
+    U = np.concatenate([np.asarray(U, dtype=np.float64), np.zeros((len(unseen), len(sigma)))])
+    means = np.concatenate([np.asarray(means, dtype=np.float64), np.zeros(len(unseen))])
+    all_user_ids = np.concatenate([np.asarray(known_user_ids, dtype=np.int64), unseen])
+    user_index = IdIndex(all_user_ids)
+
+    # Users are projected on the anime the model already has
+    user_rows = user_index.rows(user_ids)
+    cols = model.index.rows(anime_ids)
+    known = cols >= 0
+    if known.any():
+        if mean_mode == 'dense':
+            # Trained pairs are in the rating history, later ones in the folded log
+            previous = np.zeros(len(ratings))
+            trained = known & (user_rows < n_trained_users) & (cols < n_trained_animes)
+            if trained.any():
+                if history is None:
+                    from lib.ratings_store import load_ratings
+                    history = load_ratings()
+                found = previous_ratings(user_ids[trained], anime_ids[trained], history.chunks())
+                previous[trained] = np.nan_to_num(found)
+            found = previous_ratings(user_ids, anime_ids, [folded])
+            previous = np.where(np.isnan(found), previous, found)
+
+            fold_in_dense(U, means, sigma, Vt, user_rows[known], cols[known],
+                          (ratings - previous)[known])
+        else:
+            is_new = np.arange(len(all_user_ids)) >= n_known
+            fold_in_observed(U, means, sigma, Vt, user_rows[known], cols[known], ratings[known],
+                             is_new, reg, anchor)
+
+    pending = [model.load_optional(name) for name in PENDING_ARRAYS]
+    if pending[0] is None:
+        pending = [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)]
+    # A re-rated pair enters the item refresh once, with its latest rating
+    pending_user_ids, pending_anime_ids, pending_ratings = latest_ratings(
+        np.concatenate([pending[0], user_ids]),
+        np.concatenate([pending[1], anime_ids]),
+        np.concatenate([pending[2], ratings])
+    )
+    folded = latest_ratings(
+        np.concatenate([folded[0], user_ids]),
+        np.concatenate([folded[1], anime_ids]),
+        np.concatenate([folded[2], ratings])
+    )
+
+    if refresh is None:
+        refresh = len(pending_ratings) >= refresh_threshold
+    refresh = bool(refresh) and len(pending_ratings) > 0
+
+    if refresh:
+        Vt, item_ids = refresh_items(
+            U, means, sigma, Vt, item_ids, user_index.rows(pending_user_ids),
+            pending_anime_ids, pending_ratings, anchor
+        )
+        # Back to orthonormal U / Vt with the same predictions
+        U, sigma, Vt = to_svd_form(U * sigma, Vt.T)
+        pending_user_ids = pending_anime_ids = pending_ratings = None
+
+    extra_manifest = {
+        key: value for key, value in model.manifest.items()
+        if key not in _DERIVED_MANIFEST_KEYS
+    }
+    extra_manifest.update({
+        'mean_mode': mean_mode,
+        'parent_version': model.version,
+        'trained_users': int(n_trained_users),
+        'trained_animes': int(n_trained_animes),
+        'folded_ratings': extra_manifest.get('folded_ratings', 0) + len(ratings),
+        'pending_ratings': 0 if pending_ratings is None else len(pending_ratings),
+        'items_refreshed': refresh
+    })
+
+    extra_arrays = dict(zip(FOLDED_ARRAYS, folded))
+    if pending_ratings is not None:
+        extra_arrays.update(zip(PENDING_ARRAYS, (pending_user_ids, pending_anime_ids, pending_ratings)))
+
+    return save_svd_model(
+        output_path or model.path,
+        Vt=Vt,
+        sigma=sigma,
+        anime_ids=item_ids,
+        U=U,
+        user_ratings_mean=means,
+        user_ids=all_user_ids,
+        extra_manifest=extra_manifest,
+        extra_arrays=extra_arrays
+    )
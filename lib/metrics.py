@@ -0,0 +1,231 @@
+"""
+Per-stage latency histograms and opt-in request traces
+
+Request handling is split into named stages (id lookup, similarity,
+ranking, metadata join, serialization, ...). Code marks a stage with
+
+    with stage('synopsis', 'similarity'):
+        ...
+
+which feeds an in-process histogram per (engine, stage). render_prometheus()
+returns every histogram plus the result cache, single-flight and admission
+counters in the Prometheus text exposition format (GET /metrics in
+api/recommend.py).
+
+Tracing is opt-in per request: between start_trace() and end_trace() the
+stages of the current thread are also collected, and server_timing()
+formats them as a Server-Timing header value.
+
+RECOMMENDER_METRICS=0 turns the histograms off. A stage outside a trace
+then costs one flag check and one context-variable lookup, and returns a
+shared no-op context manager.
+"""
+
+import os
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import nullcontext
+
+# Upper bounds in seconds; the last bucket (+Inf) is implicit
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+_enabled = os.environ.get('RECOMMENDER_METRICS', '1').lower() not in ('0', 'false', 'no', 'off')
+_trace = contextvars.ContextVar('recommender_trace', default=None)
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with fixed buckets"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """(cumulative counts per bucket incl. +Inf, sum, count)"""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = []
+        running = 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per label combination"""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, histogram in children:
+            labels = ','.join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)
+            )
+            cumulative, total, count = histogram.snapshot()
+            for bound, n in zip(self.buckets + (float('inf'),), cumulative):
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {n}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+stage_seconds = HistogramFamily(
+    'recommender_stage_seconds', 'Time spent in each request stage', ('engine', 'stage')
+)
+request_seconds = HistogramFamily(
+    'recommender_request_seconds', 'End-to-end API request time', ('endpoint', 'status')
+)
+
+
+class _StageTimer:
+    __slots__ = ('engine', 'name', 'trace', 'start')
+
+    def __init__(self, engine, name, trace):
+        self.engine = engine
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if _enabled:
+            stage_seconds.labels(self.engine, self.name).observe(elapsed)
+        if self.trace is not None:
+            self.trace.append((self.name, elapsed))
+        return False
+
+
+def stage(engine, name):
+    """Context manager timing one stage (no-op unless metrics or a trace are on)"""
+    trace = _trace.get()
+    if not _enabled and trace is None:
+        return _NOOP
+    return _StageTimer(engine, name, trace)
+
+
+def observe_request(endpoint, status, seconds):
+    """Record one finished API request"""
+    if _enabled:
+        request_seconds.labels(endpoint, str(status)).observe(seconds)
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def set_metrics_enabled(enabled):
+    """Turn histogram collection on or off at runtime"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def start_trace():
+    """Collect the current thread's stages until end_trace(token)"""
+    return _trace.set([])
+
+
+def end_trace(token):
+    """
+    Stop collecting
+
+    Returns:
+        List of (stage, seconds) in completion order
+    """
+    trace = _trace.get()
+    _trace.reset(token)
+    return trace or []
+
+
+def server_timing(trace):
+    """Format a trace as a Server-Timing header value (ms, repeated stages summed)"""
+    totals = {}
+    for name, seconds in trace:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in totals.items())
+
+
+def _counter_lines(name, help_text, value, kind='counter'):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value!r}']
+
+
+def render_prometheus():
+    """All metrics in Prometheus text exposition format (version 0.0.4)"""
+    from lib.result_cache import recommendation_cache
+    from lib.singleflight import recommendation_flights
+    from lib.admission import admission_controller
+
+    lines = stage_seconds.render() + request_seconds.render()
+
+    cache = recommendation_cache.stats()
+    lines += _counter_lines('recommender_cache_hits_total', 'Result cache hits', cache['hits'])
+    lines += _counter_lines('recommender_cache_misses_total', 'Result cache misses', cache['misses'])
+    lines += _counter_lines('recommender_cache_evictions_total', 'Result cache evictions', cache['evictions'])
+    lines += _counter_lines('recommender_cache_entries', 'Result cache size', cache['size'], 'gauge')
+
+    flights = recommendation_flights.stats()
+    lines += _counter_lines('recommender_singleflight_leaders_total',
+                            'Computations started by single flight', flights['leaders'])
+    lines += _counter_lines('recommender_singleflight_coalesced_total',
+                            'Requests that waited on an identical in-flight computation',
+                            flights['coalesced'])
+    lines += _counter_lines('recommender_singleflight_failures_total',
+                            'Single-flight computations that raised', flights['failures'])
+    lines += _counter_lines('recommender_singleflight_in_flight',
+                            'Computations currently running', flights['in_flight'], 'gauge')
+
+    admission = admission_controller.stats()
+    lines += _counter_lines('recommender_admission_admitted_total',
+                            'Requests given a compute slot', admission['admitted'])
+    lines += _counter_lines('recommender_admission_rejected_total',
+                            'Requests rejected with 503 because the queue was full', admission['rejected'])
+    lines += _counter_lines('recommender_admission_timed_out_total',
+                            'Requests that left the queue at their deadline', admission['timed_out'])
+    lines += _counter_lines('recommender_admission_active', 'Requests computing', admission['active'], 'gauge')
+    lines += _counter_lines('recommender_admission_waiting', 'Requests waiting for a slot',
+                            admission['waiting'], 'gauge')
+    lines += ['# HELP recommender_degraded_total Requests answered from a cheaper path, by source',
+              '# TYPE recommender_degraded_total counter']
+    lines += [f'recommender_degraded_total{{source="{_escape(source)}"}} {n}'
+              for source, n in sorted(admission['degraded'].items())]
+    return '\n'.join(lines) + '\n'
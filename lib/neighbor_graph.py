@@ -0,0 +1,161 @@
+"""
+Top-K item neighbor graph
+
+For every row of an L2-normalized item matrix (TF-IDF rows, SVD item
+factors, ...) keep only its K most similar rows and store the result as a
+sparse CSR graph: row i holds the similarities of its K neighbors. The
+corpus is processed in row blocks, so the dense n x n similarity matrix
+is never materialized; peak memory is O(block_size x n + n x K).
+
+Pearson neighbors are cosine neighbors of mean-centered rows, so
+normalize_rows() prepares dense embeddings (SVD item factors) for either
+metric and the same builder serves both.
+"""
+
+import os
+import json
+import numpy as np
+from scipy import sparse
+
+
+def normalize_rows(matrix, metric='cosine'):
+    """
+    Rows of a dense matrix scaled so that dot products equal the metric
+
+    Args:
+        matrix: (n x d) dense array
+        metric: 'cosine' (L2-normalize) or 'pearson' (center each row, then L2-normalize)
+
+    Returns:
+        (n x d) float64 array; all-zero (or constant, for pearson) rows stay zero
+    """
+    if metric not in ('cosine', 'pearson'):
+        raise ValueError(f"Unknown metric {metric!r}; expected 'cosine' or 'pearson'")
+
+    rows = np.array(matrix, dtype=np.float64)
+    if metric == 'pearson':
+        rows -= rows.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return rows / norms
+
+
+def build_topk_neighbors(matrix, k, block_size=1024, exclude_self=True):
+    """
+    Compute the top-k cosine neighbors of every row, block by block
+
+    Args:
+        matrix: (n x d) sparse or dense matrix with L2-normalized rows
+        k: Number of neighbors kept per row
+        block_size: Rows scored per block
+        exclude_self: Do not list a row as its own neighbor
+
+    Returns:
+        scipy.sparse.csr_matrix (n x n, float32) with k entries per row
+    """
+    n = matrix.shape[0]
+    k = min(int(k), n - 1 if exclude_self else n)
+    if k <= 0:
+        return sparse.csr_matrix((n, n), dtype=np.float32)
+
+    matrix_t = matrix.T.tocsc() if sparse.issparse(matrix) else np.asarray(matrix).T
+
+    neighbor_rows = np.empty((n, k), dtype=np.int32)
+    neighbor_sims = np.empty((n, k), dtype=np.float32)
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        sims = matrix[start:end] @ matrix_t
+        sims = sims.toarray() if sparse.issparse(sims) else np.asarray(sims)
+        sims = sims.astype(np.float32, copy=False)
+
+        if exclude_self:
+            sims[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        neighbor_rows[start:end] = top
+        neighbor_sims[start:end] = np.take_along_axis(sims, top, axis=1)
+
+    indptr = np.arange(0, n * k + 1, k, dtype=np.int64)
+    graph = sparse.csr_matrix(
+        (neighbor_sims.ravel(), neighbor_rows.ravel(), indptr), shape=(n, n)
+    )
+    graph.sort_indices()
+    return graph
+
+
+def save_neighbor_graph(path, graph, meta):
+    """
+    Write the graph as <path> (.npz) plus a <path>.json sidecar
+
+    Args:
+        path: Output .npz path
+        graph: CSR graph from build_topk_neighbors()
+        meta: dict describing the graph (k, version of the source artifact, ...)
+    """
+    sparse.save_npz(path, graph)
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_neighbor_graph(path, expected_version=None, expected_metric=None):
+    """
+    Load a neighbor graph
+
+    Args:
+        path: .npz path written by save_neighbor_graph()
+        expected_version: When given, the graph is only returned if it was
+            built from this version of the source artifact
+        expected_metric: When given, the graph is only returned if its
+            similarities are of this metric (graphs without one are cosine)
+
+    Returns:
+        (graph, meta) tuple, or (None, None) when missing or stale
+    """
+    meta_path = path + '.json'
+    if not os.path.exists(path) or not os.path.exists(meta_path):
+        return None, None
+
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if expected_version is not None and meta.get('source_version') != expected_version:
+        return None, None
+    if expected_metric is not None and meta.get('metric', 'cosine') != expected_metric:
+        return None, None
+
+    return sparse.load_npz(path).tocsr(), meta
+
+
+def row_neighbors(graph, row):
+    """
+    Neighbor list of one row, most similar first
+
+    Returns:
+        (neighbor_rows, similarities) numpy arrays
+    """
+    start, end = graph.indptr[row], graph.indptr[row + 1]
+    neighbors = graph.indices[start:end]
+    sims = graph.data[start:end]
+    order = np.lexsort((neighbors, -sims))
+    return neighbors[order], sims[order]
+
+
+def aggregate_neighbor_scores(graph, rows):
+    """
+    Mean neighbor similarity of the given rows, over their neighbor lists only
+
+    A candidate missing from some neighbor lists counts as similarity 0 for
+    those rows, so this approximates the mean cosine of exact scoring from
+    below. Cost depends on len(rows) x K, not on the catalog size.
+
+    Args:
+        graph: CSR neighbor graph
+        rows: Row indices of the selected items
+
+    Returns:
+        (candidate_rows, scores) numpy arrays
+    """
+    sub = graph[rows]
+    candidate_rows, inverse = np.unique(sub.indices, return_inverse=True)
+    scores = np.bincount(inverse, weights=sub.data, minlength=len(candidate_rows))
+    return candidate_rows, scores / max(len(rows), 1)
@@ -0,0 +1,91 @@
+"""
+Ranking helpers shared by the recommenders
+
+Scores for the whole catalog are computed as one vector, so picking the
+winners only needs a partial selection (argpartition) over that vector
+instead of sorting every candidate.
+"""
+
+import numpy as np
+
+
+def top_n_rows(scores, top_n, exclude_mask=None):
+    """
+    Return the row indices of the top_n highest scores, best first
+
+    Args:
+        scores: 1-D array of scores for every catalog row
+        top_n: Number of rows to return
+        exclude_mask: Optional boolean array, True for rows that must not be returned
+
+    Returns:
+        numpy int array of row indices sorted by descending score
+        (ties keep catalog order, like a stable sort)
+    """
+    scores = np.asarray(scores)
+
+    if exclude_mask is not None:
+        candidates = np.flatnonzero(~exclude_mask)
+        candidate_scores = scores[candidates]
+    else:
+        candidates = None
+        candidate_scores = scores
+
+    n = min(int(top_n), candidate_scores.shape[0])
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if n < candidate_scores.shape[0]:
+        part = np.argpartition(-candidate_scores, n - 1)[:n]
+        # argpartition breaks ties at the cut arbitrarily; take the
+        # earliest rows among those tied with the n-th score instead
+        threshold = candidate_scores[part].min()
+        above = np.flatnonzero(candidate_scores > threshold)
+        tied = np.flatnonzero(candidate_scores == threshold)[:n - len(above)]
+        part = np.concatenate([above, tied])
+    else:
+        part = np.arange(candidate_scores.shape[0])
+
+    # Descending score; ties keep their original catalog order
+    order = part[np.lexsort((part, -candidate_scores[part]))]
+
+    if candidates is not None:
+        return candidates[order]
+    return order
+
+
+def top_n_per_row(scores, top_n):
+    """
+    Top top_n columns of every row of a 2-D score block, best first
+
+    Args:
+        scores: (n_rows x n_cols) score array
+        top_n: Number of columns to keep per row
+
+    Returns:
+        (cols, values), both (n_rows x min(top_n, n_cols)); every row is
+        what top_n_rows() returns for it: descending score, ties in column
+        order, and the earliest columns kept among those tied at the cut
+    """
+    scores = np.asarray(scores)
+    n = min(int(top_n), scores.shape[1])
+    if n <= 0:
+        empty = np.empty((scores.shape[0], 0), dtype=np.intp)
+        return empty, scores[:, :0]
+
+    if n < scores.shape[1]:
+        part = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        # Same cut as top_n_rows: everything above the n-th score, then the
+        # earliest columns tied with it
+        threshold = np.take_along_axis(scores, part, axis=1).min(axis=1, keepdims=True)
+        above = scores > threshold
+        tied = scores == threshold
+        room = n - above.sum(axis=1, keepdims=True)
+        keep = above | (tied & (np.cumsum(tied, axis=1) <= room))
+        part = np.nonzero(keep)[1].reshape(scores.shape[0], n)
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+
+    values = np.take_along_axis(scores, part, axis=1)
+    order = np.lexsort((part, -values))
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(values, order, axis=1)
@@ -1,110 +1,256 @@
 import sys
+import os
 import json
-import pickle
 import numpy as np
-from scipy.spatial.distance import cosine
 
-def get_recommendations(selected_anime_ids, top_n=30, model_path=None):
+# lib/recommender.py를 스크립트로 직접 실행해도 lib 패키지를 import 할 수 있도록
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from lib.ranking import top_n_rows
+from lib.neighbor_graph import aggregate_neighbor_scores
+from lib.ann_index import DEFAULT_NPROBE
+from lib.svd_model import get_svd_model
+from lib.catalog import get_catalog
+from lib.result_cache import recommendation_cache
+from lib.singleflight import recommendation_flights
+from lib.metrics import stage
+
+
+def score_candidates(item_factors, selected_rows):
+    """
+    선택한 애니들과 모든 애니 사이의 평균 코사인 유사도
+
+    Args:
+        item_factors: 단위 벡터로 정규화한 아이템 행렬 (SVDModel.item_factors)
+        selected_rows: 유효한 선택 애니의 행 인덱스 배열
+
+    Returns:
+        애니 수 길이의 점수 배열 (선택 애니 수로 나눈 평균)
+    """
+    similarities = item_factors[selected_rows] @ item_factors.T
+    return similarities.mean(axis=0)
+
+
+def get_recommendations(selected_anime_ids, top_n=30, model_path=None, use_cache=True, mode='exact',
+                        nprobe=DEFAULT_NPROBE):
     """
     선택한 애니메이션 기반 추천
     
     Args:
         selected_anime_ids: 사용자가 선택한 애니메이션 ID 리스트 [1, 5, 20, 50, 100]
         top_n: 추천할 애니메이션 개수 (기본 30개)
-        model_path: 모델 파일 경로 (선택 사항)
+        model_path: 모델 디렉터리 또는 기존 .pkl 파일 경로 (선택 사항)
+        use_cache: 같은 선택 조합이면 결과 캐시에서 바로 반환 (기본 True)
+        mode: 'exact'는 모든 애니와 코사인 유사도 계산, 'neighbors'는 미리 계산한
+            Top-K 이웃 목록만 합산 (비용이 애니 수가 아니라 K에 비례),
+            'ann'은 IVF 인덱스에서 가까운 nprobe개 클러스터만 계산.
+            현재 모델 버전의 이웃 그래프/인덱스가 없으면 'exact'로 계산
+        nprobe: 'ann' 모드에서 탐색할 클러스터 수 (클수록 정확, 느림)
     
     Returns:
         추천 애니메이션 리스트
     """
     
-    # 모델 로드
-    if model_path is None:
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, '..', 'data', 'svd_model.pkl')
-    
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    
-    U = model['U']
-    sigma = model['sigma']
-    Vt = model['Vt']
-    anime_ids = model['anime_ids']
-    anime_info = model['anime_info']
-    
-    # popular_animes.json 로드 (이미지 URL을 위해)
-    import os
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    popular_animes_path = os.path.join(current_dir, '..', 'data', 'popular_animes.json')
-    
-    anime_images = {}
-    if os.path.exists(popular_animes_path):
-        with open(popular_animes_path, 'r', encoding='utf-8') as f:
-            popular_animes = json.load(f)
-            for anime in popular_animes:
-                anime_images[anime['anime_id']] = anime.get('image_url', '')
-    
-    # 추천 점수 저장
-    recommendations = {}
-    
-    valid_selected_count = 0
-    for anime_id in selected_anime_ids:
-        if anime_id not in anime_ids:
-            continue
-        
-        valid_selected_count += 1
-        anime_idx = anime_ids.index(anime_id)
-        
-        # 해당 애니메이션의 latent vector
-        anime_vector = Vt[:, anime_idx]
+    # 모델과 카탈로그 로드 (프로세스당 한 번만 로드하고 요청 간에 공유)
+    model = get_svd_model(model_path)
+    catalog = get_catalog()
+    
+    # 유효한 선택 애니의 행 인덱스 (id index로 한 번에 조회, 정수가 아닌 id는 ValueError)
+    with stage('svd', 'lookup'):
+        selected_rows = model.index.valid_rows(selected_anime_ids)
+    
+    if not use_cache:
+        return _compute_recommendations(model, catalog, selected_rows, top_n, mode, nprobe)
+    
+    # 같은 선택 조합(순서 무관, 없는 id 제외)이고 모델/카탈로그 버전이 같으면 캐시 결과 사용
+    cache_key = recommendation_cache.make_key(
+        'svd', model.index.ids_of(selected_rows), top_n, model_path=model.path, mode=mode,
+        nprobe=int(nprobe) if mode == 'ann' else None
+    )
+    cache_version = (model.version, catalog.version)
+    cached = recommendation_cache.get(cache_key, cache_version)
+    if cached is not None:
+        return cached
+    
+    def compute():
+        result = _compute_recommendations(model, catalog, selected_rows, top_n, mode, nprobe)
+        recommendation_cache.put(cache_key, cache_version, result)
+        return result
+    
+    # 같은 조합이 계산 중이면 새로 계산하지 않고 그 결과를 기다려 공유 (실패는 공유 후 버림)
+    result, shared = recommendation_flights.do((cache_key, cache_version), compute)
+    return [dict(rec) for rec in result] if shared else result
+
+
+def _compute_recommendations(model, catalog, selected_rows, top_n, mode='exact',
+                             nprobe=DEFAULT_NPROBE):
+    """캐시를 거치지 않는 get_recommendations 본문 (selected_rows: 유효한 선택 애니의 행)"""
+    
+    if len(selected_rows) == 0:
+        return []
+    
+    if mode == 'neighbors' and model.neighbors is not None:
+        # 선택 애니들의 이웃 목록만 합산 (목록에 없는 후보는 유사도 0)
+        with stage('svd', 'neighbors'):
+            candidate_rows, candidate_scores = aggregate_neighbor_scores(model.neighbors, selected_rows)
+            order = top_n_rows(candidate_scores, top_n, np.isin(candidate_rows, selected_rows))
+            top_ids, top_scores = model.index.ids_of(candidate_rows[order]), candidate_scores[order]
+    elif mode == 'ann' and model.ann_index is not None:
+        # 평균 코사인 = 선택 애니 단위 벡터들의 평균과의 내적이므로 질의 벡터 하나로 검색
+        with stage('svd', 'ann'):
+            query = model.item_factors[selected_rows].mean(axis=0)
+            top_rows, top_scores = model.ann_index.search(query, top_n, nprobe, exclude_rows=selected_rows)
+            top_ids = model.index.ids_of(top_rows)
+    else:
+        # 모든 후보 점수를 행렬곱 한 번으로 계산 (선택 애니 기준 평균 코사인 유사도)
+        with stage('svd', 'similarity'):
+            scores = score_candidates(model.item_factors, selected_rows)
         
-        # 모든 애니메이션과 코사인 유사도 계산
-        for i, other_anime_id in enumerate(anime_ids):
-            if other_anime_id in selected_anime_ids:
-                continue
+        with stage('svd', 'ranking'):
+            # 선택한 애니는 추천 대상에서 제외
+            exclude_mask = np.zeros(model.n_animes, dtype=bool)
+            exclude_mask[selected_rows] = True
             
-            other_vector = Vt[:, i]
-            
-            # 코사인 유사도
-            similarity = 1 - cosine(anime_vector, other_vector)
-            
-            # 누적 점수
-            if other_anime_id in recommendations:
-                recommendations[other_anime_id] += similarity
-            else:
-                recommendations[other_anime_id] = similarity
-    
-    # 점수 정규화 (평균)
-    if valid_selected_count > 0:
-        for anime_id in recommendations:
-            recommendations[anime_id] /= valid_selected_count
-    
-    # 점수 높은 순으로 정렬
-    sorted_recs = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:top_n]
-    
-    # 애니메이션 정보 추가
-    result = []
-    for anime_id, score in sorted_recs:
-        if anime_id in anime_info:
-            info = anime_info[anime_id]
-            result.append({
-                'anime_id': int(anime_id),
-                'title': info.get('Name', 'Unknown'),
-                'genre': info.get('Genres', ''),
-                'type': info.get('Type', ''),
-                'episodes': int(info.get('Episodes', 0)) if info.get('Episodes') else 0,
-                'rating': info.get('Score', ''),
-                'image_url': anime_images.get(anime_id, ''),
-                'match_score': float(score)
-            })
-    
-    return result
+            # 전체 정렬 대신 부분 선택으로 Top N 추출
+            top_rows = top_n_rows(scores, top_n, exclude_mask)
+            top_ids, top_scores = model.index.ids_of(top_rows), scores[top_rows]
+    
+    with stage('svd', 'metadata'):
+        return build_recommendation_rows(catalog, top_ids, top_scores)
+
+
+def build_recommendation_rows(catalog, anime_ids, values, value_key='match_score'):
+    """
+    추천 결과 행 생성 (카탈로그에 없는 애니는 제외)
+
+    Args:
+        catalog: Catalog (lib/catalog.py)
+        anime_ids: 순위대로 정렬된 애니 ID 배열
+        values: 각 애니의 점수 배열
+        value_key: 점수를 담을 키 ('match_score' 또는 'predicted_rating')
+    """
+    anime_ids = np.asarray(anime_ids)
+    values = np.asarray(values)
+    
+    # 카탈로그에 있는 애니만 결과에 포함
+    catalog_rows = catalog.index.rows(anime_ids)
+    in_catalog = catalog_rows >= 0
+    
+    # 애니메이션 정보 추가 (필요한 컬럼만 한 번에 gather)
+    info = catalog.gather(catalog_rows[in_catalog], ['title', 'genres', 'type', 'episodes', 'rating', 'image_url'])
+    return [
+        {
+            'anime_id': anime_id,
+            'title': title,
+            'genre': genre,
+            'type': anime_type,
+            'episodes': episodes,
+            'rating': rating,
+            'image_url': image_url,
+            value_key: value
+        }
+        for anime_id, title, genre, anime_type, episodes, rating, image_url, value in zip(
+            anime_ids[in_catalog].tolist(),
+            info['title'].tolist(),
+            info['genres'].tolist(),
+            info['type'].tolist(),
+            info['episodes'].tolist(),
+            info['rating'].tolist(),
+            info['image_url'].tolist(),
+            values[in_catalog].tolist()
+        )
+    ]
+
+
+def project_user(model, rated_rows, ratings):
+    """
+    사용자의 평점을 잠재 공간으로 투영 (fold-in)
+
+    학습 때와 같은 방식으로 평균을 빼고 투영하므로 예측 평점은
+    mean + p @ Vt 로 계산됩니다.
+      - mean_mode 'dense' (1_prepare_data.py): 평가하지 않은 애니를 0점으로 본 전체 평균,
+        p = r Vt^T - mean * (Vt 1)
+      - mean_mode 'observed' (1_train_als.py): 평가한 애니의 평균, ALS와 같은 ridge 해
+
+    Args:
+        model: SVDModel
+        rated_rows: 평가한 애니의 Vt 열 인덱스 배열 (중복 없음)
+        ratings: 각 애니의 평점 배열
+
+    Returns:
+        (p, mean): sigma를 곱한 사용자 벡터 (k,)와 사용자 평균
+    """
+    ratings = np.asarray(ratings, dtype=np.float64)
+    rated_factors = np.asarray(model.Vt[:, rated_rows], dtype=np.float64)
+    
+    if model.manifest.get('mean_mode', 'dense') == 'dense':
+        mean = ratings.sum() / model.n_animes
+        p = rated_factors @ ratings - mean * np.asarray(model.Vt.sum(axis=1))
+        return p, mean
+    
+    mean = ratings.mean()
+    reg = model.manifest.get('reg', 0.1)
+    Y = rated_factors.T * model.sigma
+    u = np.linalg.solve(Y.T @ Y + reg * len(ratings) * np.eye(model.k), Y.T @ (ratings - mean))
+    return u * model.sigma, mean
+
+
+def recommend_for_user(rating_pairs, top_n=30, model_path=None):
+    """
+    사용자가 매긴 평점 기반 개인화 추천 (예측 평점 Top N)
+    
+    전체 사용자 x 애니 예측 행렬(U·Σ·Vt)을 만들지 않고, 이 사용자의 평점만
+    잠재 공간으로 투영한 뒤 k차원 벡터와 Vt의 곱 한 번으로 모든 애니의 평점을 예측합니다.
+    
+    Args:
+        rating_pairs: (anime_id, rating) 쌍 리스트 [(1, 9), (5, 7), ...]
+        top_n: 추천할 애니메이션 개수 (기본 30개)
+        model_path: 모델 디렉터리 또는 기존 .pkl 파일 경로 (선택 사항)
+    
+    Returns:
+        추천 애니메이션 리스트 (get_recommendations와 같은 형식, match_score 대신 predicted_rating)
+    """
+    model = get_svd_model(model_path)
+    catalog = get_catalog()
+    
+    # 같은 애니가 여러 번 있으면 마지막 평점 사용, 모델에 없는 애니는 무시
+    latest = {int(anime_id): float(rating) for anime_id, rating in rating_pairs}
+    rows = model.index.rows(list(latest.keys()))
+    valid = rows >= 0
+    if not valid.any():
+        return []
+    
+    rated_rows = rows[valid]
+    ratings = np.fromiter(latest.values(), dtype=np.float64, count=len(latest))[valid]
+    
+    p, mean = project_user(model, rated_rows, ratings)
+    predictions = p @ model.Vt + mean
+    
+    # 이미 평가한 애니는 추천 대상에서 제외
+    exclude_mask = np.zeros(model.n_animes, dtype=bool)
+    exclude_mask[rated_rows] = True
+    top_rows = top_n_rows(predictions, top_n, exclude_mask)
+    
+    return build_recommendation_rows(
+        catalog, model.index.ids_of(top_rows), predictions[top_rows], value_key='predicted_rating'
+    )
 
 if __name__ == '__main__':
+    # 상주 워커 모드: 모델을 한 번만 로드하고 NDJSON 요청을 계속 처리 (lib/worker.py)
+    if '--worker' in sys.argv:
+        from lib.worker import run_worker
+        run_worker(sys.argv[1:], default_engine='svd')
     # CLI에서 실행할 경우
-    if len(sys.argv) > 1:
+    elif len(sys.argv) > 1:
         selected_ids = json.loads(sys.argv[1])
-        recommendations = get_recommendations(selected_ids)
+        # [[anime_id, rating], ...] 형태면 평점 기반 개인화 추천
+        if selected_ids and isinstance(selected_ids[0], list):
+            recommendations = recommend_for_user(selected_ids)
+        else:
+            recommendations = get_recommendations(selected_ids)
         print(json.dumps(recommendations, ensure_ascii=False))
     else:
         # 테스트
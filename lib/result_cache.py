@@ -0,0 +1,133 @@
+"""
+LRU cache for recommendation results
+
+The API always asks for 5 anime and top_n=30, and popular picks repeat a
+lot, so identical selections are answered from memory. Entries are keyed
+on (engine, sorted selection tuple, top_n, options) and tagged with the
+version of the model artifacts they were computed from; an entry built
+from an older artifact is treated as a miss and dropped.
+
+Size and TTL come from RECOMMENDATION_CACHE_SIZE (default 1024, 0
+disables caching) and RECOMMENDATION_CACHE_TTL (seconds, default none).
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """Thread-safe bounded LRU cache with optional TTL and hit/miss counters"""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(engine, resolved_ids, top_n, **options):
+        """
+        Canonical key: selection order does not matter
+
+        Args:
+            resolved_ids: Ids the engine's IdIndex resolved (unknown ids
+                already dropped, repeats kept), so selections that score
+                the same share one entry
+        """
+        selection = tuple(sorted(int(anime_id) for anime_id in resolved_ids))
+        return (engine, selection, int(top_n), tuple(sorted(options.items())))
+
+    def get(self, key, version):
+        """
+        Look up a result computed from the given artifact version
+
+        Returns:
+            A copy of the cached result list, or None on a miss
+        """
+        if self.maxsize <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_version, stored_at, result = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return [dict(rec) for rec in result]
+
+    def peek(self, key, version):
+        """Like get() but without touching LRU order or counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        if self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+            return None
+        return [dict(rec) for rec in entry[2]]
+
+    def put(self, key, version, result):
+        """Store a copy of result, evicting the least recently used entry if full"""
+        if self.maxsize <= 0:
+            return
+
+        stored = [dict(rec) for rec in result]
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), stored)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+def _ttl_from_env():
+    ttl = os.environ.get('RECOMMENDATION_CACHE_TTL')
+    return float(ttl) if ttl else None
+
+
+# Shared by both engines in this process
+recommendation_cache = RecommendationCache(
+    maxsize=int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 1024)),
+    ttl=_ttl_from_env()
+)
@@ -0,0 +1,70 @@
+"""
+numpy arrays in multiprocessing.shared_memory for process-pool jobs
+
+The parent copies its arrays into shared segments once (SharedArrays) and
+passes the small `specs` dict to the pool initializer (attach_shared);
+every worker then sees the same memory through `shared[name]`, so block
+tasks only pickle row ranges, never the arrays themselves.
+"""
+
+import numpy as np
+from multiprocessing import shared_memory, util
+
+# Worker-side views of the shared arrays, filled by attach_shared()
+shared = {}
+_segments = []
+
+
+class SharedArrays:
+    """Parent-side owner of a set of shared arrays; use as a context manager"""
+
+    def __init__(self, arrays):
+        self.segments = []
+        self.views = {}
+        self.specs = {}
+        try:
+            for name, array in arrays.items():
+                array = np.asarray(array)
+                segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.segments.append(segment)
+                self.views[name] = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+                self.views[name][...] = array
+                self.specs[name] = (segment.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def __getitem__(self, name):
+        return self.views[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Views must be released before their segments can be closed
+        self.views.clear()
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+
+def attach_shared(specs):
+    """Pool initializer: map every shared segment as a numpy array"""
+    # Runs when the worker process exits (atexit is skipped there)
+    util.Finalize(None, detach_shared, exitpriority=10)
+    for name, (segment_name, shape, dtype) in specs.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _segments.append(segment)
+        shared[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+
+
+def detach_shared():
+    """Drop the worker-side views and close their segments"""
+    shared.clear()
+    for segment in _segments:
+        segment.close()
+    _segments.clear()
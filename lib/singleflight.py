@@ -0,0 +1,103 @@
+"""
+In-flight request coalescing ("single flight")
+
+The result cache (lib/result_cache.py) only helps once a result exists.
+When a popular selection trends, many identical requests arrive while the
+first one is still computing and would all miss the cache. SingleFlight
+lets the first caller for a key (the leader) run the computation while
+every concurrent caller with the same key waits for it and receives the
+same result.
+
+Failures are never stored: the key is released before waiters are woken,
+so the waiters of a failed flight get the leader's exception and the next
+request for the key starts a fresh computation.
+"""
+
+import threading
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe per-key call deduplication with counters"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() once per key among concurrent callers
+
+        Args:
+            key: Hashable request key (include the artifact version)
+            fn: Zero-argument callable computing the result
+
+        Returns:
+            (result, shared) where shared is True for callers that waited on
+            another caller's computation (the result object is the leader's;
+            copy it before mutating)
+
+        Raises:
+            Whatever fn() raised, in the leader and in every waiter
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.leaders += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            # Release the key first so that nothing, a failure included,
+            # outlives this flight
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result, False
+
+    def stats(self):
+        """Counters: leaders computed, requests coalesced onto them, failed flights"""
+        with self._lock:
+            requests = self.leaders + self.coalesced
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'coalesced_rate': self.coalesced / requests if requests else 0.0,
+                'failures': self.failures
+            }
+
+
+# Shared by all engines in this process
+recommendation_flights = SingleFlight()
@@ -0,0 +1,342 @@
+"""
+On-disk SVD model artifact and the process-level model handle
+
+Layout of data/svd_model/ (written by scripts/1_prepare_data.py or
+scripts/1_train_als.py):
+
+    manifest.json          format version, model version, shapes, trainer
+                           ('svd' or 'als') and mean_mode: user_ratings_mean
+                           averages over all anime ('dense') or only the
+                           rated ones ('observed')
+    Vt.npy                 item latent factors (k x n_animes)
+    sigma.npy              singular values (k,)
+    anime_ids.npy          MAL_ID of every Vt column
+    U.npy                  user latent factors        (optional, never read when serving)
+    user_ratings_mean.npy  per-user rating mean       (optional, never read when serving)
+    user_ids.npy           user_id of every U row     (optional, never read when serving)
+    pending_*.npy          ratings folded into U but not yet into Vt
+                           (optional, written by lib/incremental.py)
+    folded_log_*.npy       every rating folded in since training, last value
+                           per pair (optional, written by lib/incremental.py)
+    neighbors.npz (+.json) top-K cosine item neighbor graph (optional, written
+                           by scripts/8_build_item_neighbors.py)
+    neighbors_pearson.npz  the same with Pearson correlations (+.json;
+                           optional, for analysis only, never served)
+    ann_ivf/               IVF index over the item factors (optional, written
+                           by scripts/9_build_ann_index.py)
+
+The .npy arrays are memory-mapped, so loading the model only touches the
+pages that scoring actually reads. get_svd_model() re-checks the manifest
+mtime on every call and reloads when a new artifact was swapped in. The
+legacy data/svd_model.pkl is still accepted when the directory does not
+exist. Titles, genres and images live in the shared catalog store
+(lib/catalog.py), not in the model.
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+import numpy as np
+
+from lib.artifact_dir import replacing_directory
+from lib.id_index import IdIndex
+from lib.neighbor_graph import load_neighbor_graph
+from lib.ann_index import load_ivf_index
+
+MODEL_FORMAT_VERSION = 1
+NEIGHBOR_GRAPH_FILE = 'neighbors.npz'
+# Metric of the graph served as mode='neighbors' (match_score is a cosine)
+SERVED_NEIGHBOR_METRIC = 'cosine'
+ANN_INDEX_DIR = 'ann_ivf'
+# Built by separate scripts; kept when the model is rewritten (their loaders
+# check source_version, so they only apply to the version they were built for)
+OPTIONAL_ENTRIES = (
+    NEIGHBOR_GRAPH_FILE, NEIGHBOR_GRAPH_FILE + '.json',
+    'neighbors_pearson.npz', 'neighbors_pearson.npz.json', ANN_INDEX_DIR
+)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_DIR = os.path.join(current_dir, '..', 'data', 'svd_model')
+LEGACY_MODEL_PATH = os.path.join(current_dir, '..', 'data', 'svd_model.pkl')
+
+# Process-level cache: resolved model path -> SVDModel
+_models = {}
+_models_lock = threading.Lock()
+
+
+class SVDModel:
+    """Read-only handle over a loaded SVD model, shared across requests"""
+
+    def __init__(self, path, manifest, Vt, sigma, anime_ids, stamp=None):
+        self.path = path
+        self.stamp = stamp
+        self.manifest = manifest
+        self.version = manifest.get('version', '')
+        self.Vt = Vt
+        self.sigma = sigma
+        self.anime_ids = anime_ids
+        self.index = IdIndex(anime_ids)
+        self._item_factors = None
+        self._neighbors = None
+        self._neighbors_loaded = False
+        self._ann_index = None
+        self._ann_loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def n_animes(self):
+        return self.Vt.shape[1]
+
+    @property
+    def k(self):
+        return self.Vt.shape[0]
+
+    @property
+    def item_factors(self):
+        """Unit-normalized item matrix (n_animes x k), computed once per process"""
+        if self._item_factors is None:
+            with self._lock:
+                if self._item_factors is None:
+                    self._item_factors = normalize_item_factors(self.Vt)
+        return self._item_factors
+
+    @property
+    def neighbors(self):
+        """Top-K item neighbor graph built for this model version, or None"""
+        if not self._neighbors_loaded:
+            with self._lock:
+                if not self._neighbors_loaded:
+                    if os.path.isdir(self.path):
+                        self._neighbors, _ = load_neighbor_graph(
+                            os.path.join(self.path, NEIGHBOR_GRAPH_FILE),
+                            expected_version=self.version, expected_metric=SERVED_NEIGHBOR_METRIC
+                        )
+                    self._neighbors_loaded = True
+        return self._neighbors
+
+    @property
+    def ann_index(self):
+        """IVF index over item_factors built for this model version, or None"""
+        if not self._ann_loaded:
+            item_factors = self.item_factors
+            with self._lock:
+                if not self._ann_loaded:
+                    if os.path.isdir(self.path):
+                        self._ann_index = load_ivf_index(
+                            os.path.join(self.path, ANN_INDEX_DIR),
+                            vectors=item_factors, expected_version=self.version
+                        )
+                    self._ann_loaded = True
+        return self._ann_index
+
+    def load_optional(self, name):
+        """
+        Memory-map an optional member such as 'U' or 'user_ratings_mean'
+
+        Returns:
+            numpy array, or None when the artifact does not contain it
+        """
+        array_path = os.path.join(self.path, f'{name}.npy')
+        if not os.path.isdir(self.path) or not os.path.exists(array_path):
+            return None
+        return np.load(array_path, mmap_mode='r')
+
+
+def neighbor_graph_file(metric):
+    """File name of the item neighbor graph of a metric; only cosine is served"""
+    if metric == SERVED_NEIGHBOR_METRIC:
+        return NEIGHBOR_GRAPH_FILE
+    return f'neighbors_{metric}.npz'
+
+
+def normalize_item_factors(Vt):
+    """
+    Turn Vt (k x n_animes) into unit-length item rows (n_animes x k)
+
+    Dot products between these rows are cosine similarities, so every
+    candidate can be scored with one matrix product. Zero vectors are left
+    at zero (similarity 0).
+    """
+    item_factors = np.asarray(Vt, dtype=np.float64).T
+    norms = np.linalg.norm(item_factors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return item_factors / norms
+
+
+def _model_version(Vt, anime_ids):
+    """Timestamp plus a short content hash, unique per trained model"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(Vt).tobytes())
+    digest.update(np.ascontiguousarray(anime_ids).tobytes())
+    return time.strftime('%Y%m%d%H%M%S') + '-' + digest.hexdigest()[:8]
+
+
+def save_svd_model(model_dir, Vt, sigma, anime_ids,
+                   U=None, user_ratings_mean=None, user_ids=None, extra_manifest=None,
+                   extra_arrays=None):
+    """
+    Write a model artifact directory
+
+    The directory is staged next to the target and swapped in at the end
+    (lib/artifact_dir.py), so a reader never sees a half-written model and
+    concurrent writers never share a staging directory.
+
+    Args:
+        model_dir: Target directory (e.g. data/svd_model)
+        Vt: Item latent factors (k x n_animes)
+        sigma: Singular values, either (k,) or the diagonal (k x k) matrix
+        anime_ids: MAL_ID of every Vt column
+        U, user_ratings_mean, user_ids: Optional user-side arrays
+        extra_manifest: Optional dict merged into manifest.json
+        extra_arrays: Optional {name: array} saved as <name>.npy (see load_optional)
+
+    Returns:
+        The manifest dict that was written
+    """
+    sigma = np.asarray(sigma)
+    if sigma.ndim == 2:
+        sigma = np.diag(sigma)
+    Vt = np.asarray(Vt)
+    anime_ids = np.asarray(anime_ids, dtype=np.int64)
+
+    model_dir = os.path.abspath(model_dir)
+
+    with replacing_directory(model_dir, carry_over=OPTIONAL_ENTRIES) as tmp_dir:
+        np.save(os.path.join(tmp_dir, 'Vt.npy'), Vt)
+        np.save(os.path.join(tmp_dir, 'sigma.npy'), sigma)
+        np.save(os.path.join(tmp_dir, 'anime_ids.npy'), anime_ids)
+        if U is not None:
+            np.save(os.path.join(tmp_dir, 'U.npy'), np.asarray(U))
+        if user_ratings_mean is not None:
+            np.save(os.path.join(tmp_dir, 'user_ratings_mean.npy'), np.asarray(user_ratings_mean))
+        if user_ids is not None:
+            np.save(os.path.join(tmp_dir, 'user_ids.npy'), np.asarray(user_ids, dtype=np.int64))
+        for name, array in (extra_arrays or {}).items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.asarray(array))
+
+        manifest = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'version': _model_version(Vt, anime_ids),
+            'k': int(Vt.shape[0]),
+            'n_animes': int(Vt.shape[1]),
+            'n_users': int(np.shape(U)[0]) if U is not None else None,
+        }
+        if extra_manifest:
+            manifest.update(extra_manifest)
+
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def _load_legacy_pickle(path):
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+
+    sigma = np.asarray(model['sigma'])
+    if sigma.ndim == 2:
+        sigma = np.diag(sigma)
+    Vt = np.asarray(model['Vt'])
+    anime_ids = np.asarray(model['anime_ids'], dtype=np.int64)
+    manifest = {
+        'format_version': 0,
+        'version': 'pickle-' + str(int(os.path.getmtime(path))),
+        'k': int(Vt.shape[0]),
+        'n_animes': int(Vt.shape[1]),
+    }
+    return SVDModel(path, manifest, Vt, sigma, anime_ids, stamp=_artifact_stamp(path))
+
+
+def _artifact_stamp(model_path):
+    """mtime of the manifest (or legacy pickle), None while it is missing"""
+    stamp_path = model_path
+    if os.path.isdir(model_path):
+        stamp_path = os.path.join(model_path, 'manifest.json')
+    try:
+        return os.stat(stamp_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def resolve_model_path(model_path=None):
+    """Default to data/svd_model/, falling back to the legacy pickle"""
+    if model_path is None:
+        model_path = DEFAULT_MODEL_DIR
+        if not os.path.isdir(model_path) and os.path.exists(LEGACY_MODEL_PATH):
+            model_path = LEGACY_MODEL_PATH
+    return os.path.abspath(model_path)
+
+
+def load_svd_model(model_path=None):
+    """
+    Load a model artifact without caching
+
+    Args:
+        model_path: Artifact directory or legacy .pkl file (default data/svd_model)
+
+    Returns:
+        SVDModel
+    """
+    model_path = resolve_model_path(model_path)
+
+    if not os.path.isdir(model_path):
+        return _load_legacy_pickle(model_path)
+
+    stamp = _artifact_stamp(model_path)
+    with open(os.path.join(model_path, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported SVD model format {manifest.get('format_version')} in {model_path}"
+        )
+
+    Vt = np.load(os.path.join(model_path, 'Vt.npy'), mmap_mode='r')
+    sigma = np.load(os.path.join(model_path, 'sigma.npy'))
+    anime_ids = np.load(os.path.join(model_path, 'anime_ids.npy'))
+
+    return SVDModel(model_path, manifest, Vt, sigma, anime_ids, stamp=stamp)
+
+
+def _is_current(model):
+    stamp = _artifact_stamp(model.path)
+    # A missing manifest means a new artifact is being swapped in; keep serving the old one
+    return stamp is None or stamp == model.stamp
+
+
+def get_svd_model(model_path=None):
+    """
+    Process-level model handle: loaded lazily on first use, then shared
+
+    The handle is replaced when the artifact on disk changes (for example
+    after scripts/6_fold_in_ratings.py), so long-running servers pick up
+    new versions without a restart.
+
+    Args:
+        model_path: Artifact directory or legacy .pkl file (default data/svd_model)
+
+    Returns:
+        SVDModel
+    """
+    model_path = resolve_model_path(model_path)
+
+    model = _models.get(model_path)
+    if model is not None and _is_current(model):
+        return model
+
+    with _models_lock:
+        model = _models.get(model_path)
+        if model is None or not _is_current(model):
+            model = load_svd_model(model_path)
+            _models[model_path] = model
+    return model
+
+
+def reset_svd_model_cache():
+    """Drop cached handles so the next call reloads from disk"""
+    with _models_lock:
+        _models.clear()
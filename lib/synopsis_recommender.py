@@ -10,186 +10,514 @@ Advantages over collaborative filtering:
 - Content-based: Actual storyline similarity
 """
 
-import pandas as pd
-import numpy as np
-import pickle
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import sys
+import threading
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Allow running this file directly (python lib/synopsis_recommender.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from lib.id_index import IdIndex, coerce_ids
+from lib.ranking import top_n_rows, top_n_per_row
+from lib.neighbor_graph import aggregate_neighbor_scores
+from lib.ann_index import DEFAULT_NPROBE
+from lib.catalog import get_catalog
+from lib.result_cache import recommendation_cache
+from lib.singleflight import recommendation_flights
+from lib.metrics import stage
+from lib.tfidf_store import load_tfidf_artifact
 
 # Cache for TF-IDF model
 _tfidf_model = None
-_similarity_matrix = None
 _anime_data = None
+_model_lock = threading.Lock()
+
+# Selection sets scored per sparse product in the batch path
+DEFAULT_BATCH_CHUNK = 256
 
 
 def load_data_and_model():
-    """Load anime data and build TF-IDF model (cached)"""
-    global _tfidf_model, _similarity_matrix, _anime_data
+    """
+    Load the prebuilt TF-IDF artifact (cached)
+
+    The vectorizer is fitted offline by scripts/3_build_synopsis_index.py;
+    it is only refitted here when the artifact is missing or stale.
+
+    Returns:
+        (catalog, model, None) where catalog is the shared metadata store
+    """
+    global _tfidf_model, _anime_data
     
-    if _anime_data is not None:
-        return _anime_data, _tfidf_model, _similarity_matrix
+    if _tfidf_model is not None:
+        return _anime_data, _tfidf_model, None
     
-    # Load anime dataset with synopsis
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.join(current_dir, '..', 'data', 'anime_with_synopsis.csv')
+    # Concurrent first requests load the artifact once
+    with _model_lock:
+        if _tfidf_model is None:
+            artifact = load_tfidf_artifact()
+            
+            # Rows are L2-normalized, so a dot product is the cosine similarity
+            _anime_data = get_catalog()
+            # Published last: readers check _tfidf_model without the lock
+            _tfidf_model = {
+                'tfidf_matrix': artifact['tfidf_matrix'],
+                'feature_names': artifact['feature_names'],
+                'index': IdIndex(artifact['anime_ids']),
+                'neighbors': artifact['neighbors'],
+                'ann': artifact['ann'],
+                'version': artifact['manifest']['version']
+            }
     
-    df = pd.read_csv(data_path)
+    return _anime_data, _tfidf_model, None
+
+
+def build_result_rows(catalog, anime_ids, match_scores):
+    """
+    Result rows for the API, with metadata gathered from the catalog
     
-    # Combine synopsis and genres for richer text representation
-    # Note: 'sypnopsis' is a typo in the CSV
-    texts = df['sypnopsis'].fillna('') + ' ' + df['Genres'].fillna('')
+    Args:
+        catalog: Shared catalog store
+        anime_ids: Recommended MAL_IDs, best first
+        match_scores: Similarity score of each recommendation
     
-    # TF-IDF Vectorization
-    tfidf = TfidfVectorizer(
-        stop_words='english',
-        max_features=5000,
-        ngram_range=(1, 2),  # unigrams and bigrams
-        min_df=2  # ignore terms that appear in less than 2 documents
-    )
+    Returns:
+        List of recommendation dicts
+    """
     
-    tfidf_matrix = tfidf.fit_transform(texts)
+    # Gather metadata (title, genres, score, image) column by column
+    info = catalog.lookup(anime_ids, ['title', 'genres', 'score', 'image_url'])
+    scores = np.where(np.isnan(info['score']), 0.0, info['score'])
+    return [
+        {
+            'anime_id': anime_id,
+            'title': title,
+            'genre': genre,
+            'score': score,
+            'match_score': match_score,
+            'image_url': image_url
+        }
+        for anime_id, title, genre, score, match_score, image_url in zip(
+            np.asarray(anime_ids).tolist(),
+            info['title'].tolist(),
+            info['genres'].tolist(),
+            scores.tolist(),
+            np.asarray(match_scores).tolist(),
+            info['image_url'].tolist()
+        )
+    ]
+
+
+def score_content(tfidf_matrix, selected_indices):
+    """Mean cosine similarity between the selected rows and every row"""
     
-    # Compute cosine similarity (memory efficient - don't store full matrix)
-    # We'll compute on-demand instead
+    # Compute similarity scores for selected anime
+    selected_vectors = tfidf_matrix[selected_indices]
     
-    _anime_data = df
-    _tfidf_model = {
-        'vectorizer': tfidf,
-        'tfidf_matrix': tfidf_matrix,
-        'feature_names': tfidf.get_feature_names_out()
-    }
+    # Compute cosine similarity between selected anime and all anime
+    similarity_scores = (selected_vectors @ tfidf_matrix.T).toarray()
     
-    return _anime_data, _tfidf_model, None
+    # Average similarity across all selected anime
+    return similarity_scores.mean(axis=0)
 
 
-def get_synopsis_recommendations(selected_anime_ids, top_n=30):
+def _rank_exact(tfidf_matrix, selected_indices, top_n):
+    """Score the whole corpus against the selections; returns (rows, scores)"""
+    
+    with stage('synopsis', 'similarity'):
+        avg_similarity = score_content(tfidf_matrix, selected_indices)
+    
+    with stage('synopsis', 'ranking'):
+        # Top N by partial selection; over-fetch by the number of selections
+        # so that masking them out still leaves top_n candidates
+        exclude_mask = np.zeros(tfidf_matrix.shape[0], dtype=bool)
+        exclude_mask[selected_indices] = True
+        candidate_rows = top_n_rows(avg_similarity, top_n + len(selected_indices))
+        top_rows = candidate_rows[~exclude_mask[candidate_rows]][:top_n]
+    
+    return top_rows, avg_similarity[top_rows]
+
+
+def _rank_neighbors(neighbors, selected_indices, top_n):
+    """Sum the precomputed neighbor lists of the selections; returns (rows, scores)"""
+    
+    candidate_rows, candidate_scores = aggregate_neighbor_scores(neighbors, selected_indices)
+    exclude_mask = np.isin(candidate_rows, selected_indices)
+    order = top_n_rows(candidate_scores, top_n, exclude_mask)
+    
+    return candidate_rows[order], candidate_scores[order]
+
+
+def _rank_ann(ann, tfidf_matrix, selected_indices, top_n, nprobe):
+    """Score the rows of the nprobe IVF clusters nearest the selections; returns (rows, scores)"""
+    
+    # The reduced embedding only picks the clusters; candidates get the same
+    # TF-IDF scores as _rank_exact so match_score means the same in every mode
+    query = np.asarray(ann.vectors[selected_indices]).mean(axis=0)
+    candidate_rows = ann.candidates(query, nprobe)
+    scores = (tfidf_matrix[selected_indices] @ tfidf_matrix[candidate_rows].T).toarray().mean(axis=0)
+    
+    exclude_mask = np.isin(candidate_rows, selected_indices)
+    order = top_n_rows(scores, top_n, exclude_mask)
+    return candidate_rows[order], scores[order]
+
+
+def get_synopsis_recommendations(selected_anime_ids, top_n=30, mode='exact', use_cache=True,
+                                 nprobe=DEFAULT_NPROBE):
     """
     Get recommendations based on synopsis similarity
     
     Args:
         selected_anime_ids: List of MAL_IDs user selected [1, 5, 20, etc.]
         top_n: Number of recommendations to return (default 30)
+        mode: 'exact' scores the whole corpus; 'neighbors' sums the
+            precomputed top-K neighbor lists of the selections (cost depends
+            on K, not on the corpus size). 'ann' scores only the rows of
+            the nprobe IVF clusters (built on a reduced synopsis embedding)
+            closest to the selections. Both fall back to
+            'exact' when their structure was not built for the current
+            TF-IDF artifact.
+        use_cache: Serve repeated selections from the shared result cache
+        nprobe: IVF clusters scanned in 'ann' mode (recall/latency knob)
     
     Returns:
         List of recommended anime with similarity scores
     """
     
     # Load data and model
-    df, model, _ = load_data_and_model()
-    tfidf_matrix = model['tfidf_matrix']
+    catalog, model, _ = load_data_and_model()
+    
+    # Get indices of selected anime (one vectorized id -> row lookup)
+    with stage('synopsis', 'lookup'):
+        selected_indices = model['index'].valid_rows(selected_anime_ids)
+    
+    if not use_cache:
+        return _compute_synopsis_recommendations(
+            catalog, model, selected_indices, top_n, mode, nprobe
+        )
+    
+    # Identical selections (in any order) reuse the cached result as long as
+    # the TF-IDF artifact and the catalog have not changed
+    cache_key = _cache_key(model, selected_indices, top_n, mode, nprobe)
+    cache_version = (model['version'], catalog.version)
+    cached = recommendation_cache.get(cache_key, cache_version)
+    if cached is not None:
+        return cached
+    
+    def compute():
+        result = _compute_synopsis_recommendations(
+            catalog, model, selected_indices, top_n, mode, nprobe
+        )
+        recommendation_cache.put(cache_key, cache_version, result)
+        return result
+    
+    # Identical requests arriving while this one computes wait and share it
+    recommendations, shared = recommendation_flights.do((cache_key, cache_version), compute)
+    return [dict(rec) for rec in recommendations] if shared else recommendations
+
+
+def peek_synopsis_recommendations(selected_anime_ids, top_n=30, mode='exact', nprobe=DEFAULT_NPROBE):
+    """Cached result of get_synopsis_recommendations for these arguments, or None (never computes)"""
+    
+    catalog, model, _ = load_data_and_model()
+    cache_key = _cache_key(model, model['index'].valid_rows(selected_anime_ids), top_n, mode, nprobe)
+    return recommendation_cache.peek(cache_key, (model['version'], catalog.version))
+
+
+def get_fallback_recommendations(selected_anime_ids, top_n=30):
+    """
+    Cheapest available answer for a request that is out of time budget
+    
+    Tries a cached exact result, then the precomputed neighbor lists, then
+    the IVF index with a single probe.
+    
+    Returns:
+        (recommendations, source) with source 'cache', 'neighbors' or 'ann',
+        or (None, None) when only the full computation is available
+    """
+    
+    _, model, _ = load_data_and_model()
     
-    # Get indices of selected anime
-    selected_indices = []
-    for anime_id in selected_anime_ids:
-        idx = df[df['MAL_ID'] == anime_id].index
-        if len(idx) > 0:
-            selected_indices.append(idx[0])
+    cached = peek_synopsis_recommendations(selected_anime_ids, top_n)
+    if cached is not None:
+        return cached, 'cache'
+    if model['neighbors'] is not None:
+        return get_synopsis_recommendations(selected_anime_ids, top_n, mode='neighbors'), 'neighbors'
+    if model['ann'] is not None:
+        return get_synopsis_recommendations(selected_anime_ids, top_n, mode='ann', nprobe=1), 'ann'
+    return None, None
+
+
+def _cache_key(model, selected_indices, top_n, mode, nprobe=DEFAULT_NPROBE):
+    """Result-cache key of a resolved selection (shared by the single and batch paths)"""
+    return recommendation_cache.make_key(
+        'synopsis', model['index'].ids_of(selected_indices), top_n, mode=mode,
+        nprobe=int(nprobe) if mode == 'ann' else None
+    )
+
+
+def _compute_synopsis_recommendations(catalog, model, selected_indices, top_n, mode,
+                                      nprobe=DEFAULT_NPROBE):
+    """Uncached body of get_synopsis_recommendations (selected_indices: resolved rows)"""
+    
+    tfidf_matrix = model['tfidf_matrix']
+    anime_ids = model['index'].ids
     
-    if not selected_indices:
+    if len(selected_indices) == 0:
         return []
     
-    # Compute similarity scores for selected anime
-    selected_vectors = tfidf_matrix[selected_indices]
+    if mode == 'neighbors' and model['neighbors'] is not None:
+        with stage('synopsis', 'neighbors'):
+            top_rows, match_scores = _rank_neighbors(model['neighbors'], selected_indices, top_n)
+    elif mode == 'ann' and model['ann'] is not None:
+        with stage('synopsis', 'ann'):
+            top_rows, match_scores = _rank_ann(
+                model['ann'], tfidf_matrix, selected_indices, top_n, nprobe
+            )
+    else:
+        top_rows, match_scores = _rank_exact(tfidf_matrix, selected_indices, top_n)
+    
+    with stage('synopsis', 'metadata'):
+        return build_result_rows(catalog, anime_ids[top_rows], match_scores)
+
+
+def _resolve_selections(index, selection_sets):
+    """
+    (valid rows, invalid ids) of every selection set
     
-    # Compute cosine similarity between selected anime and all anime
-    similarity_scores = cosine_similarity(selected_vectors, tfidf_matrix)
+    All sets are flattened and resolved with one IdIndex.rows call;
+    unparseable ids (1.5, 'x') count as invalid like unknown ones.
+    """
+    flat_ids = [anime_id for selected_anime_ids in selection_sets for anime_id in selected_anime_ids]
+    ids, parsed = coerce_ids(flat_ids)
+    rows = np.full(len(flat_ids), -1, dtype=np.intp)
+    rows[parsed] = index.rows(ids[parsed])
+    
+    resolved = []
+    bounds = np.cumsum([0] + [len(selected_anime_ids) for selected_anime_ids in selection_sets])
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        set_rows = rows[lo:hi]
+        invalid = [flat_ids[lo + i] for i in np.flatnonzero(set_rows < 0)]
+        resolved.append((set_rows[set_rows >= 0], invalid))
+    return resolved
+
+
+def get_synopsis_recommendations_batch(selection_sets, top_n=30, use_cache=True,
+                                       chunk_size=DEFAULT_BATCH_CHUNK):
+    """
+    Exact synopsis recommendations for many selection sets at once
     
-    # Average similarity across all selected anime
-    avg_similarity = similarity_scores.mean(axis=0)
-    
-    # Get top N most similar (excluding selected ones)
-    similar_indices = avg_similarity.argsort()[::-1]
-    
-    # Filter out selected anime and get top N
-    recommendations = []
-    for idx in similar_indices:
-        if idx not in selected_indices:
-            anime = df.iloc[idx]
-            recommendations.append({
-                'anime_id': int(anime['MAL_ID']),
-                'title': anime['Name'],
-                'genre': anime['Genres'],
-                'score': float(anime['Score']) if pd.notna(anime['Score']) else 0.0,
-                'match_score': float(avg_similarity[idx]),
-                'image_url': ''  # Will be filled from popular_animes.json if available
-            })
-            
-            if len(recommendations) >= top_n:
-                break
-    
-    # Try to add image URLs from popular_animes.json
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    popular_path = os.path.join(current_dir, '..', 'data', 'popular_animes.json')
-    
-    if os.path.exists(popular_path):
-        import json
-        with open(popular_path, 'r', encoding='utf-8') as f:
-            popular_animes = json.load(f)
-            image_map = {a['anime_id']: a.get('image_url', '') for a in popular_animes}
-            
-            for rec in recommendations:
-                if rec['anime_id'] in image_map:
-                    rec['image_url'] = image_map[rec['anime_id']]
+    Sets are scored chunk_size at a time as one sparse product: a
+    (sets x corpus) averaging matrix S with 1/len(set) at every selected
+    row gives all mean similarities as (S @ T) @ T^T, so the corpus is
+    traversed once per chunk instead of once per set. Each set's own
+    selections are masked and the top N is taken per row.
+    
+    Args:
+        selection_sets: List of MAL_ID lists
+        top_n: Number of recommendations per set
+        use_cache: Read and fill the shared result cache (same entries as
+            get_synopsis_recommendations(mode='exact'))
+        chunk_size: Sets per product (memory is ~chunk_size x corpus x 8 bytes)
+    
+    Returns:
+        One {'recommendations': [...], 'invalid_ids': [...]} dict per set,
+        in input order. Unknown ids are reported per set and ignored; a set
+        without any known id gets an empty list.
+    """
     
-    return recommendations
+    catalog, model, _ = load_data_and_model()
+    tfidf_matrix = model['tfidf_matrix']
+    index = model['index']
+    n_items = tfidf_matrix.shape[0]
+    cache_version = (model['version'], catalog.version)
+    
+    results = []
+    pending = []
+    with stage('synopsis_batch', 'lookup'):
+        for rows, invalid_ids in _resolve_selections(index, selection_sets):
+            result = {'recommendations': [], 'invalid_ids': invalid_ids}
+            results.append(result)
+            if len(rows) == 0:
+                continue
+            
+            cache_key = None
+            if use_cache:
+                cache_key = _cache_key(model, rows, top_n, 'exact')
+                cached = recommendation_cache.get(cache_key, cache_version)
+                if cached is not None:
+                    result['recommendations'] = cached
+                    continue
+            pending.append((result, rows, cache_key))
+    
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        counts = np.array([len(rows) for _, rows, _ in chunk])
+        set_rows = np.repeat(np.arange(len(chunk)), counts)
+        selected = np.concatenate([rows for _, rows, _ in chunk])
+        
+        with stage('synopsis_batch', 'similarity'):
+            # Duplicate selections add up, matching the per-set mean
+            averaging = csr_matrix(
+                (np.repeat(1.0 / counts, counts), (set_rows, selected)),
+                shape=(len(chunk), n_items), dtype=tfidf_matrix.dtype
+            )
+            scores = ((averaging @ tfidf_matrix) @ tfidf_matrix.T).toarray()
+        
+        with stage('synopsis_batch', 'ranking'):
+            scores[set_rows, selected] = -np.inf
+            top_cols, top_scores = top_n_per_row(scores, top_n)
+        
+        with stage('synopsis_batch', 'metadata'):
+            for (result, _, cache_key), cols, values in zip(chunk, top_cols, top_scores):
+                keep = np.isfinite(values)
+                result['recommendations'] = build_result_rows(
+                    catalog, index.ids_of(cols[keep]), values[keep]
+                )
+                if cache_key is not None:
+                    recommendation_cache.put(cache_key, cache_version, result['recommendations'])
+    
+    return results
 
 
-def explain_similarity(anime_id_1, anime_id_2, top_keywords=10):
+def explain_similarity_batch(pairs, top_keywords=10):
     """
-    Explain why two anime are similar by showing common keywords
+    Explain many (anime_id_1, anime_id_2) pairs at once
+    
+    Shared keywords come from intersecting the sparse TF-IDF rows directly:
+    the element-wise minimum of two non-negative sparse rows is non-zero
+    exactly on the terms both synopses contain, and its values are the
+    keyword importances. All pairs are resolved and intersected together.
     
     Args:
-        anime_id_1: First anime MAL_ID
-        anime_id_2: Second anime MAL_ID
-        top_keywords: Number of top keywords to show
+        pairs: List of (anime_id_1, anime_id_2) tuples
+        top_keywords: Number of top keywords to show per pair
     
     Returns:
-        Dictionary with common keywords and their importance
+        List of explanation dicts (same format as explain_similarity),
+        in the order of pairs. A malformed pair, a non-integral id or an
+        unknown anime only turns its own entry into {'error': ...}.
     """
     
-    df, model, _ = load_data_and_model()
+    catalog, model, _ = load_data_and_model()
     tfidf_matrix = model['tfidf_matrix']
     feature_names = model['feature_names']
     
-    # Get indices
-    idx1 = df[df['MAL_ID'] == anime_id_1].index
-    idx2 = df[df['MAL_ID'] == anime_id_2].index
-    
-    if len(idx1) == 0 or len(idx2) == 0:
-        return {'error': 'Anime not found'}
+    if len(pairs) == 0:
+        return []
     
-    idx1, idx2 = idx1[0], idx2[0]
+    # Validate every id, then resolve the valid pairs in one call
+    flat_ids, well_formed = [], []
+    for pair in pairs:
+        is_pair = isinstance(pair, (list, tuple)) and len(pair) == 2
+        well_formed.append(is_pair)
+        flat_ids.extend(pair if is_pair else (0, 0))
+    pair_ids, valid_ids = coerce_ids(flat_ids)
+    pair_ids = pair_ids.reshape(-1, 2)
+    valid = valid_ids.reshape(-1, 2).all(axis=1) & np.array(well_formed, dtype=bool)
+    
+    rows = np.full(pair_ids.shape, -1, dtype=np.intp)
+    rows[valid] = model['index'].rows(pair_ids[valid].ravel()).reshape(-1, 2)
+    found = (rows >= 0).all(axis=1)
+    
+    rows1 = tfidf_matrix[rows[found, 0]]
+    rows2 = tfidf_matrix[rows[found, 1]]
+    
+    # Common keywords (both non-zero) with min(v1, v2) as importance
+    common = rows1.minimum(rows2).tocsr()
+    common.sort_indices()
+    similarity_scores = np.asarray(rows1.multiply(rows2).sum(axis=1)).ravel()
+    titles = catalog.lookup(pair_ids[found].ravel(), ['title'])['title'].reshape(-1, 2)
+    
+    explanations = []
+    found_pos = 0
+    for pair_pos in range(len(pair_ids)):
+        if not found[pair_pos]:
+            if not well_formed[pair_pos]:
+                error = 'Expected a pair of anime ids'
+            elif not valid[pair_pos]:
+                error = 'Invalid anime id'
+            else:
+                error = 'Anime not found'
+            explanations.append({'error': error})
+            continue
+        
+        start, end = common.indptr[found_pos], common.indptr[found_pos + 1]
+        keyword_cols = common.indices[start:end]
+        importances = common.data[start:end]
+        order = top_n_rows(importances, top_keywords)
+        
+        explanations.append({
+            'anime_1': titles[found_pos, 0],
+            'anime_2': titles[found_pos, 1],
+            'common_keywords': [
+                {'keyword': keyword, 'importance': importance}
+                for keyword, importance in zip(
+                    feature_names[keyword_cols[order]].tolist(),
+                    importances[order].tolist()
+                )
+            ],
+            'similarity_score': float(similarity_scores[found_pos])
+        })
+        found_pos += 1
+    
+    return explanations
+
+
+def explain_recommendations(selected_anime_ids, recommended_anime_ids, top_keywords=5):
+    """
+    Explain every recommendation against every selected anime
     
-    # Get TF-IDF vectors
-    vec1 = tfidf_matrix[idx1].toarray()[0]
-    vec2 = tfidf_matrix[idx2].toarray()[0]
+    Args:
+        selected_anime_ids: MAL_IDs the user selected
+        recommended_anime_ids: MAL_IDs that were recommended
+        top_keywords: Number of top keywords to show per pair
     
-    # Find common keywords (both have non-zero values)
-    common_keywords = []
-    for i, (v1, v2) in enumerate(zip(vec1, vec2)):
-        if v1 > 0 and v2 > 0:
-            importance = min(v1, v2)  # Use minimum as importance
-            common_keywords.append({
-                'keyword': feature_names[i],
-                'importance': float(importance)
-            })
+    Returns:
+        Dict mapping recommended MAL_ID -> list of explanations, one per
+        selected anime (in the order of selected_anime_ids)
+    """
     
-    # Sort by importance
-    common_keywords.sort(key=lambda x: x['importance'], reverse=True)
+    pairs = [
+        (selected_id, recommended_id)
+        for recommended_id in recommended_anime_ids
+        for selected_id in selected_anime_ids
+    ]
+    explanations = explain_similarity_batch(pairs, top_keywords)
     
+    n_selected = len(selected_anime_ids)
     return {
-        'anime_1': df.iloc[idx1]['Name'],
-        'anime_2': df.iloc[idx2]['Name'],
-        'common_keywords': common_keywords[:top_keywords],
-        'similarity_score': float(cosine_similarity(
-            tfidf_matrix[idx1:idx1+1], 
-            tfidf_matrix[idx2:idx2+1]
-        )[0][0])
+        recommended_id: explanations[i * n_selected:(i + 1) * n_selected]
+        for i, recommended_id in enumerate(recommended_anime_ids)
     }
 
 
-if __name__ == '__main__':
+def explain_similarity(anime_id_1, anime_id_2, top_keywords=10):
+    """
+    Explain why two anime are similar by showing common keywords
+    
+    Args:
+        anime_id_1: First anime MAL_ID
+        anime_id_2: Second anime MAL_ID
+        top_keywords: Number of top keywords to show
+    
+    Returns:
+        Dictionary with common keywords and their importance
+    """
+    
+    return explain_similarity_batch([(anime_id_1, anime_id_2)], top_keywords)[0]
+
+
+if __name__ == '__main__' and '--worker' in sys.argv:
+    # Long-lived NDJSON worker (lib/worker.py): python -m lib.synopsis_recommender --worker
+    from lib.worker import run_worker
+    run_worker(sys.argv[1:], default_engine='synopsis')
+
+elif __name__ == '__main__':
     # Test the recommender
     import json
     
@@ -0,0 +1,217 @@
+"""
+Persisted TF-IDF artifact for the synopsis recommender
+
+The vectorizer is fitted offline (scripts/3_build_synopsis_index.py) and
+the result is written to data/synopsis_tfidf/:
+
+    manifest.json      artifact version, vectorizer params, source checksum
+    tfidf_matrix.npz   CSR float32 matrix, rows L2-normalized
+    vocabulary.json    feature name of every column
+    anime_ids.npy      MAL_ID of every row
+    neighbors.npz      optional top-K neighbor graph (scripts/4_build_neighbor_graph.py)
+    ann_ivf/           optional IVF index over a reduced embedding (scripts/9_build_ann_index.py)
+
+Serving only needs numpy and scipy to load these files. pandas and
+scikit-learn are imported inside fit_tfidf() and are only needed when the
+artifact is missing or stale. A rebuild is staged privately and swapped in
+(lib/artifact_dir.py); where data/ is read-only (e.g. a Vercel bundle) the
+fit is served from memory instead.
+"""
+
+import os
+import sys
+import json
+import numpy as np
+from scipy import sparse
+
+from lib.artifact_dir import replacing_directory
+from lib.fingerprint import file_fingerprint, fingerprint_matches
+from lib.neighbor_graph import load_neighbor_graph
+from lib.ann_index import load_ivf_index
+
+# Bump when the artifact layout or the text preprocessing changes
+TFIDF_ARTIFACT_VERSION = 2
+
+TFIDF_PARAMS = {
+    'stop_words': 'english',
+    'max_features': 5000,
+    'ngram_range': [1, 2],  # unigrams and bigrams
+    'min_df': 2  # ignore terms that appear in less than 2 documents
+}
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE_PATH = os.path.normpath(os.path.join(current_dir, '..', 'data', 'anime_with_synopsis.csv'))
+DEFAULT_ARTIFACT_DIR = os.path.normpath(os.path.join(current_dir, '..', 'data', 'synopsis_tfidf'))
+NEIGHBOR_GRAPH_FILE = 'neighbors.npz'
+ANN_INDEX_DIR = 'ann_ivf'
+# Built by separate scripts; kept across a rebuild of the artifact itself
+OPTIONAL_ENTRIES = (NEIGHBOR_GRAPH_FILE, NEIGHBOR_GRAPH_FILE + '.json', ANN_INDEX_DIR)
+
+
+def fit_tfidf(source_path=None):
+    """
+    Fit the TF-IDF model on the synopsis CSV without writing anything
+
+    Returns:
+        (manifest, tfidf_matrix, feature_names, anime_ids)
+    """
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    source_path = source_path or DEFAULT_SOURCE_PATH
+    df = pd.read_csv(source_path)
+
+    # Combine synopsis and genres for richer text representation
+    # Note: 'sypnopsis' is a typo in the CSV
+    texts = df['sypnopsis'].fillna('') + ' ' + df['Genres'].fillna('')
+
+    params = dict(TFIDF_PARAMS, ngram_range=tuple(TFIDF_PARAMS['ngram_range']))
+    tfidf = TfidfVectorizer(dtype=np.float32, norm='l2', **params)
+    tfidf_matrix = sparse.csr_matrix(tfidf.fit_transform(texts), dtype=np.float32)
+    tfidf_matrix.sort_indices()
+
+    source = file_fingerprint(source_path)
+    manifest = {
+        'artifact_version': TFIDF_ARTIFACT_VERSION,
+        'version': f"{TFIDF_ARTIFACT_VERSION}-{source['sha256'][:12]}",
+        'params': TFIDF_PARAMS,
+        'source': source,
+        'n_docs': int(tfidf_matrix.shape[0]),
+        'n_features': int(tfidf_matrix.shape[1])
+    }
+    feature_names = np.array(tfidf.get_feature_names_out().tolist(), dtype=object)
+    return manifest, tfidf_matrix, feature_names, df['MAL_ID'].to_numpy(dtype=np.int64)
+
+
+def write_tfidf_artifact(fitted, artifact_dir=None):
+    """
+    Write a fit_tfidf() result and swap it in atomically
+
+    The neighbor graph and ANN index of the previous artifact are carried
+    over; their loaders ignore them until they are rebuilt for the new
+    version.
+
+    Raises:
+        OSError: When the artifact directory cannot be written
+    """
+    manifest, tfidf_matrix, feature_names, anime_ids = fitted
+    artifact_dir = os.path.abspath(artifact_dir or DEFAULT_ARTIFACT_DIR)
+
+    with replacing_directory(artifact_dir, carry_over=OPTIONAL_ENTRIES) as tmp_dir:
+        sparse.save_npz(os.path.join(tmp_dir, 'tfidf_matrix.npz'), tfidf_matrix)
+        np.save(os.path.join(tmp_dir, 'anime_ids.npy'), anime_ids)
+        with open(os.path.join(tmp_dir, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump(feature_names.tolist(), f, ensure_ascii=False)
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def build_tfidf_artifact(source_path=None, artifact_dir=None):
+    """
+    Fit the TF-IDF model on the synopsis CSV and write the artifact
+
+    Args:
+        source_path: anime_with_synopsis.csv path
+        artifact_dir: Output directory (default data/synopsis_tfidf)
+
+    Returns:
+        The manifest dict that was written
+    """
+    return write_tfidf_artifact(fit_tfidf(source_path), artifact_dir)
+
+
+def read_manifest(artifact_dir=None):
+    """Return the artifact manifest, or None when there is no artifact"""
+    manifest_path = os.path.join(artifact_dir or DEFAULT_ARTIFACT_DIR, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def artifact_status(artifact_dir=None, source_path=None):
+    """
+    Check whether the artifact can be served as-is
+
+    Returns:
+        (is_fresh, reason) tuple
+    """
+    source_path = source_path or DEFAULT_SOURCE_PATH
+    manifest = read_manifest(artifact_dir)
+
+    if manifest is None:
+        return False, 'missing'
+    if manifest.get('artifact_version') != TFIDF_ARTIFACT_VERSION:
+        return False, 'artifact version changed'
+    if manifest.get('params') != TFIDF_PARAMS:
+        return False, 'vectorizer params changed'
+    # Deployments may ship only the artifact; trust it when the CSV is absent
+    if os.path.exists(source_path) and not fingerprint_matches(source_path, manifest.get('source')):
+        return False, 'source checksum changed'
+    return True, 'fresh'
+
+
+def load_tfidf_artifact(artifact_dir=None, source_path=None, rebuild_stale=True):
+    """
+    Load the TF-IDF artifact, rebuilding it first if it is missing or stale
+
+    Args:
+        artifact_dir: Artifact directory (default data/synopsis_tfidf)
+        source_path: anime_with_synopsis.csv used for the freshness check
+        rebuild_stale: Rebuild instead of raising when the artifact is stale.
+            When the directory is not writable the fresh fit is returned
+            from memory (without neighbor graph or ANN index).
+
+    Returns:
+        dict with manifest, tfidf_matrix (CSR), feature_names, anime_ids
+        neighbors (the neighbor graph) and ann (IVFIndex); both None if not
+        built for this version
+    """
+    artifact_dir = artifact_dir or DEFAULT_ARTIFACT_DIR
+
+    is_fresh, reason = artifact_status(artifact_dir, source_path)
+    if not is_fresh:
+        if not rebuild_stale:
+            raise RuntimeError(f'TF-IDF artifact in {artifact_dir} is stale ({reason})')
+        fitted = fit_tfidf(source_path)
+        try:
+            write_tfidf_artifact(fitted, artifact_dir)
+        except OSError as e:
+            print(f'[tfidf_store] cannot write {artifact_dir} ({e}); serving an in-memory fit',
+                  file=sys.stderr)
+            manifest, tfidf_matrix, feature_names, anime_ids = fitted
+            return {
+                'manifest': manifest,
+                'tfidf_matrix': tfidf_matrix,
+                'feature_names': feature_names,
+                'anime_ids': anime_ids,
+                'neighbors': None,
+                'ann': None
+            }
+
+    manifest = read_manifest(artifact_dir)
+    tfidf_matrix = sparse.load_npz(os.path.join(artifact_dir, 'tfidf_matrix.npz')).tocsr()
+
+    with open(os.path.join(artifact_dir, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+        feature_names = np.array(json.load(f), dtype=object)
+
+    neighbors, _ = load_neighbor_graph(
+        os.path.join(artifact_dir, NEIGHBOR_GRAPH_FILE),
+        expected_version=manifest['version']
+    )
+
+    ann = load_ivf_index(
+        os.path.join(artifact_dir, ANN_INDEX_DIR),
+        expected_version=manifest['version']
+    )
+
+    return {
+        'manifest': manifest,
+        'tfidf_matrix': tfidf_matrix,
+        'feature_names': feature_names,
+        'anime_ids': np.load(os.path.join(artifact_dir, 'anime_ids.npy')),
+        'neighbors': neighbors,
+        'ann': ann
+    }
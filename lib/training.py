@@ -0,0 +1,135 @@
+"""
+Sparse training helpers for the SVD model
+
+The user x anime rating matrix is kept in CSR form; the per-user mean
+centering that the SVD needs is applied implicitly through a
+LinearOperator, so svds never sees a dense matrix and peak memory tracks
+the number of ratings instead of n_users x n_animes.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix, coo_matrix
+from scipy.sparse.linalg import LinearOperator, svds
+
+
+def last_occurrences(rows, cols, n_cols):
+    """
+    Positions of the last entry of every (row, col) pair, in input order
+
+    A sparse constructor adds repeated pairs up (two ratings of 8 become
+    16); the dense matrix[u, a] = r assignment it replaces kept the last.
+    """
+    keys = np.asarray(rows, dtype=np.int64) * n_cols + np.asarray(cols, dtype=np.int64)
+    _, first_from_end = np.unique(keys[::-1], return_index=True)
+    return np.sort(len(keys) - 1 - first_from_end)
+
+
+def build_rating_matrix(user_indices, anime_indices, ratings, shape):
+    """
+    CSR user x anime rating matrix
+
+    Args:
+        user_indices: Row index of every rating
+        anime_indices: Column index of every rating
+        ratings: Rating values (a repeated user/anime pair keeps its last value)
+        shape: (n_users, n_animes)
+
+    Returns:
+        scipy.sparse.csr_matrix (float64)
+    """
+    user_indices = np.asarray(user_indices)
+    anime_indices = np.asarray(anime_indices)
+    keep = last_occurrences(user_indices, anime_indices, shape[1])
+
+    matrix = csr_matrix(
+        (np.asarray(ratings, dtype=np.float64)[keep],
+         (user_indices[keep], anime_indices[keep])),
+        shape=shape
+    )
+    # No duplicates are left; this only sorts the column indices
+    matrix.sum_duplicates()
+    return matrix
+
+
+def canonical_rating_matrix(matrix, dtype=np.float64):
+    """
+    CSR copy of a rating matrix with one entry per (row, col)
+
+    Duplicate entries of an uncanonical sparse input keep their last value
+    (see last_occurrences) instead of being summed.
+    """
+    coo = coo_matrix(matrix)
+    keep = last_occurrences(coo.row, coo.col, coo.shape[1])
+    matrix = csr_matrix(
+        (coo.data[keep].astype(dtype), (coo.row[keep], coo.col[keep])), shape=coo.shape
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+
+def dense_row_means(matrix):
+    """
+    Row means over all columns, unrated (zero) cells included
+
+    This matches np.mean(dense_matrix, axis=1), which the original dense
+    pipeline used as user_ratings_mean.
+    """
+    return np.asarray(matrix.sum(axis=1)).ravel() / matrix.shape[1]
+
+
+def mean_centered_operator(matrix, row_means):
+    """
+    LinearOperator for (matrix - row_means[:, None]) without densifying it
+
+        A x   = R x   - m (1^T x)
+        A^T y = R^T y - 1 (m^T y)
+
+    Args:
+        matrix: Sparse (n_users x n_animes) rating matrix
+        row_means: Per-row value subtracted from every cell of that row
+
+    Returns:
+        scipy.sparse.linalg.LinearOperator
+    """
+    matrix = csr_matrix(matrix)
+    matrix_t = matrix.T.tocsr()
+    row_means = np.asarray(row_means, dtype=np.float64)
+    n_rows, n_cols = matrix.shape
+
+    def matvec(x):
+        x = np.ravel(x)
+        return matrix @ x - row_means * x.sum()
+
+    def rmatvec(y):
+        y = np.ravel(y)
+        return matrix_t @ y - np.full(n_cols, row_means @ y)
+
+    def matmat(X):
+        return matrix @ X - np.outer(row_means, X.sum(axis=0))
+
+    def rmatmat(Y):
+        return matrix_t @ Y - np.tile(row_means @ Y, (n_cols, 1))
+
+    return LinearOperator(
+        (n_rows, n_cols), matvec=matvec, rmatvec=rmatvec,
+        matmat=matmat, rmatmat=rmatmat, dtype=np.float64
+    )
+
+
+def train_svd(matrix, k, row_means=None):
+    """
+    Truncated SVD of the mean-centered sparse rating matrix
+
+    Args:
+        matrix: Sparse (n_users x n_animes) rating matrix
+        k: Number of latent factors
+        row_means: Values to center rows with (default dense_row_means)
+
+    Returns:
+        (U, sigma, Vt, row_means) with sigma as a 1-D array
+    """
+    if row_means is None:
+        row_means = dense_row_means(matrix)
+
+    U, sigma, Vt = svds(mean_centered_operator(matrix, row_means), k=k)
+    return U, sigma, Vt, row_means
@@ -0,0 +1,246 @@
+"""
+Long-lived recommendation worker speaking newline-delimited JSON
+
+Spawning `python lib/recommender.py '<ids>'` per request pays interpreter
+start, numpy/scipy imports and artifact loading every time. The worker
+loads the engines once and then answers any number of requests over one
+process, either on stdin/stdout or on a Unix socket:
+
+    python lib/recommender.py --worker                      # stdin/stdout
+    python lib/recommender.py --worker --socket /tmp/rec.sock
+    python -m lib.synopsis_recommender --worker             # default engine synopsis
+
+One JSON object per line in each direction:
+
+    -> {"id": 7, "engine": "svd", "selectedAnimeIds": [1, 5, 20], "top_n": 30}
+    -> {"id": 8, "engine": "svd", "ratings": [[1, 9], [5, 7]]}
+    -> {"id": 9, "engine": "synopsis", "selections": [[1, 5], [20, 30]]}
+    -> {"id": 10, "op": "ping"}
+    -> {"id": 11, "op": "metrics"}        # Prometheus text (lib/metrics.py)
+    <- {"id": 7, "ok": true, "recommendations": [...], "elapsed_ms": 1.9}
+    <- {"id": 8, "ok": false, "error": "..."}
+    <- {"id": 9, "ok": true, "results": [{"recommendations": [...], "invalid_ids": []}, ...]}
+
+Every response echoes the request's id. With --threads > 1 requests on a
+stream are handled concurrently and answered in completion order, so
+clients that pipeline requests match responses by id. Optional request
+keys: engine (svd, synopsis, hybrid), top_n, mode, nprobe.
+
+In stdin mode anything printed by library code is redirected to stderr so
+stdout carries protocol lines only.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+ENGINES = ('svd', 'synopsis', 'hybrid')
+
+
+def _recommend_svd(request):
+    from lib.recommender import get_recommendations, recommend_for_user
+
+    top_n = int(request.get('top_n', 30))
+    if request.get('ratings') is not None:
+        return recommend_for_user(request['ratings'], top_n=top_n)
+
+    options = {key: request[key] for key in ('mode', 'nprobe') if key in request}
+    return get_recommendations(request['selectedAnimeIds'], top_n=top_n, **options)
+
+
+def _recommend_synopsis(request):
+    from lib.synopsis_recommender import (
+        get_synopsis_recommendations, get_synopsis_recommendations_batch
+    )
+
+    if request.get('selections') is not None:
+        return get_synopsis_recommendations_batch(
+            request['selections'], top_n=int(request.get('top_n', 30))
+        )
+
+    options = {key: request[key] for key in ('mode', 'nprobe') if key in request}
+    return get_synopsis_recommendations(
+        request['selectedAnimeIds'], top_n=int(request.get('top_n', 30)), **options
+    )
+
+
+def _recommend_hybrid(request):
+    from lib.hybrid_recommender import get_hybrid_recommendations
+
+    options = {
+        key: float(request[key]) for key in ('content_weight', 'collaborative_weight')
+        if key in request
+    }
+    return get_hybrid_recommendations(
+        request['selectedAnimeIds'], top_n=int(request.get('top_n', 30)), **options
+    )
+
+
+_HANDLERS = {
+    'svd': _recommend_svd,
+    'synopsis': _recommend_synopsis,
+    'hybrid': _recommend_hybrid
+}
+
+
+def warm_up(engines):
+    """
+    Load the artifacts of the given engines so the first request is fast
+
+    Returns:
+        List of engines that loaded; failures are logged to stderr and the
+        engine keeps answering with an error until its artifacts exist
+    """
+    loaded = []
+    for engine in engines:
+        try:
+            if engine == 'svd':
+                from lib.svd_model import get_svd_model
+                from lib.catalog import get_catalog
+                get_svd_model().item_factors
+                get_catalog()
+            elif engine == 'synopsis':
+                from lib.synopsis_recommender import load_data_and_model
+                load_data_and_model()
+            elif engine == 'hybrid':
+                from lib.hybrid_recommender import load_hybrid_model
+                load_hybrid_model()
+            loaded.append(engine)
+        except Exception as e:
+            print(f'[worker] {engine} warm-up failed: {e}', file=sys.stderr)
+    return loaded
+
+
+def handle_request(request, default_engine='svd'):
+    """
+    Answer one decoded request
+
+    Returns:
+        Response dict (never raises; errors become {"ok": false, "error"})
+    """
+    if not isinstance(request, dict):
+        return {'id': None, 'ok': False, 'error': 'request must be a JSON object'}
+
+    response = {'id': request.get('id')}
+    if request.get('op') == 'ping':
+        response.update({'ok': True, 'pong': True, 'pid': os.getpid()})
+        return response
+    if request.get('op') == 'metrics':
+        from lib.metrics import render_prometheus
+        response.update({'ok': True, 'metrics': render_prometheus()})
+        return response
+
+    engine = request.get('engine', default_engine)
+    if engine not in _HANDLERS:
+        response.update({'ok': False, 'error': f'unknown engine {engine!r}'})
+        return response
+
+    start = time.perf_counter()
+    try:
+        result = _HANDLERS[engine](request)
+        # Batch requests answer one {recommendations, invalid_ids} entry per selection set
+        response.update({
+            'ok': True,
+            'results' if request.get('selections') is not None else 'recommendations': result,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+        })
+    except KeyError as e:
+        response.update({'ok': False, 'error': f'missing field {e}'})
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        response.update({'ok': False, 'error': str(e)})
+    return response
+
+
+def serve_stream(infile, outfile, default_engine='svd', threads=1):
+    """
+    Answer NDJSON requests from a binary input stream until EOF
+
+    Args:
+        infile, outfile: Binary file objects (stdin/stdout buffers, socket files)
+        default_engine: Engine for requests without an "engine" key
+        threads: Requests handled concurrently; > 1 answers in completion order
+    """
+    write_lock = threading.Lock()
+
+    def respond(line):
+        try:
+            response = handle_request(json.loads(line), default_engine)
+        except ValueError as e:
+            response = {'id': None, 'ok': False, 'error': f'invalid JSON: {e}'}
+        line = json.dumps(response, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with write_lock:
+            outfile.write(line.encode('utf-8'))
+            outfile.flush()
+
+    if threads <= 1:
+        for line in infile:
+            if line.strip():
+                respond(line)
+        return
+
+    # Bound the number of requests read ahead of the ones being answered
+    slots = threading.BoundedSemaphore(threads * 2)
+
+    def run(line):
+        try:
+            respond(line)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for line in infile:
+            if line.strip():
+                slots.acquire()
+                pool.submit(run, line)
+
+
+def serve_unix_socket(path, default_engine='svd', threads=1):
+    """Accept connections on a Unix socket; each connection is one NDJSON stream"""
+    import socketserver
+
+    if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        raise RuntimeError('Unix sockets are not available on this platform; use stdin/stdout')
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve_stream(self.rfile, self.wfile, default_engine, threads)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        print(f'[worker] listening on {path}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def run_worker(argv=None, default_engine='svd'):
+    """Command-line entry point used by `--worker` in the recommender modules"""
+    parser = argparse.ArgumentParser(description='NDJSON recommendation worker')
+    parser.add_argument('--worker', action='store_true', help='Run as a worker (this mode)')
+    parser.add_argument('--socket', default=None, help='Listen on this Unix socket instead of stdin/stdout')
+    parser.add_argument('--threads', type=int, default=1, help='Concurrent requests per stream (default 1)')
+    parser.add_argument('--engines', default=default_engine,
+                        help=f'Comma-separated engines to load at startup ({", ".join(ENGINES)})')
+    args = parser.parse_args(argv)
+
+    protocol_out = sys.stdout.buffer
+    # Library prints must not interleave with protocol lines
+    sys.stdout = sys.stderr
+
+    engines = [name.strip() for name in args.engines.split(',') if name.strip()]
+    loaded = warm_up(engines)
+    print(f'[worker] ready (pid {os.getpid()}, engines: {", ".join(loaded) or "none"})', file=sys.stderr)
+
+    if args.socket:
+        serve_unix_socket(args.socket, default_engine, args.threads)
+    else:
+        serve_stream(sys.stdin.buffer, protocol_out, default_engine, args.threads)
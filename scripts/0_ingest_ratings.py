@@ -0,0 +1,37 @@
+import sys
+import os
+import time
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.ratings_store import ingest_ratings, store_status, DEFAULT_SOURCE_PATH, DEFAULT_STORE_DIR
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+try:
+    is_fresh, reason = store_status()
+    if is_fresh and '--force' not in sys.argv:
+        print(f"✅ 평가 데이터 저장소가 최신 상태입니다: {DEFAULT_STORE_DIR}")
+        print("   다시 만들려면 --force 옵션을 사용하세요.")
+        sys.exit(0)
+    
+    print(f"📝 rating_complete.csv 변환 중... (사유: {reason})")
+    print(f"   원본: {DEFAULT_SOURCE_PATH}")
+    
+    start = time.time()
+    manifest = ingest_ratings()
+    
+    print(f"\n✅ 평가 데이터 저장 완료 ({time.time() - start:.1f}초)")
+    print(f"   저장 위치: {DEFAULT_STORE_DIR}")
+    print(f"   평가 수: {manifest['n_rows']:,}")
+    print(f"   컬럼: {', '.join(f'{name} ({dtype})' for name, dtype in manifest['dtypes'].items())}")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
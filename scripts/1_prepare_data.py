@@ -1,41 +1,51 @@
 import sys
 import os
+import argparse
 import pandas as pd
 import numpy as np
-from scipy.sparse.linalg import svds
-from scipy.sparse import csr_matrix
-import pickle
 import warnings
 import traceback
 warnings.filterwarnings('ignore')
 
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.svd_model import save_svd_model
+from lib.catalog import build_catalog
+from lib.training import build_rating_matrix, train_svd
+from lib.ratings_store import load_ratings_frame
+
 # UTF-8 인코딩 강제
 if sys.platform == 'win32':
     os.system('chcp 65001 > nul')
     sys.stdout.reconfigure(encoding='utf-8')
 
+parser = argparse.ArgumentParser(description='SVD 모델 학습')
+parser.add_argument('--max-users', type=int, default=50000,
+                    help='평가 수 기준 상위 N명의 유저만 사용 (0이면 전체, 기본 50000)')
+parser.add_argument('--min-anime-ratings', type=int, default=100,
+                    help='이 개수 이상 평가받은 애니만 사용 (기본 100)')
+parser.add_argument('--k', type=int, default=12, help='잠재 요인 차원 (기본 12)')
+args = parser.parse_args()
+
 try:
     print("🚀 데이터 로딩 중...")
     
-    # 데이터 로드
-    ratings = pd.read_csv('./data/rating_complete.csv')
-    anime = pd.read_csv('./data/anime.csv')
+    # 데이터 로드 (data/ratings_store 메모리 매핑, 없거나 원본이 바뀌었으면 먼저 변환)
+    ratings = load_ratings_frame()
     
     print(f"✅ Ratings: {ratings.shape}")
-    print(f"✅ Anime: {anime.shape}")
     
-    # 메모리 절약을 위해 상위 활성 유저와 인기 애니메이션만 사용
+    # 상위 활성 유저와 인기 애니메이션만 사용
+    # (희소 행렬로 학습하므로 메모리는 평가 수에 비례, --max-users 0이면 전체 유저)
     print("\n🔍 데이터 필터링 중...")
     
     # 각 유저가 평가한 애니 개수
     user_counts = ratings['user_id'].value_counts()
-    # 상위 50,000명의 활성 유저만 선택 (메모리 절약)
-    top_users = user_counts.head(50000).index
+    top_users = user_counts.head(args.max_users).index if args.max_users > 0 else user_counts.index
     
     # 각 애니메이션의 평가 개수
     anime_counts = ratings['anime_id'].value_counts()
-    # 100개 이상 평가받은 애니만
-    popular_anime = anime_counts[anime_counts >= 100].index
+    popular_anime = anime_counts[anime_counts >= args.min_anime_ratings].index
     
     # 필터링
     filtered_ratings = ratings[
@@ -47,34 +57,25 @@ try:
     print(f"   활성 유저: {filtered_ratings['user_id'].nunique():,}명")
     print(f"   인기 애니: {filtered_ratings['anime_id'].nunique():,}개")
     
-    # User-Anime 매트릭스 생성 (벡터화된 방법)
-    print("\n📊 User-Anime 매트릭스 생성 중...")
-    
-    # 유저와 애니 ID를 인덱스로 변환
-    unique_users = filtered_ratings['user_id'].unique()
-    unique_animes = filtered_ratings['anime_id'].unique()
+    # User-Anime 희소 행렬 생성 (CSR, 평가가 있는 칸만 저장)
+    print("\n📊 User-Anime 희소 행렬 생성 중...")
     
-    user_to_idx = {user: idx for idx, user in enumerate(unique_users)}
-    anime_to_idx = {anime: idx for idx, anime in enumerate(unique_animes)}
+    # 유저와 애니 ID를 인덱스로 변환 (등장 순서 유지)
+    user_indices, unique_users = pd.factorize(filtered_ratings['user_id'])
+    anime_indices, unique_animes = pd.factorize(filtered_ratings['anime_id'])
+    unique_users = np.asarray(unique_users)
+    unique_animes = np.asarray(unique_animes)
     
-    # 매트릭스 생성
     n_users = len(unique_users)
     n_animes = len(unique_animes)
     
-    print(f"   매트릭스 크기: ({n_users}, {n_animes})")
-    
-    # 빈 매트릭스 생성
-    user_anime_matrix = np.zeros((n_users, n_animes))
-    
-    # 벡터화된 방식으로 평점 채우기 (훨씬 빠름)
-    print("   평점 데이터 채우기 (벡터화 방식)...")
-    user_indices = filtered_ratings['user_id'].map(user_to_idx).values
-    anime_indices = filtered_ratings['anime_id'].map(anime_to_idx).values
-    ratings_values = filtered_ratings['rating'].values
-    
-    user_anime_matrix[user_indices, anime_indices] = ratings_values
+    user_anime_matrix = build_rating_matrix(
+        user_indices, anime_indices, filtered_ratings['rating'].values,
+        shape=(n_users, n_animes)
+    )
     
-    print(f"✅ Matrix shape: {user_anime_matrix.shape}")
+    print(f"✅ Matrix shape: {user_anime_matrix.shape}, 평가 수: {user_anime_matrix.nnz:,}")
+    print(f"   메모리: {(user_anime_matrix.data.nbytes + user_anime_matrix.indices.nbytes + user_anime_matrix.indptr.nbytes) / 1024 / 1024:.1f} MB")
     
     # Matrix가 너무 작으면 에러 발생
     if min(user_anime_matrix.shape) < 13:
@@ -82,60 +83,41 @@ try:
         print("   필터링 조건을 완화해야 합니다.")
         exit(1)
     
-    # SVD 학습
+    # SVD 학습 (유저 평균 빼기는 LinearOperator로 암묵적으로 적용)
     print("\n🧠 SVD 모델 학습 중...")
-    user_ratings_mean = np.mean(user_anime_matrix, axis=1)
-    matrix_user_mean = user_anime_matrix - user_ratings_mean.reshape(-1, 1)
     
     # k 값을 matrix 크기에 맞게 조정
-    k = min(12, min(user_anime_matrix.shape) - 1)
-    print(f"   Matrix shape: {user_anime_matrix.shape}")
+    k = min(args.k, min(user_anime_matrix.shape) - 1)
     print(f"   k={k} 차원으로 분해 중...")
     
     if k < 1:
         print(f"❌ 에러: k 값이 너무 작습니다 (k={k})")
         exit(1)
     
-    U, sigma, Vt = svds(matrix_user_mean, k=k)
-    sigma = np.diag(sigma)
+    U, sigma, Vt, user_ratings_mean = train_svd(user_anime_matrix, k)
     
     print("✅ SVD 학습 완료!")
     
-    # 애니메이션 정보 정리
-    print("\n📝 애니메이션 메타데이터 준비 중...")
-    
-    # 실제 컬럼명 확인 후 필요한 컬럼만 선택
-    available_columns = ['MAL_ID', 'Name']
-    optional_columns = ['Genres', 'Type', 'Episodes', 'Score', 'Members']
-    
-    # 사용 가능한 컬럼만 선택
-    columns_to_use = available_columns.copy()
-    for col in optional_columns:
-        if col in anime.columns:
-            columns_to_use.append(col)
-    
-    anime_info = anime[columns_to_use].copy()
-    anime_info = anime_info.dropna(subset=['Name'])
-    anime_info_dict = anime_info.set_index('MAL_ID').to_dict('index')
-    
-    print(f"✅ {len(anime_info_dict):,}개 애니메이션 정보 준비 완료")
-    
-    # 모델 저장
+    # 모델 저장 (memory-map 가능한 .npy 배열 + 메타데이터 테이블)
     print("\n💾 모델 저장 중...")
-    model_data = {
-        'U': U,
-        'sigma': sigma,
-        'Vt': Vt,
-        'user_ratings_mean': user_ratings_mean,
-        'anime_ids': unique_animes.tolist(),
-        'anime_info': anime_info_dict
-    }
-    
-    with open('./data/svd_model.pkl', 'wb') as f:
-        pickle.dump(model_data, f)
-    
-    print("✅ 모델 저장 완료: ./data/svd_model.pkl")
-    print(f"✅ 총 {len(model_data['anime_ids'])}개 애니메이션 학습 완료!")
+    manifest = save_svd_model(
+        './data/svd_model',
+        Vt=Vt,
+        sigma=sigma,
+        anime_ids=unique_animes,
+        U=U,
+        user_ratings_mean=user_ratings_mean,
+        user_ids=unique_users,
+        extra_manifest={'trainer': 'svd', 'mean_mode': 'dense'}
+    )
+    
+    print(f"✅ 모델 저장 완료: ./data/svd_model (version {manifest['version']})")
+    print(f"✅ 총 {manifest['n_animes']}개 애니메이션 학습 완료!")
+    
+    # 애니메이션 메타데이터는 두 추천 엔진이 함께 쓰는 카탈로그에 저장
+    print("\n📝 카탈로그 생성 중...")
+    catalog_manifest = build_catalog()
+    print(f"✅ {catalog_manifest['n_animes']:,}개 애니메이션 정보 준비 완료: ./data/catalog")
     print(f"\n다음 단계: npm run fetch-popular")
 
 except Exception as e:
@@ -0,0 +1,118 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.svd_model import save_svd_model
+from lib.catalog import build_catalog, catalog_status
+from lib.training import build_rating_matrix
+from lib.ratings_store import load_ratings
+from lib.als import train_als, to_svd_form, center_observed, DEFAULT_REG, DEFAULT_ITERATIONS, DEFAULT_BLOCK_ROWS
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='전체 평가 데이터로 ALS 모델 학습 (병렬)')
+    parser.add_argument('--k', type=int, default=12, help='잠재 요인 차원 (기본 12)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                        help=f'ALS 반복 횟수 (기본 {DEFAULT_ITERATIONS})')
+    parser.add_argument('--reg', type=float, default=DEFAULT_REG,
+                        help=f'정규화 계수 (평가 수에 비례해 적용, 기본 {DEFAULT_REG})')
+    parser.add_argument('--min-anime-ratings', type=int, default=1,
+                        help='이 개수 이상 평가받은 애니만 사용 (기본 1 = 전체 카탈로그)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='병렬 프로세스 수 (기본 CPU 코어 수)')
+    parser.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS,
+                        help=f'작업 하나가 푸는 행 수 (기본 {DEFAULT_BLOCK_ROWS})')
+    parser.add_argument('--output', default='./data/svd_model', help='모델 저장 위치 (기본 ./data/svd_model)')
+    args = parser.parse_args()
+
+    print("🚀 평가 데이터 로딩 중...")
+    ratings = load_ratings()
+    print(f"✅ Ratings: {ratings.n_rows:,} rows")
+
+    # 평가 수가 너무 적은 애니만 제외 (유저는 전부 사용)
+    anime_counts = np.bincount(ratings.anime_id)
+    keep = anime_counts[ratings.anime_id] >= args.min_anime_ratings
+
+    # 유저와 애니 ID를 인덱스로 변환 (ID 오름차순)
+    unique_users, user_indices = np.unique(ratings.user_id[keep], return_inverse=True)
+    unique_animes, anime_indices = np.unique(ratings.anime_id[keep], return_inverse=True)
+
+    print("\n📊 User-Anime 희소 행렬 생성 중...")
+    matrix = build_rating_matrix(
+        user_indices, anime_indices, ratings.rating[keep],
+        shape=(len(unique_users), len(unique_animes))
+    )
+    del user_indices, anime_indices, keep
+
+    # 유저별 (평가한 애니의) 평균을 빼고 관측된 평가만 학습
+    user_ratings_mean = center_observed(matrix)
+
+    print(f"✅ Matrix shape: {matrix.shape}, 평가 수: {matrix.nnz:,}")
+
+    k = min(args.k, min(matrix.shape) - 1)
+    if k < 1:
+        print(f"❌ 에러: k 값이 너무 작습니다 (k={k})")
+        exit(1)
+
+    print(f"\n🧠 ALS 학습 중... (k={k}, reg={args.reg}, 프로세스 {args.workers}개)")
+    start = time.time()
+
+    def report(iteration, rmse):
+        print(f"   반복 {iteration}/{args.iterations}: train RMSE {rmse:.4f} ({time.time() - start:.1f}초)")
+
+    X, Y = train_als(
+        matrix, k, reg=args.reg, iterations=args.iterations,
+        workers=args.workers, block_rows=args.block_rows, progress=report
+    )
+    del matrix
+
+    # X @ Y.T -> U @ diag(sigma) @ Vt (추천 엔진이 읽는 SVD 형식)
+    U, sigma, Vt = to_svd_form(X, Y)
+    print("✅ ALS 학습 완료!")
+
+    print("\n💾 모델 저장 중...")
+    manifest = save_svd_model(
+        args.output,
+        Vt=Vt,
+        sigma=sigma,
+        anime_ids=unique_animes,
+        U=U,
+        user_ratings_mean=user_ratings_mean,
+        user_ids=unique_users,
+        extra_manifest={
+            'trainer': 'als',
+            'mean_mode': 'observed',
+            'reg': args.reg,
+            'iterations': args.iterations
+        }
+    )
+
+    print(f"✅ 모델 저장 완료: {args.output} (version {manifest['version']})")
+    print(f"✅ 총 {manifest['n_animes']:,}개 애니메이션, {manifest['n_users']:,}명 유저 학습 완료!")
+
+    is_fresh, reason = catalog_status()
+    if not is_fresh:
+        print(f"\n📝 카탈로그 생성 중... (사유: {reason})")
+        catalog_manifest = build_catalog()
+        print(f"✅ {catalog_manifest['n_animes']:,}개 애니메이션 정보 준비 완료: ./data/catalog")
+
+
+# 워커 프로세스가 이 파일을 다시 import해도 학습이 시작되지 않도록 (Windows spawn)
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ 에러 발생: {e}")
+        print("\n상세 오류:")
+        traceback.print_exc()
+        exit(1)
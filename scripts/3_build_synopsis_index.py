@@ -0,0 +1,36 @@
+import sys
+import os
+import time
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.tfidf_store import build_tfidf_artifact, artifact_status, DEFAULT_ARTIFACT_DIR
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+try:
+    is_fresh, reason = artifact_status()
+    if is_fresh and '--force' not in sys.argv:
+        print(f"✅ TF-IDF 아티팩트가 최신 상태입니다: {DEFAULT_ARTIFACT_DIR}")
+        print("   다시 만들려면 --force 옵션을 사용하세요.")
+        sys.exit(0)
+    
+    print(f"🧠 TF-IDF 모델 학습 중... (사유: {reason})")
+    start = time.time()
+    manifest = build_tfidf_artifact()
+    
+    print(f"✅ TF-IDF 아티팩트 저장 완료 ({time.time() - start:.1f}초)")
+    print(f"   저장 위치: {DEFAULT_ARTIFACT_DIR}")
+    print(f"   문서 수: {manifest['n_docs']:,}")
+    print(f"   특성 수: {manifest['n_features']:,}")
+    print(f"   버전: {manifest['version']}")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
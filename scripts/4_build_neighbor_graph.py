@@ -0,0 +1,46 @@
+import sys
+import os
+import time
+import argparse
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.tfidf_store import load_tfidf_artifact, DEFAULT_ARTIFACT_DIR, NEIGHBOR_GRAPH_FILE
+from lib.neighbor_graph import build_topk_neighbors, save_neighbor_graph
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+parser = argparse.ArgumentParser(description='줄거리 TF-IDF 기반 Top-K 이웃 그래프 생성')
+parser.add_argument('--k', type=int, default=100, help='애니당 저장할 이웃 수 (기본 100)')
+parser.add_argument('--block-size', type=int, default=1024, help='한 번에 계산할 행 수 (기본 1024)')
+args = parser.parse_args()
+
+try:
+    print("📂 TF-IDF 아티팩트 로딩 중...")
+    artifact = load_tfidf_artifact()
+    tfidf_matrix = artifact['tfidf_matrix']
+    print(f"✅ TF-IDF matrix: {tfidf_matrix.shape}")
+    
+    # 전체 n x n 유사도 행렬을 만들지 않고 블록 단위로 Top-K만 유지
+    print(f"\n🔗 Top-{args.k} 이웃 그래프 계산 중 (block={args.block_size})...")
+    start = time.time()
+    graph = build_topk_neighbors(tfidf_matrix, args.k, block_size=args.block_size)
+    print(f"✅ 계산 완료 ({time.time() - start:.1f}초), 저장된 이웃 수: {graph.nnz:,}")
+    
+    graph_path = os.path.join(DEFAULT_ARTIFACT_DIR, NEIGHBOR_GRAPH_FILE)
+    save_neighbor_graph(graph_path, graph, {
+        'k': int(args.k),
+        'metric': 'cosine',
+        'source_version': artifact['manifest']['version']
+    })
+    print(f"💾 저장 위치: {graph_path}")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
@@ -0,0 +1,39 @@
+import sys
+import os
+import time
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.catalog import build_catalog, catalog_status, DEFAULT_CATALOG_DIR, DEFAULT_SOURCES
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+try:
+    is_fresh, reason = catalog_status()
+    if is_fresh and '--force' not in sys.argv:
+        print(f"✅ 카탈로그가 최신 상태입니다: {DEFAULT_CATALOG_DIR}")
+        print("   다시 만들려면 --force 옵션을 사용하세요.")
+        sys.exit(0)
+    
+    print(f"📝 카탈로그 생성 중... (사유: {reason})")
+    for name, path in DEFAULT_SOURCES.items():
+        status = '✅' if os.path.exists(path) else '⚠️  없음'
+        print(f"   {status} {os.path.basename(path)}")
+    
+    start = time.time()
+    manifest = build_catalog()
+    
+    print(f"\n✅ 카탈로그 저장 완료 ({time.time() - start:.1f}초)")
+    print(f"   저장 위치: {DEFAULT_CATALOG_DIR}")
+    print(f"   애니메이션 수: {manifest['n_animes']:,}")
+    print(f"   버전: {manifest['version']}")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
@@ -0,0 +1,55 @@
+import sys
+import os
+import time
+import argparse
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.incremental import (
+    apply_rating_delta, read_rating_delta, DEFAULT_REFRESH_THRESHOLD, DEFAULT_ANCHOR
+)
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+parser = argparse.ArgumentParser(description='새 평가 데이터를 재학습 없이 기존 모델에 반영 (fold-in)')
+parser.add_argument('delta', help='새 평가 CSV (user_id, anime_id, rating 컬럼)')
+parser.add_argument('--model', default='./data/svd_model', help='모델 위치 (기본 ./data/svd_model)')
+parser.add_argument('--refresh-items', action='store_true',
+                    help='누적된 평가 수와 관계없이 애니 요인(Vt)도 갱신')
+parser.add_argument('--refresh-threshold', type=int, default=DEFAULT_REFRESH_THRESHOLD,
+                    help=f'누적 평가가 이 개수 이상이면 애니 요인 갱신 (기본 {DEFAULT_REFRESH_THRESHOLD:,})')
+parser.add_argument('--anchor', type=float, default=DEFAULT_ANCHOR,
+                    help=f'기존 벡터를 유지하려는 정도 (기본 {DEFAULT_ANCHOR})')
+args = parser.parse_args()
+
+try:
+    print(f"🚀 새 평가 데이터 로딩 중... ({args.delta})")
+    user_ids, anime_ids, ratings = read_rating_delta(args.delta)
+    print(f"✅ {len(ratings):,}개 평가, {len(set(user_ids)):,}명 유저")
+    
+    print("\n🧠 기존 모델에 반영 중...")
+    start = time.time()
+    manifest = apply_rating_delta(
+        args.model, user_ids, anime_ids, ratings,
+        refresh=True if args.refresh_items else None,
+        refresh_threshold=args.refresh_threshold,
+        anchor=args.anchor
+    )
+    
+    print(f"✅ 모델 저장 완료 ({time.time() - start:.1f}초): {args.model}")
+    print(f"   버전: {manifest['parent_version']} -> {manifest['version']}")
+    print(f"   유저 수: {manifest['n_users']:,}, 애니메이션 수: {manifest['n_animes']:,}")
+    if manifest['items_refreshed']:
+        print("   애니 요인(Vt) 갱신 완료")
+    else:
+        print(f"   애니 요인 갱신 대기 중인 평가: {manifest['pending_ratings']:,}개")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
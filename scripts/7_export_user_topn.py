@@ -0,0 +1,51 @@
+import sys
+import os
+import time
+import argparse
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.batch_export import export_user_topn, DEFAULT_OUTPUT_DIR, DEFAULT_BLOCK_ROWS
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='모든 유저의 예측 평점 Top N을 파일로 저장')
+    parser.add_argument('--top-n', type=int, default=30, help='유저별 추천 개수 (기본 30)')
+    parser.add_argument('--model', default='./data/svd_model', help='모델 위치 (기본 ./data/svd_model)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='저장 위치 (기본 data/user_topn)')
+    parser.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS,
+                        help=f'한 번에 계산할 유저 수 (기본 {DEFAULT_BLOCK_ROWS})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='병렬 프로세스 수 (기본 CPU 코어 수)')
+    args = parser.parse_args()
+
+    print(f"🚀 유저별 Top {args.top_n} 계산 중... (블록 {args.block_rows}명, 프로세스 {args.workers}개)")
+    start = time.time()
+
+    def report(done, total):
+        print(f"\r   {done:,}/{total:,}명 ({time.time() - start:.1f}초)", end='', flush=True)
+
+    manifest = export_user_topn(
+        args.model, args.output, top_n=args.top_n,
+        block_rows=args.block_rows, workers=args.workers, progress=report
+    )
+
+    print(f"\n✅ 저장 완료 ({time.time() - start:.1f}초): {args.output}")
+    print(f"   유저 수: {manifest['n_users']:,}, 모델 버전: {manifest['model_version']}")
+
+
+# 워커 프로세스가 이 파일을 다시 import해도 실행되지 않도록 (Windows spawn)
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ 에러 발생: {e}")
+        print("\n상세 오류:")
+        traceback.print_exc()
+        exit(1)
@@ -0,0 +1,55 @@
+import sys
+import os
+import time
+import argparse
+import traceback
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.svd_model import load_svd_model, neighbor_graph_file, SERVED_NEIGHBOR_METRIC
+from lib.neighbor_graph import build_topk_neighbors, save_neighbor_graph, normalize_rows
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+parser = argparse.ArgumentParser(description='SVD 아이템 요인 기반 Top-K 이웃 그래프 생성')
+parser.add_argument('--k', type=int, default=100, help='애니당 저장할 이웃 수 (기본 100)')
+parser.add_argument('--metric', choices=['cosine', 'pearson'], default='cosine',
+                    help="유사도 (기본 cosine = get_recommendations와 같은 점수, "
+                         "pearson = 상관계수, 별도 파일로 저장되며 서빙에는 사용되지 않음)")
+parser.add_argument('--block-size', type=int, default=1024, help='한 번에 계산할 행 수 (기본 1024)')
+parser.add_argument('--model', default='./data/svd_model', help='모델 위치 (기본 ./data/svd_model)')
+args = parser.parse_args()
+
+try:
+    print("📂 SVD 모델 로딩 중...")
+    model = load_svd_model(args.model)
+    print(f"✅ 애니메이션 {model.n_animes:,}개, k={model.k}")
+    
+    # 전체 n x n 유사도 행렬을 만들지 않고 블록 단위로 Top-K만 유지
+    print(f"\n🔗 Top-{args.k} {args.metric} 이웃 그래프 계산 중 (block={args.block_size})...")
+    start = time.time()
+    item_rows = normalize_rows(model.Vt.T, args.metric)
+    graph = build_topk_neighbors(item_rows, args.k, block_size=args.block_size)
+    print(f"✅ 계산 완료 ({time.time() - start:.1f}초), 저장된 이웃 수: {graph.nnz:,}")
+    
+    # pearson 그래프는 neighbors_pearson.npz에 따로 저장 (서빙용 cosine 그래프를 덮어쓰지 않음)
+    graph_path = os.path.join(model.path, neighbor_graph_file(args.metric))
+    save_neighbor_graph(graph_path, graph, {
+        'k': int(args.k),
+        'metric': args.metric,
+        'source_version': model.version
+    })
+    print(f"💾 저장 위치: {graph_path}")
+    if args.metric == SERVED_NEIGHBOR_METRIC:
+        print("   get_recommendations(..., mode='neighbors')에서 사용됩니다.")
+    else:
+        print("   분석용 그래프입니다 (mode='neighbors'는 cosine 그래프만 사용).")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
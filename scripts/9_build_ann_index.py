@@ -0,0 +1,110 @@
+import sys
+import os
+import time
+import argparse
+import traceback
+import numpy as np
+
+# 프로젝트 루트를 path에 추가 (lib import용)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lib.ann_index import IVFIndex, measure_recall, save_ivf_index
+
+# UTF-8 인코딩 강제
+if sys.platform == 'win32':
+    os.system('chcp 65001 > nul')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+parser = argparse.ArgumentParser(description='잠재 벡터 기반 IVF 근사 최근접 이웃 인덱스 생성')
+parser.add_argument('--source', choices=['svd', 'synopsis'], default='svd',
+                    help='svd = SVD 아이템 요인 (get_recommendations), synopsis = 줄거리 TF-IDF 축소 임베딩')
+parser.add_argument('--n-lists', type=int, default=None, help='클러스터 수 (기본 sqrt(애니 수))')
+parser.add_argument('--dims', type=int, default=128, help='synopsis 임베딩 차원 (TruncatedSVD, 기본 128)')
+parser.add_argument('--queries', type=int, default=200, help='recall 측정용 질의 수 (기본 200)')
+parser.add_argument('--selection-size', type=int, default=5, help='질의당 선택 애니 수 (기본 5)')
+parser.add_argument('--top-n', type=int, default=30, help='recall@N의 N (기본 30)')
+parser.add_argument('--model', default='./data/svd_model', help='SVD 모델 위치 (기본 ./data/svd_model)')
+args = parser.parse_args()
+
+try:
+    if args.source == 'svd':
+        from lib.svd_model import load_svd_model, ANN_INDEX_DIR
+
+        print("📂 SVD 모델 로딩 중...")
+        model = load_svd_model(args.model)
+        vectors = model.item_factors
+        index_dir = os.path.join(model.path, ANN_INDEX_DIR)
+        source_version = model.version
+        save_vectors = False
+    else:
+        from sklearn.decomposition import TruncatedSVD
+        from lib.tfidf_store import load_tfidf_artifact, DEFAULT_ARTIFACT_DIR, ANN_INDEX_DIR
+        from lib.synopsis_recommender import _rank_exact, _rank_ann
+
+        print("📂 TF-IDF 아티팩트 로딩 중...")
+        artifact = load_tfidf_artifact()
+        tfidf_matrix = artifact['tfidf_matrix']
+        dims = min(args.dims, tfidf_matrix.shape[1] - 1)
+
+        # 희소 TF-IDF 행은 IVF로 묶기 어려우므로 밀집 저차원 임베딩으로 축소 후 단위 벡터화
+        print(f"🧮 TruncatedSVD로 {dims}차원 임베딩 계산 중...")
+        embedding = TruncatedSVD(n_components=dims, random_state=42).fit_transform(tfidf_matrix)
+        norms = np.linalg.norm(embedding, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = (embedding / norms).astype(np.float32)
+        index_dir = os.path.join(DEFAULT_ARTIFACT_DIR, ANN_INDEX_DIR)
+        source_version = artifact['manifest']['version']
+        save_vectors = True
+
+    n_items, dims = vectors.shape
+    print(f"✅ 벡터 {n_items:,}개, {dims}차원")
+
+    print("\n🗂️  IVF 인덱스 생성 중 (spherical k-means)...")
+    start = time.time()
+    index = IVFIndex.build(vectors, n_lists=args.n_lists)
+    sizes = np.diff(index.list_offsets)
+    print(f"✅ 클러스터 {index.n_lists}개 ({time.time() - start:.1f}초), "
+          f"클러스터 크기 평균 {sizes.mean():.1f} / 최대 {sizes.max()}")
+
+    # 실제 요청과 같은 형태: 무작위 선택 애니들의 평균 벡터로 질의, 선택 애니는 제외
+    rng = np.random.default_rng(42)
+    selections = [
+        rng.choice(n_items, min(args.selection_size, n_items), replace=False)
+        for _ in range(args.queries)
+    ]
+    queries = np.array([np.asarray(vectors[rows], dtype=np.float64).mean(axis=0) for rows in selections])
+
+    # synopsis: 실제 응답과 같게 TF-IDF 전체 계산(_rank_exact)을 정답으로,
+    # 탐색한 클러스터 후보를 TF-IDF로 재점수화한 결과(_rank_ann)를 측정
+    exact = search = None
+    if args.source == 'synopsis':
+        def exact(i):
+            return _rank_exact(tfidf_matrix, selections[i], args.top_n)[0]
+
+        def search(i, nprobe):
+            return _rank_ann(index, tfidf_matrix, selections[i], args.top_n, nprobe)[0]
+
+    print(f"\n📏 recall@{args.top_n} 측정 중 (질의 {args.queries}개)...")
+    nprobes = sorted({p for p in (1, 2, 4, 8, 16, 32, index.n_lists) if p <= index.n_lists})
+    report = measure_recall(index, queries, top_n=args.top_n, nprobes=nprobes, exclude=selections,
+                            exact=exact, search=search)
+
+    print(f"\n{'nprobe':>8} {'recall':>8} {'탐색 비율':>10} {'지연(ms)':>10}")
+    for entry in report:
+        label = 'exact' if entry['nprobe'] is None else entry['nprobe']
+        print(f"{label:>8} {entry['recall']:>8.3f} {entry['scanned']:>10.1%} {entry['latency_ms']:>10.3f}")
+
+    save_ivf_index(index_dir, index, {
+        'source': args.source,
+        'source_version': source_version,
+        'dims': int(dims),
+        'top_n': int(args.top_n),
+        'recall': [entry for entry in report if entry['nprobe'] is not None]
+    }, save_vectors=save_vectors)
+    print(f"\n💾 저장 위치: {index_dir}")
+    print("   mode='ann' (nprobe로 정확도/속도 조절)에서 사용됩니다.")
+
+except Exception as e:
+    print(f"\n❌ 에러 발생: {e}")
+    print("\n상세 오류:")
+    traceback.print_exc()
+    exit(1)
@@ -0,0 +1,119 @@
+"""
+Behavior checks for repeated ratings and incremental fold-in
+(lib/training.py, lib/incremental.py)
+
+Every check runs on a small synthetic model in a temporary directory.
+Run with: python test_incremental.py (or python -m pytest test_incremental.py)
+"""
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from lib.training import build_rating_matrix, canonical_rating_matrix, train_svd
+from lib.svd_model import save_svd_model, load_svd_model
+from lib.ratings_store import RatingsColumns
+from lib.incremental import apply_rating_delta
+
+N_USERS, N_ANIMES, K = 30, 20, 5
+USER_IDS = np.arange(100, 100 + N_USERS)
+ANIME_IDS = np.arange(500, 500 + N_ANIMES)
+
+
+def _toy_model(mean_mode='dense'):
+    """(model_path, dense rating matrix, Vt, sigma, ratings history) of a trained toy model"""
+    rng = np.random.default_rng(0)
+    rows, cols = np.nonzero(rng.random((N_USERS, N_ANIMES)) < 0.4)
+    ratings = rng.integers(1, 11, len(rows)).astype(float)
+    matrix = build_rating_matrix(rows, cols, ratings, (N_USERS, N_ANIMES))
+    U, sigma, Vt, means = train_svd(matrix, K)
+
+    path = os.path.join(tempfile.mkdtemp(), 'svd_model')
+    save_svd_model(path, Vt, sigma, ANIME_IDS, U=U, user_ratings_mean=means, user_ids=USER_IDS,
+                   extra_manifest={'mean_mode': mean_mode})
+    history = RatingsColumns({'n_rows': len(rows)}, {
+        'user_id': USER_IDS[rows].astype(np.int32),
+        'anime_id': ANIME_IDS[cols].astype(np.int32),
+        'rating': ratings.astype(np.int8)
+    })
+    return path, matrix.toarray(), Vt, sigma, history
+
+
+def _projected_users(dense, Vt, sigma):
+    """User side of a retrain on fixed item factors: u = (r - m) Vt^T / sigma"""
+    means = dense.sum(axis=1) / dense.shape[1]
+    return (dense - means[:, None]) @ Vt.T / sigma, means
+
+
+def test_repeated_pairs_keep_last_rating():
+    matrix = build_rating_matrix([0, 0, 1], [2, 2, 0], [8, 3, 5], (2, 3))
+    assert matrix[0, 2] == 3 and matrix[1, 0] == 5 and matrix.nnz == 2
+
+    uncanonical = coo_matrix(([8.0, 3.0, 5.0], ([0, 0, 1], [2, 2, 0])), shape=(2, 3))
+    matrix = canonical_rating_matrix(uncanonical)
+    assert matrix[0, 2] == 3 and matrix.nnz == 2
+
+
+def test_dense_fold_in_matches_retrain():
+    path, dense, Vt, sigma, history = _toy_model()
+    rated_user, rated_anime = np.argwhere(dense > 0)[0]
+    unrated_anime = np.flatnonzero(dense[1] == 0)[0]
+
+    # A re-rating, a pair repeated inside the delta, and an unknown user
+    apply_rating_delta(
+        path,
+        [USER_IDS[rated_user], USER_IDS[1], USER_IDS[1], 999],
+        [ANIME_IDS[rated_anime], ANIME_IDS[unrated_anime], ANIME_IDS[unrated_anime], ANIME_IDS[2]],
+        [9.0, 3.0, 7.0, 4.0],
+        refresh=False, history=history
+    )
+    # A later delta re-rates a pair that only exists in the folded log
+    apply_rating_delta(path, [USER_IDS[1]], [ANIME_IDS[unrated_anime]], [2.0],
+                       refresh=False, history=history)
+
+    dense[rated_user, rated_anime] = 9.0
+    dense[1, unrated_anime] = 2.0
+    new_user = np.zeros(N_ANIMES)
+    new_user[2] = 4.0
+    expected_U, expected_means = _projected_users(np.vstack([dense, new_user]), Vt, sigma)
+
+    model = load_svd_model(path)
+    assert np.allclose(model.load_optional('user_ratings_mean'), expected_means)
+    assert np.allclose(model.load_optional('U'), expected_U)
+    # One pending rating per pair, the latest one
+    assert sorted(np.asarray(model.load_optional('pending_ratings')).tolist()) == [2.0, 4.0, 9.0]
+
+
+def test_re_rating_with_same_value_changes_nothing():
+    path, dense, Vt, sigma, history = _toy_model()
+    before = np.array(load_svd_model(path).load_optional('U'))
+    user, anime = np.argwhere(dense > 0)[3]
+
+    apply_rating_delta(path, [USER_IDS[user]], [ANIME_IDS[anime]], [dense[user, anime]],
+                       refresh=False, history=history)
+    assert np.allclose(load_svd_model(path).load_optional('U'), before)
+
+
+def test_item_refresh_sees_each_pair_once():
+    path, dense, _, _, history = _toy_model(mean_mode='observed')
+    user, anime = np.argwhere(dense > 0)[0]
+    apply_rating_delta(path, [USER_IDS[user]] * 2, [ANIME_IDS[anime]] * 2, [2.0, 9.0],
+                       refresh=False, history=history)
+    apply_rating_delta(path, [USER_IDS[user]], [ANIME_IDS[anime]], [6.0],
+                       refresh=False, history=history)
+
+    model = load_svd_model(path)
+    assert np.asarray(model.load_optional('pending_ratings')).tolist() == [6.0]
+    manifest = apply_rating_delta(path, [], [], [], refresh=True, history=history)
+    assert manifest['items_refreshed'] and manifest['pending_ratings'] == 0
+
+
+if __name__ == '__main__':
+    test_repeated_pairs_keep_last_rating()
+    test_dense_fold_in_matches_retrain()
+    test_re_rating_with_same_value_changes_nothing()
+    test_item_refresh_sees_each_pair_once()
+    print('✅ incremental OK')
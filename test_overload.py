@@ -0,0 +1,145 @@
+"""
+Behavior checks for request coalescing (lib/singleflight.py) and the
+deadline / degraded path of the API (lib/admission.py, api/recommend.py)
+
+The API checks run the handler in-process on an ephemeral port with the
+TF-IDF artifact in data/.
+Run with: python test_overload.py (or python -m pytest test_overload.py)
+"""
+import os
+import sys
+import json
+import time
+import threading
+import importlib.util
+import urllib.error
+import urllib.request
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.singleflight import SingleFlight
+from lib.admission import AdmissionController
+from lib.http_server import PooledHTTPServer
+from lib.result_cache import recommendation_cache
+
+_spec = importlib.util.spec_from_file_location(
+    'recommend_api', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api', 'recommend.py')
+)
+recommend_api = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(recommend_api)
+
+
+def test_identical_requests_compute_once():
+    flights = SingleFlight()
+    calls = []
+    start = threading.Barrier(8)
+    results = [None] * 8
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return ['result']
+
+    def request(i):
+        start.wait()
+        results[i] = flights.do('key', compute)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result == ['result'] for result, _ in results)
+    assert sum(shared for _, shared in results) == 7
+    assert flights.stats()['in_flight'] == 0
+
+
+def test_coalesced_failure_reaches_every_caller():
+    flights = SingleFlight()
+    gate = threading.Event()
+    errors = []
+
+    def compute():
+        gate.wait()
+        raise RuntimeError('boom')
+
+    def request():
+        try:
+            flights.do('key', compute)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ['boom'] * 4
+    assert flights.stats()['in_flight'] == 0
+
+
+def _post_with_controller(controller, selected_ids):
+    """POST one recommendation request to an in-process server using controller"""
+    recommend_api.admission_controller = controller
+    server = PooledHTTPServer(('127.0.0.1', 0), recommend_api.handler, max_workers=2)
+    server.ready.set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        request = urllib.request.Request(
+            f'http://127.0.0.1:{server.server_address[1]}/api/recommend',
+            data=json.dumps({'selectedAnimeIds': selected_ids}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, dict(response.headers), json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), json.loads(e.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _uncached_selection():
+    _, model, _ = recommend_api.load_data_and_model()
+    recommendation_cache.clear()
+    return model['index'].ids[10:15].tolist()
+
+
+def test_out_of_budget_request_is_degraded():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, deadline=1.0, max_degraded=1)
+    # The full path is expected to take longer than the whole budget
+    controller.record_cost(10.0)
+
+    status, headers, body = _post_with_controller(controller, _uncached_selection())
+    assert status == 200
+    assert body['degraded'] is True
+    assert body['degraded_source'] in ('neighbors', 'ann')
+    assert headers['X-Degraded'] == body['degraded_source']
+    assert len(body['recommendations']) == 30
+    assert controller.stats()['degraded'] == {body['degraded_source']: 1}
+    assert controller.stats()['degraded_active'] == 0
+
+
+def test_degraded_path_is_capped():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, deadline=1.0, max_degraded=0)
+    controller.record_cost(10.0)
+
+    status, headers, body = _post_with_controller(controller, _uncached_selection())
+    assert status == 503
+    assert headers['Retry-After'] == str(recommend_api.RETRY_AFTER)
+    assert controller.stats()['rejected'] == 1
+    assert controller.stats()['degraded'] == {}
+
+
+if __name__ == '__main__':
+    test_identical_requests_compute_once()
+    test_coalesced_failure_reaches_every_caller()
+    test_out_of_budget_request_is_degraded()
+    test_degraded_path_is_capped()
+    print('✅ overload OK')
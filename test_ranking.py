@@ -0,0 +1,56 @@
+"""
+Behavior checks for lib/ranking.py
+
+Run with: python test_ranking.py (or python -m pytest test_ranking.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from lib.ranking import top_n_rows, top_n_per_row
+
+
+def test_top_n_rows_order_and_exclusion():
+    scores = np.array([0.5, 0.9, 0.7, 0.7, 0.7, 0.1])
+    assert top_n_rows(scores, 3).tolist() == [1, 2, 3]
+    assert top_n_rows(scores, 3, exclude_mask=scores > 0.8).tolist() == [2, 3, 4]
+    assert top_n_rows(scores, 10).tolist() == [1, 2, 3, 4, 0, 5]
+    assert top_n_rows(scores, 0).tolist() == []
+
+
+def test_top_n_rows_ties_at_cut_keep_earliest():
+    # Many rows tied at the cut: the earliest ones are kept, like a stable sort
+    tied = np.zeros(1000)
+    tied[[500, 900]] = 1.0
+    assert top_n_rows(tied, 5).tolist() == [500, 900, 0, 1, 2]
+    assert top_n_rows(tied, 5, exclude_mask=np.arange(1000) < 2).tolist() == [500, 900, 2, 3, 4]
+
+
+def test_top_n_per_row_matches_top_n_rows():
+    cols, values = top_n_per_row(np.array([[0.1, 0.3, 0.2], [0.4, 0.4, 0.0]]), 2)
+    assert cols.tolist() == [[1, 2], [0, 1]]
+    assert values.tolist() == [[0.3, 0.2], [0.4, 0.4]]
+
+    tied = np.zeros(1000)
+    tied[[500, 900]] = 1.0
+    cols, _ = top_n_per_row(np.vstack([tied, tied[::-1]]), 5)
+    assert cols.tolist() == [[500, 900, 0, 1, 2], [99, 499, 0, 1, 2]]
+
+    # Row by row identical to top_n_rows, masked (-inf) entries included
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        scores = rng.integers(0, 4, size=(6, 40)).astype(float)
+        scores[rng.random(scores.shape) < 0.1] = -np.inf
+        n = int(rng.integers(1, 45))
+        cols, _ = top_n_per_row(scores, n)
+        for row, row_cols in zip(scores, cols):
+            assert row_cols.tolist() == top_n_rows(row, n).tolist()
+
+
+if __name__ == '__main__':
+    test_top_n_rows_order_and_exclusion()
+    test_top_n_rows_ties_at_cut_keep_earliest()
+    test_top_n_per_row_matches_top_n_rows()
+    print('✅ ranking OK')
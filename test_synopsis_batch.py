@@ -0,0 +1,62 @@
+"""
+Batch synopsis recommendations must equal the single-set path
+
+Uses the TF-IDF artifact in data/ (built on first use, like the API).
+Run with: python test_synopsis_batch.py (or python -m pytest test_synopsis_batch.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from lib.synopsis_recommender import (
+    get_synopsis_recommendations, get_synopsis_recommendations_batch,
+    peek_synopsis_recommendations, load_data_and_model
+)
+from lib.result_cache import recommendation_cache
+
+
+def _selections():
+    _, model, _ = load_data_and_model()
+    ids = model['index'].ids.tolist()
+    return [
+        ids[:5],
+        ids[100:105],
+        ids[7:9] + [ids[7]],          # repeated selection
+        [ids[42], 1.5, 'x', -1],      # invalid and unknown ids are reported, not fatal
+        ['oops'],                     # nothing valid: empty result
+    ]
+
+
+def test_batch_equals_single():
+    selections = _selections()
+    batch = get_synopsis_recommendations_batch(selections, top_n=20, use_cache=False)
+    assert len(batch) == len(selections)
+
+    for selected, result in zip(selections, batch):
+        valid = [anime_id for anime_id in selected if isinstance(anime_id, int) and anime_id > 0]
+        single = get_synopsis_recommendations(valid, top_n=20, use_cache=False) if valid else []
+        assert [rec['anime_id'] for rec in result['recommendations']] == \
+            [rec['anime_id'] for rec in single]
+        assert np.allclose([rec['match_score'] for rec in result['recommendations']],
+                           [rec['match_score'] for rec in single])
+
+    assert batch[3]['invalid_ids'] == [1.5, 'x', -1]
+    assert batch[4] == {'recommendations': [], 'invalid_ids': ['oops']}
+
+
+def test_batch_and_single_share_cache_entries():
+    recommendation_cache.clear()
+    selected = _selections()[1]
+    batch = get_synopsis_recommendations_batch([selected[::-1]], top_n=12)
+    cached = peek_synopsis_recommendations(selected, top_n=12)
+    assert cached is not None
+    assert [rec['anime_id'] for rec in cached] == \
+        [rec['anime_id'] for rec in batch[0]['recommendations']]
+
+
+if __name__ == '__main__':
+    test_batch_equals_single()
+    test_batch_and_single_share_cache_entries()
+    print('✅ synopsis batch OK')